@@ -1,4 +1,4 @@
-from typing import List, Callable, Union, Optional, TypedDict
+from typing import Any, List, Callable, Union, Optional, TypedDict
 
 AgentFunction = Callable[[], Union[str, "Agent", dict[str, str]]]
 
@@ -13,7 +13,7 @@ class Agent(TypedDict):
 
 
 class Response(TypedDict):
-    messages: list[str]
+    messages: list[dict[str, Any]]
     agent: Optional[Agent]
     context_variables: dict[str, str]
 
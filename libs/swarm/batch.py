@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from cache import ResponseCache, SQLiteCache, canonical_json
+from clients import get_async_client, registry, resolve
+from completions import RequestTemplate
+from models import Provider
+from utils.tqdm import tqdm
+
+load_dotenv()
+
+
+@dataclass
+class BatchSummary:
+    """
+    Outcome of a batch run.
+
+    Attributes:
+        completed: Rows answered and checkpointed during this run.
+        skipped: Rows already checkpointed by a previous run.
+        failed: Rows that raised; they are written to the errors file and retried on resume.
+    """
+
+    completed: int = 0
+    skipped: int = 0
+    failed: int = 0
+
+
+def count_lines(path: Path) -> int:
+    """
+    Counts newline-terminated rows by scanning the file in 1 MiB chunks.
+    """
+    count = 0
+    with path.open("rb") as f:
+        while chunk := f.read(1 << 20):
+            count += chunk.count(b"\n")
+    return count
+
+
+def read_checkpoint(path: Path) -> Set[int]:
+    """
+    Loads the indices of rows completed by previous runs, ignoring a torn final line.
+    """
+    if not path.exists():
+        return set()
+    done = set()
+    with path.open() as f:
+        for line in f:
+            if line.endswith("\n"):
+                done.add(int(line))
+    return done
+
+
+def iter_rows(path: Path, done: Set[int]) -> Iterator[Tuple[int, str]]:
+    """
+    Lazily yields (index, raw line) for every non-empty row not yet checkpointed.
+    """
+    with path.open() as f:
+        for index, line in enumerate(f):
+            if index not in done and line.strip():
+                yield index, line
+
+
+@lru_cache(maxsize=256)
+def template_for(params: str) -> Tuple[Optional[Provider], RequestTemplate]:
+    """
+    Validates one distinct set of static parameters (everything but `messages`).
+
+    Rows of a batch usually share their parameters, so each set is validated once per
+    run instead of once per row. The model is resolved to its routed slug after
+    validation, as model-specific validators check the registry name.
+    """
+    template = RequestTemplate(**json.loads(params))
+    provider, template.params["model"] = resolve(template.params["model"])
+    return provider, template
+
+
+async def complete(
+    row: str, cache: Optional[ResponseCache]
+) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Validates one JSONL row and sends it.
+
+    Returns:
+        The row's `custom_id` (if any) and the JSON-ready chat completion.
+    """
+    data = json.loads(row)
+    custom_id = data.pop("custom_id", None)
+    messages = data.pop("messages")
+    provider, template = template_for(canonical_json(data))
+    payload = template.payload(messages)
+    client = get_async_client(provider)
+    if cache is not None:
+        response = await cache.acomplete(client, payload)
+    else:
+        response = await client.chat.completions.create(**payload)
+    return custom_id, response.model_dump(mode="json")
+
+
+async def run_batch(
+    input_path: Path,
+    output_path: Path,
+    concurrency: int = 16,
+    cache: Optional[ResponseCache] = None,
+) -> BatchSummary:
+    """
+    Runs every request in a JSONL file with bounded concurrency, resuming from a checkpoint.
+
+    Rows are read lazily into a queue bounded by the concurrency, so memory use does not
+    grow with the file. Each result is appended to `output_path` as soon as it completes,
+    after which its row index is appended to `<output>.ckpt`. A killed run therefore
+    resumes where it stopped; at worst the rows in flight when it died are sent again.
+
+    Args:
+        input_path: JSONL file of `BaseChatCompletions`-shaped rows, optionally carrying a `custom_id`.
+        output_path: JSONL file results are appended to.
+        concurrency: Maximum number of requests in flight.
+        cache: Optional response cache consulted before each upstream call.
+
+    Returns:
+        Counts of completed, skipped and failed rows.
+    """
+    checkpoint_path = output_path.with_name(output_path.name + ".ckpt")
+    errors_path = output_path.with_name(output_path.name + ".errors.jsonl")
+    done = read_checkpoint(checkpoint_path)
+    summary = BatchSummary(skipped=len(done))
+    queue: "asyncio.Queue[Optional[Tuple[int, str]]]" = asyncio.Queue(
+        maxsize=2 * concurrency
+    )
+
+    with (
+        output_path.open("a") as output,
+        checkpoint_path.open("a") as checkpoint,
+        errors_path.open("a") as errors,
+        tqdm(total=count_lines(input_path), desc="batch", unit="req") as progress,
+    ):
+        progress.update(len(done))
+
+        async def worker():
+            while (item := await queue.get()) is not None:
+                index, row = item
+                try:
+                    custom_id, response = await complete(row, cache)
+                except Exception as e:
+                    errors.write(json.dumps({"line": index, "error": repr(e)}) + "\n")
+                    errors.flush()
+                    summary.failed += 1
+                else:
+                    record = {
+                        "line": index,
+                        "custom_id": custom_id,
+                        "response": response,
+                    }
+                    output.write(json.dumps(record) + "\n")
+                    output.flush()
+                    checkpoint.write(f"{index}\n")
+                    checkpoint.flush()
+                    summary.completed += 1
+                progress.update(1)
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        for item in iter_rows(input_path, done):
+            await queue.put(item)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run a JSONL file of chat completion requests"
+    )
+    parser.add_argument(
+        "input", type=Path, help="JSONL file of BaseChatCompletions rows"
+    )
+    parser.add_argument("output", type=Path, help="JSONL file to append results to")
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=16, help="Requests in flight"
+    )
+    parser.add_argument("--cache", type=Path, help="SQLite file to cache responses in")
+    args = parser.parse_args()
+
+    cache = ResponseCache(SQLiteCache(args.cache)) if args.cache else None
+
+    async def main() -> BatchSummary:
+        try:
+            return await run_batch(args.input, args.output, args.concurrency, cache)
+        finally:
+            # The shared async clients are bound to this event loop, which ends with the run
+            await registry.aclose()
+
+    summary = asyncio.run(main())
+    tqdm.write(
+        f"completed={summary.completed} skipped={summary.skipped} failed={summary.failed}"
+    )
@@ -0,0 +1,147 @@
+"""
+Runs the benchmark suite and compares it with an earlier run.
+
+Run from `libs/swarm`:
+
+    python -m benchmarks [--quick] [--skip startup throughput micro] [--json PATH]
+                         [--compare BASELINE.json] [--tolerance 0.15]
+
+Results are written as JSON: a `meta` block (interpreter, platform, CPU count, git
+commit, time) and a `results` tree per benchmark. With `--compare`, every figure whose
+name says which way is better is checked against the baseline. Names ending in `_ns`,
+`_us`, `_ms` and `_s` are better lower; names ending in `per_s` or containing `speedup`
+are better higher. The run exits with 1 if any figure is worse by more than `--tolerance`.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from benchmarks import bench_micro, bench_startup, bench_throughput
+from benchmarks.mock_server import MockConfig
+
+BENCHMARKS = ("startup", "throughput", "micro")
+
+
+def meta() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(
+            timespec="seconds"
+        ),
+    }
+
+
+def run(skip: List[str], quick: bool) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    if "startup" not in skip:
+        results["startup"] = bench_startup.run(runs=3 if quick else 5, top=5)
+    if "throughput" not in skip:
+        results["throughput"] = bench_throughput.run(
+            [1, 8] if quick else [1, 8, 32, 64],
+            32 if quick else 256,
+            config=MockConfig(seed=0),
+        )
+    if "micro" not in skip:
+        results["micro"] = bench_micro.run(1_000 if quick else 10_000)
+    return results
+
+
+def figures(tree: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """
+    Flattens a results tree into (dotted name, value) pairs for its numeric leaves.
+    """
+    if isinstance(tree, dict):
+        for key, value in tree.items():
+            yield from figures(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(tree, (int, float)) and not isinstance(tree, bool):
+        yield prefix, float(tree)
+
+
+def direction(name: str) -> Optional[int]:
+    """
+    Returns 1 if a figure is better higher, -1 if better lower, None if it has no direction.
+    """
+    leaf = name.rsplit(".", 1)[-1]
+    if leaf.endswith("per_s") or "speedup" in leaf:
+        return 1
+    if leaf.endswith(("_ns", "_us", "_ms", "_s")):
+        return -1
+    return None
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """
+    Lists the figures that are worse than the baseline by more than `tolerance`, as text.
+    """
+    previous = dict(figures(baseline))
+    regressions = []
+    for name, value in figures(current):
+        sign = direction(name)
+        before = previous.get(name)
+        if sign is None or not before:
+            continue
+        change = (value - before) / abs(before)
+        if -sign * change > tolerance:
+            regressions.append(f"{name}: {before:.4g} -> {value:.4g} ({change:+.1%})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Fewer runs and iterations, for a smoke test",
+    )
+    parser.add_argument("--skip", nargs="+", choices=BENCHMARKS, default=[])
+    parser.add_argument("--json", type=str, help="Write results to this file")
+    parser.add_argument(
+        "--compare", type=str, help="Baseline results file to compare against"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.15, help="Allowed relative slowdown"
+    )
+    args = parser.parse_args()
+
+    report = {"meta": meta(), "results": run(args.skip, args.quick)}
+    output = json.dumps(report, indent=2)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report["results"], baseline["results"], args.tolerance)
+        for line in regressions:
+            print(f"regression: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(
+            f"No regressions beyond {args.tolerance:.0%} against {args.compare}",
+            file=sys.stderr,
+        )
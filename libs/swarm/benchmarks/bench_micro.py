@@ -0,0 +1,123 @@
+"""
+Micro-benchmarks of the per-request hot paths: tool schemas, prompt templates, request
+validation and the progress bar.
+
+Run from `libs/swarm`:
+
+    python -m benchmarks.bench_micro [--iterations N] [--json PATH]
+
+Cached paths are timed next to their uncached equivalents, so a change that defeats a
+cache shows up as a ratio near 1 as well as a slower absolute time.
+"""
+
+import argparse
+import json
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel
+
+from benchmarks import bench_requests, bench_tqdm
+from benchmarks.bench_requests import per_call_us
+from utils.schema import compile_schema, function_to_json, tools_payload
+from utils.templates import TemplateCache, jinja2_formatter, sandboxed_environment
+
+
+class Filters(BaseModel):
+    language: Optional[str] = None
+    since: Optional[str] = None
+    tags: List[str] = []
+
+
+def search(
+    query: str,
+    limit: int = 10,
+    order: Literal["relevance", "date"] = "relevance",
+    filters: Optional[Filters] = None,
+):
+    """Search the knowledge base."""
+
+
+def lookup(
+    document_id: str,
+    fields: Optional[List[str]] = None,
+    context_variables: Optional[Dict[str, str]] = None,
+):
+    """Look up a document by id."""
+
+
+def recall(topic: str, depth: int = 1):
+    """Search long-term memory."""
+
+
+FUNCTIONS = [search, lookup, recall]
+
+PROMPT = """You are {{ role }} working on {{ project }}.
+{% for tool in tools %}- {{ tool.name }}: {{ tool.description }}
+{% endfor %}
+{% if notes %}Notes: {{ notes | join(", ") }}{% endif %}
+Answer the question: {{ question }}"""
+
+VARIABLES: Dict[str, Any] = {
+    "role": "a senior engineer",
+    "project": "swarm",
+    "tools": [{"name": f.__name__, "description": f.__doc__} for f in FUNCTIONS],
+    "notes": ["be brief", "cite sources"],
+    "question": "What changed in the last release?",
+}
+
+
+def schema(iterations: int) -> Dict[str, float]:
+    cold = per_call_us(lambda _: compile_schema(search), iterations)
+    cached = per_call_us(lambda _: function_to_json(search), iterations)
+    return {
+        "compile_schema_us": cold,
+        "function_to_json_us": cached,
+        "tools_payload_us": per_call_us(lambda _: tools_payload(FUNCTIONS), iterations),
+        "function_to_json_speedup": cold / cached,
+    }
+
+
+def templates(iterations: int) -> Dict[str, float]:
+    env = sandboxed_environment()
+    cold = per_call_us(
+        lambda _: env.from_string(PROMPT).render(**VARIABLES), max(1, iterations // 10)
+    )
+    cached = per_call_us(lambda _: jinja2_formatter(PROMPT, **VARIABLES), iterations)
+    cache = TemplateCache()
+    contexts = [VARIABLES] * 100
+    many = per_call_us(
+        lambda _: cache.render_many(PROMPT, contexts), max(1, iterations // 100)
+    ) / len(contexts)
+    return {
+        "compile_render_us": cold,
+        "jinja2_formatter_us": cached,
+        "render_many_per_item_us": many,
+        "jinja2_formatter_speedup": cold / cached,
+    }
+
+
+def run(iterations: int) -> Dict[str, Dict[str, float]]:
+    return {
+        "schema": schema(iterations),
+        "templates": templates(iterations),
+        "requests": bench_requests.run(iterations),
+        "tqdm": bench_tqdm.run(iterations * 50),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--iterations", type=int, default=10_000)
+    parser.add_argument("--json", type=str, help="Write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    for group, values in results.items():
+        print(group)
+        for name, value in values.items():
+            print(f"  {name:>26}: {value:10.2f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,126 @@
+"""
+Benchmark for building chat completion payloads: full validation versus request templates.
+
+Run from `libs/swarm`:
+
+    python -m benchmarks.bench_requests [--iterations N] [--json PATH]
+
+Each case turns the same static parameters (a model, sampling settings and three tools)
+plus a short conversation into the wire payload. The cases are checked to agree on
+every static parameter, and the templates to send the messages unchanged.
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+from cache import request_payload
+from completions import BaseChatCompletions, RequestTemplate
+
+
+def tool(name: str, description: str) -> Dict[str, Any]:
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string"},
+                    "limit": {"type": "integer"},
+                },
+                "required": ["query"],
+            },
+        },
+    }
+
+
+PARAMS: Dict[str, Any] = {
+    "model": "gpt-4.1-mini",
+    "temperature": 0.2,
+    "top_p": 0.9,
+    "max_completion_tokens": 1024,
+    "parallel_tool_calls": True,
+    "tool_choice": "auto",
+    "tools": [
+        tool("search", "Search the web"),
+        tool("lookup", "Look up a document by id"),
+        tool("recall", "Search long-term memory"),
+    ],
+}
+
+
+def conversation(turn: int) -> List[Dict[str, Any]]:
+    return [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {
+            "role": "user",
+            "content": f"Question {turn}: what changed in the last release?",
+        },
+        {"role": "assistant", "content": "Let me check the changelog."},
+        {
+            "role": "user",
+            "content": [{"type": "text", "text": "Focus on performance."}],
+        },
+    ]
+
+
+def per_call_us(fn: Callable[[int], Any], iterations: int, repeat: int = 5) -> float:
+    """
+    Returns the best-of-`repeat` wall time per call of `fn`, in microseconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for i in range(iterations):
+            fn(i)
+        best = min(best, time.perf_counter() - started)
+    return best / iterations * 1e6
+
+
+def run(iterations: int) -> Dict[str, float]:
+    template = RequestTemplate(**PARAMS)
+    trusted = RequestTemplate(validate_messages=False, **PARAMS)
+
+    def validate(i: int) -> Dict[str, Any]:
+        return request_payload(
+            BaseChatCompletions.model_validate({**PARAMS, "messages": conversation(i)})
+        )
+
+    expected = {k: v for k, v in validate(0).items() if k != "messages"}
+    for payload in (
+        template.payload(conversation(0)),
+        trusted.payload(conversation(0)),
+    ):
+        assert payload == {**expected, "messages": conversation(0)}
+
+    full = per_call_us(validate, iterations)
+    validated = per_call_us(lambda i: template.payload(conversation(i)), iterations)
+    unvalidated = per_call_us(lambda i: trusted.payload(conversation(i)), iterations)
+    messages_only = per_call_us(conversation, iterations)
+    return {
+        "model_validate_dump_us": full,
+        "template_us": validated,
+        "template_trusted_us": unvalidated,
+        "build_messages_us": messages_only,
+        "speedup": full / validated,
+        "speedup_trusted": full / unvalidated,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--json", type=str, help="Write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    for name, value in results.items():
+        print(f"{name:>24}: {value:8.2f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,125 @@
+"""
+Startup benchmark: time from launching the REPL to its first prompt.
+
+Run from `libs/swarm`:
+
+    python -m benchmarks.bench_startup [--runs N] [--budget-ms MS] [--top K] [--json PATH]
+
+Each run launches `python -X importtime main.py` with pipes attached and stops it as soon
+as the "Enter model" prompt is written. The reported figure is the median over the runs
+minus the median start-up of a bare interpreter, so it measures only what `main.py` adds.
+The slowest imports from the last run are listed to show where the time goes.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+SWARM = Path(__file__).resolve().parents[1]
+PROMPT = b"Enter model"
+BUDGET_MS = 250.0
+
+
+def time_to_prompt() -> Tuple[float, str]:
+    """
+    Launches the REPL once and returns the seconds until its first prompt, and its import log.
+    """
+    env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+    # The import log easily outgrows a pipe buffer, which would stall the child mid-import.
+    with tempfile.TemporaryFile() as log:
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-X", "importtime", "main.py"],
+            cwd=SWARM,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=log,
+            env=env,
+        )
+        assert process.stdout is not None
+        output = b""
+        while PROMPT not in output:
+            chunk = process.stdout.read1(4096)  # type: ignore
+            if not chunk:
+                process.wait()
+                log.seek(0)
+                raise RuntimeError(
+                    f"main.py exited before prompting:\n{log.read().decode()[-2000:]}"
+                )
+            output += chunk
+        elapsed = time.perf_counter() - started
+        process.kill()
+        process.communicate()
+        log.seek(0)
+        return elapsed, log.read().decode()
+
+
+def time_bare() -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - started
+
+
+def slowest_imports(log: str, top: int) -> List[Tuple[str, float]]:
+    """
+    Parses `-X importtime` output into the `top` modules with the largest cumulative time, in ms.
+    """
+    imports = []
+    for line in log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        imports.append((name.strip(), int(cumulative) / 1000))
+    return sorted(imports, key=lambda item: item[1], reverse=True)[:top]
+
+
+def run(runs: int, top: int) -> Dict[str, object]:
+    bare = statistics.median(time_bare() for _ in range(runs))
+    samples, log = [], ""
+    for _ in range(runs):
+        elapsed, log = time_to_prompt()
+        samples.append(elapsed)
+    return {
+        "bare_interpreter_ms": bare * 1000,
+        "time_to_prompt_ms": statistics.median(samples) * 1000,
+        "added_ms": (statistics.median(samples) - bare) * 1000,
+        "slowest_imports_ms": slowest_imports(log, top),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=BUDGET_MS,
+        help="Fail if main.py adds more than this",
+    )
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", type=str, help="Write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.runs, args.top)
+    print(f"  bare interpreter: {results['bare_interpreter_ms']:8.1f} ms")
+    print(f"    time to prompt: {results['time_to_prompt_ms']:8.1f} ms")
+    print(
+        f"   added by main.py: {results['added_ms']:8.1f} ms (budget {args.budget_ms:.0f} ms)"
+    )
+    print("   slowest imports before the prompt (cumulative):")
+    for name, ms in results["slowest_imports_ms"]:  # type: ignore
+        print(f"    {ms:8.1f} ms  {name}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if results["added_ms"] > args.budget_ms:  # type: ignore
+        sys.exit(1)
@@ -0,0 +1,206 @@
+"""
+End-to-end request throughput through the pooled clients against the local mock server.
+
+Run from `libs/swarm`:
+
+    python -m benchmarks.bench_throughput [--concurrency 1 8 32 64] [--requests N] [--api chat|responses]
+                                          [--no-stream] [--latency S] [--rate-limit-rate P] [--json PATH]
+
+For each concurrency level, `--requests` calls go through `ClientRegistry.get_async`, the
+same path the Runner and the MCP server use, with at most that many in flight. Reported
+per level: requests per second, latency and TTFT percentiles, calls that failed after
+the SDK's retries, and the 429s and 500s the server sent. The mock runs in a child
+process; pass `--base-url` to measure an already-running mock instead.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+from clients import ClientRegistry
+from models import Provider
+
+from benchmarks.mock_server import MockConfig, spawn
+
+MESSAGES = [
+    {"role": "system", "content": "You are a helpful assistant."},
+    {"role": "user", "content": "Summarize the benchmark results in one paragraph."},
+]
+
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def call(client: Any, api: str, stream: bool) -> Optional[float]:
+    """
+    Sends one request and consumes the reply; returns the TTFT for streamed calls.
+    """
+    started = time.perf_counter()
+    if api == "responses":
+        if not stream:
+            await client.responses.create(model="mock", input=MESSAGES)
+            return None
+        events = await client.responses.create(
+            model="mock", input=MESSAGES, stream=True
+        )
+        ttft = None
+        async for event in events:
+            if ttft is None and event.type == "response.output_text.delta":
+                ttft = time.perf_counter() - started
+        return ttft
+
+    if not stream:
+        await client.chat.completions.create(model="mock", messages=MESSAGES)
+        return None
+    chunks = await client.chat.completions.create(
+        model="mock",
+        messages=MESSAGES,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    ttft = None
+    async for chunk in chunks:
+        if ttft is None and chunk.choices and chunk.choices[0].delta.content:
+            ttft = time.perf_counter() - started
+    return ttft
+
+
+async def level(
+    client: Any, concurrency: int, requests: int, api: str, stream: bool
+) -> Dict[str, Any]:
+    """
+    Runs `requests` calls with at most `concurrency` in flight and summarizes them.
+    """
+    latencies: List[float] = []
+    ttfts: List[float] = []
+    failures = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal failures
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                ttft = await call(client, api, stream)
+            except Exception:
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if ttft is not None:
+                ttfts.append(ttft)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests_per_s": len(latencies) / elapsed,
+        "latency_p50_ms": (percentile(latencies, 0.5) or 0.0) * 1000,
+        "latency_p95_ms": (percentile(latencies, 0.95) or 0.0) * 1000,
+        "latency_p99_ms": (percentile(latencies, 0.99) or 0.0) * 1000,
+        "latency_mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "ttft_p50_ms": (percentile(ttfts, 0.5) or 0.0) * 1000 if ttfts else None,
+        "failures": failures,
+    }
+
+
+async def measure(
+    base_url: str, concurrency: List[int], requests: int, api: str, stream: bool
+) -> Dict[str, Any]:
+    registry = ClientRegistry()
+    client = registry.get_async(
+        Provider(name="mock", api_key="mock", base_url=base_url)
+    )
+    results: Dict[str, Any] = {}
+
+    async def statuses() -> Dict[str, int]:
+        response = await client._client.get(f"{base_url}/stats")
+        return response.json() if response.status_code == 200 else {}
+
+    try:
+        await call(client, api, stream)  # warm the pool
+        for n in concurrency:
+            before = await statuses()
+            result = await level(client, n, requests, api, stream)
+            after = await statuses()
+            result["server_429s"] = after.get("429", 0) - before.get("429", 0)
+            result["server_500s"] = after.get("500", 0) - before.get("500", 0)
+            results[f"c{n}"] = result
+    finally:
+        await registry.aclose()
+    return results
+
+
+def run(
+    concurrency: List[int],
+    requests: int,
+    api: str = "chat",
+    stream: bool = True,
+    config: Optional[MockConfig] = None,
+    base_url: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Measures every concurrency level against `base_url`, or a mock server started for the run.
+    """
+    if base_url is not None:
+        return asyncio.run(measure(base_url, concurrency, requests, api, stream))
+    with spawn(config) as url:
+        return asyncio.run(measure(url, concurrency, requests, api, stream))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument(
+        "--requests", type=int, default=256, help="Requests per concurrency level"
+    )
+    parser.add_argument("--api", choices=["chat", "responses"], default="chat")
+    parser.add_argument("--no-stream", dest="stream", action="store_false")
+    parser.add_argument("--latency", type=float, default=MockConfig.latency)
+    parser.add_argument("--chunks", type=int, default=MockConfig.chunks)
+    parser.add_argument(
+        "--chunk-interval", type=float, default=MockConfig.chunk_interval
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--base-url", help="Benchmark this running mock server instead of starting one"
+    )
+    parser.add_argument("--json", type=str, help="Write results to this file")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        chunks=args.chunks,
+        chunk_interval=args.chunk_interval,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=0,
+    )
+    results = run(
+        args.concurrency, args.requests, args.api, args.stream, config, args.base_url
+    )
+    for name, result in results.items():
+        ttft = (
+            f"{result['ttft_p50_ms']:7.1f}"
+            if result["ttft_p50_ms"] is not None
+            else "    n/a"
+        )
+        print(
+            f"{name:>5}: {result['requests_per_s']:8.1f} req/s"
+            f" | p50 {result['latency_p50_ms']:7.1f} ms | p95 {result['latency_p95_ms']:7.1f} ms"
+            f" | ttft p50 {ttft} ms | failures {result['failures']}"
+            f" | 429s {result['server_429s']} | 500s {result['server_500s']}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,138 @@
+"""
+Micro-benchmark for the progress bar hot path.
+
+Run from `libs/swarm`:
+
+    python -m benchmarks.bench_tqdm [--iterations N] [--budget-ns NS] [--json PATH]
+"""
+
+import argparse
+import io
+import json
+import sys
+import threading
+import time
+from typing import Callable, Dict
+
+from utils.tqdm import tqdm
+
+
+def per_call_ns(fn: Callable[[int], None], iterations: int, repeat: int = 5) -> float:
+    """
+    Returns the best-of-`repeat` wall time per iteration of `fn(iterations)`, in nanoseconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        fn(iterations)
+        best = min(best, time.perf_counter_ns() - started)
+    return best / iterations
+
+
+def bare_loop(iterations: int):
+    for _ in range(iterations):
+        pass
+
+
+class Noop:
+    def update(self, n: int = 0):
+        pass
+
+
+def method_call(iterations: int):
+    """
+    An empty method call, the floor any `update()` implementation pays on this interpreter.
+    """
+    update = Noop().update
+    for _ in range(iterations):
+        update(1)
+
+
+def update_quiet(iterations: int):
+    """
+    `update()` with redraws throttled away: the cost every call pays when nothing is drawn.
+    """
+    bar = tqdm(total=iterations, rate=1e-9, file=io.StringIO())
+    update = bar.update
+    for _ in range(iterations):
+        update(1)
+    bar.close()
+
+
+def update_disabled(iterations: int):
+    bar = tqdm(total=iterations, disable=True)
+    update = bar.update
+    for _ in range(iterations):
+        update(1)
+
+
+def iterate(iterations: int):
+    """
+    Wrapping an iterable with the default redraw rate, drawing into memory.
+    """
+    for _ in tqdm(range(iterations), file=io.StringIO()):
+        pass
+
+
+def update_threads(iterations: int, threads: int = 8):
+    """
+    `update()` from several threads at once; also checks that no increment is lost.
+    """
+    bar = tqdm(total=iterations, file=io.StringIO())
+    share = iterations // threads
+
+    def work():
+        for _ in range(share):
+            bar.update(1)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    bar.close()
+    assert bar.n == share * threads, f"lost updates: {bar.n} != {share * threads}"
+
+
+def run(iterations: int) -> Dict[str, float]:
+    """
+    Runs every case; timings exclude the loop itself, and `update_quiet_calls` expresses a
+    quiet update in units of an empty method call so results compare across machines.
+    """
+    baseline = per_call_ns(bare_loop, iterations)
+    call = per_call_ns(method_call, iterations) - baseline
+    quiet = per_call_ns(update_quiet, iterations) - baseline
+    return {
+        "bare_loop_ns": baseline,
+        "method_call_ns": call,
+        "update_quiet_ns": quiet,
+        "update_quiet_calls": quiet / call,
+        "update_disabled_ns": per_call_ns(update_disabled, iterations) - baseline,
+        "iterate_ns": per_call_ns(iterate, iterations) - baseline,
+        "update_threads_ns": per_call_ns(update_threads, iterations, repeat=3)
+        - baseline,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    parser.add_argument(
+        "--budget-ns", type=float, help="Fail if a quiet update() costs more than this"
+    )
+    parser.add_argument("--json", type=str, help="Write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    for name, value in results.items():
+        print(f"{name:>20}: {value:8.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.budget_ns is not None and results["update_quiet_ns"] > args.budget_ns:
+        print(
+            f"update() costs {results['update_quiet_ns']:.0f} ns > budget {args.budget_ns:.0f} ns"
+        )
+        sys.exit(1)
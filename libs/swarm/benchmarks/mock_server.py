@@ -0,0 +1,461 @@
+"""
+Local OpenAI/OpenRouter-compatible server for benchmarks.
+
+Run from `libs/swarm`:
+
+    python -m benchmarks.mock_server [--port PORT] [--latency S] [--chunks N] [--chunk-interval S]
+                                     [--error-rate P] [--rate-limit-rate P]
+
+and point a client at `http://127.0.0.1:PORT/v1` (any API key works). It serves
+`/chat/completions` and `/responses`, both with and without streaming, and `/embeddings`.
+Every reply waits `latency` seconds before its first byte. A streamed reply then sends
+`chunks` deltas `chunk_interval` seconds apart. A fraction of requests fails with a 500
+(`error_rate`) or a 429 carrying `retry-after-ms` (`rate_limit_rate`), to exercise the
+SDK's retries. `GET /v1/stats` returns the number of replies sent per status code.
+"""
+
+import argparse
+import base64
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit")
+
+
+class Server(ThreadingHTTPServer):
+    # The default backlog of 5 drops connections at benchmark concurrency, costing a 1s SYN retry
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+@dataclass
+class MockConfig:
+    """
+    Behaviour of a `MockServer`.
+
+    Attributes:
+        latency: Seconds before the first byte of every reply.
+        chunks: Text deltas per reply; also the reported output tokens.
+        chunk_interval: Seconds between streamed deltas.
+        error_rate: Fraction of requests answered with a 500.
+        rate_limit_rate: Fraction of requests answered with a 429.
+        retry_after: Seconds advertised in the 429's `retry-after-ms` header.
+        dimensions: Length of returned embedding vectors.
+        seed: Seed for the failure injection, for reproducible runs.
+    """
+
+    latency: float = 0.05
+    chunks: int = 16
+    chunk_interval: float = 0.002
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 0.05
+    dimensions: int = 256
+    seed: Optional[int] = None
+
+
+class MockServer:
+    """
+    Threaded HTTP/1.1 server speaking enough of the OpenAI API for the SDK to parse its replies.
+
+    Use it as a context manager, or `start()` / `stop()` it; `url` is the base URL to give
+    a client, and `statuses` counts the replies sent by status code.
+    """
+
+    def __init__(
+        self,
+        config: Optional[MockConfig] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.config = config or MockConfig()
+        self.statuses: Counter = Counter()
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._server = Server((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="mock-openai", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *_):
+        self.stop()
+
+    def failure(self) -> Optional[int]:
+        """
+        Draws the injected failure for one request: 429, 500 or None.
+        """
+        with self._lock:
+            draw = self._random.random()
+        if draw < self.config.rate_limit_rate:
+            return 429
+        if draw < self.config.rate_limit_rate + self.config.error_rate:
+            return 500
+        return None
+
+    def count(self, status: int):
+        with self._lock:
+            self.statuses[status] += 1
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; Nagle would hold the body for a delayed ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, *_):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/stats"):
+                    with server._lock:
+                        statuses = {
+                            str(status): count
+                            for status, count in server.statuses.items()
+                        }
+                    self.reply(200, statuses)
+                else:
+                    self.reply(
+                        404,
+                        {
+                            "error": {
+                                "message": f"Unknown path {self.path}",
+                                "type": "mock",
+                            }
+                        },
+                    )
+
+            def do_POST(self):
+                body = json.loads(
+                    self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}"
+                )
+                config = server.config
+                time.sleep(config.latency)
+
+                status = server.failure()
+                if status is not None:
+                    server.count(status)
+                    headers = (
+                        {"retry-after-ms": str(int(config.retry_after * 1000))}
+                        if status == 429
+                        else {}
+                    )
+                    message = (
+                        "Rate limit exceeded" if status == 429 else "Injected failure"
+                    )
+                    self.reply(
+                        status,
+                        {"error": {"message": message, "type": "mock", "code": status}},
+                        headers,
+                    )
+                    return
+
+                server.count(200)
+                input_tokens = max(1, int(self.headers.get("content-length", 0)) // 4)
+                path = self.path.rstrip("/")
+                if path.endswith("/chat/completions"):
+                    if body.get("stream"):
+                        self.stream(chat_events(body, config, input_tokens))
+                    else:
+                        self.reply(200, chat_completion(body, config, input_tokens))
+                elif path.endswith("/responses"):
+                    if body.get("stream"):
+                        self.stream(response_events(body, config, input_tokens))
+                    else:
+                        self.reply(200, response(body, config, input_tokens))
+                elif path.endswith("/embeddings"):
+                    self.reply(200, embeddings(body, config))
+                else:
+                    self.reply(
+                        404,
+                        {
+                            "error": {
+                                "message": f"Unknown path {self.path}",
+                                "type": "mock",
+                            }
+                        },
+                    )
+
+            def reply(
+                self,
+                status: int,
+                payload: Dict[str, Any],
+                headers: Optional[Dict[str, str]] = None,
+            ):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def stream(self, events: Iterator[Optional[Dict[str, Any]]]):
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("transfer-encoding", "chunked")
+                self.end_headers()
+                interval = server.config.chunk_interval
+                for event in events:
+                    if event is None:
+                        time.sleep(interval)
+                        continue
+                    data = f"data: {json.dumps(event)}\n\n".encode()
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                data = b"data: [DONE]\n\n"
+                self.wfile.write(
+                    f"{len(data):x}\r\n".encode() + data + b"\r\n0\r\n\r\n"
+                )
+
+        return Handler
+
+
+@contextmanager
+def spawn(config: Optional[MockConfig] = None) -> Iterator[str]:
+    """
+    Runs a mock server in a child process and yields its base URL.
+
+    Benchmarks use this rather than an in-process `MockServer` so the server's threads do
+    not compete with the client under test for the GIL.
+    """
+    config = config or MockConfig()
+    options = [
+        f"--{name.replace('_', '-')}={value}"
+        for name, value in asdict(config).items()
+        if value is not None
+    ]
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_server", "--port=0", *options],
+        cwd=Path(__file__).resolve().parents[1],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert process.stdout is not None
+        line = process.stdout.readline()
+        if not line.startswith("Serving on "):
+            raise RuntimeError("Mock server failed to start")
+        yield line.split()[-1]
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def words(count: int) -> Iterator[str]:
+    for i in range(count):
+        yield ("" if i == 0 else " ") + WORDS[i % len(WORDS)]
+
+
+def chat_usage(config: MockConfig, input_tokens: int) -> Dict[str, int]:
+    return {
+        "prompt_tokens": input_tokens,
+        "completion_tokens": config.chunks,
+        "total_tokens": input_tokens + config.chunks,
+    }
+
+
+def chat_completion(
+    body: Dict[str, Any], config: MockConfig, input_tokens: int
+) -> Dict[str, Any]:
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {
+                    "role": "assistant",
+                    "content": "".join(words(config.chunks)),
+                },
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": chat_usage(config, input_tokens),
+    }
+
+
+def chat_events(
+    body: Dict[str, Any], config: MockConfig, input_tokens: int
+) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    Yields streamed chat completion chunks, with None marking a pause of `chunk_interval`.
+    """
+    base = {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+    }
+    for i, word in enumerate(words(config.chunks)):
+        if i:
+            yield None
+        yield {
+            **base,
+            "choices": [
+                {"index": 0, "delta": {"content": word}, "finish_reason": None}
+            ],
+        }
+    yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+    if (body.get("stream_options") or {}).get("include_usage"):
+        yield {**base, "choices": [], "usage": chat_usage(config, input_tokens)}
+
+
+def response(
+    body: Dict[str, Any], config: MockConfig, input_tokens: int
+) -> Dict[str, Any]:
+    return {
+        "id": "resp_mock",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": body.get("model", "mock"),
+        "status": "completed",
+        "output": [
+            {
+                "type": "message",
+                "id": "msg_mock",
+                "role": "assistant",
+                "status": "completed",
+                "content": [
+                    {
+                        "type": "output_text",
+                        "text": "".join(words(config.chunks)),
+                        "annotations": [],
+                    }
+                ],
+            }
+        ],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": config.chunks,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + config.chunks,
+        },
+    }
+
+
+def response_events(
+    body: Dict[str, Any], config: MockConfig, input_tokens: int
+) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    Yields Responses API stream events, with None marking a pause of `chunk_interval`.
+    """
+    completed = response(body, config, input_tokens)
+    started = {**completed, "status": "in_progress", "output": []}
+    yield {"type": "response.created", "sequence_number": 0, "response": started}
+    sequence = 1
+    for i, word in enumerate(words(config.chunks)):
+        if i:
+            yield None
+        yield {
+            "type": "response.output_text.delta",
+            "sequence_number": sequence,
+            "item_id": "msg_mock",
+            "output_index": 0,
+            "content_index": 0,
+            "delta": word,
+        }
+        sequence += 1
+    yield {
+        "type": "response.completed",
+        "sequence_number": sequence,
+        "response": completed,
+    }
+
+
+def embeddings(body: Dict[str, Any], config: MockConfig) -> Dict[str, Any]:
+    texts = body.get("input") or []
+    texts = [texts] if isinstance(texts, str) else texts
+    dimensions = body.get("dimensions") or config.dimensions
+    data = []
+    for i, text in enumerate(texts):
+        vector = (
+            np.random.default_rng(abs(hash(str(text))) % 2**32)
+            .standard_normal(dimensions)
+            .astype(np.float32)
+        )
+        if body.get("encoding_format") == "base64":
+            embedding: Any = base64.b64encode(vector.tobytes()).decode()
+        else:
+            embedding = vector.tolist()
+        data.append({"object": "embedding", "index": i, "embedding": embedding})
+    tokens = sum(len(str(text)) // 4 + 1 for text in texts)
+    return {
+        "object": "list",
+        "model": body.get("model", "mock"),
+        "data": data,
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=MockConfig.latency)
+    parser.add_argument("--chunks", type=int, default=MockConfig.chunks)
+    parser.add_argument(
+        "--chunk-interval", type=float, default=MockConfig.chunk_interval
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=MockConfig.retry_after)
+    parser.add_argument("--dimensions", type=int, default=MockConfig.dimensions)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        chunks=args.chunks,
+        chunk_interval=args.chunk_interval,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        dimensions=args.dimensions,
+        seed=args.seed,
+    )
+    with MockServer(config, args.host, args.port) as server:
+        print(f"Serving on {server.url}", flush=True)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,449 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+    Protocol,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+def canonical_json(payload: Any) -> str:
+    """
+    Serializes a JSON-compatible value deterministically (sorted keys, no whitespace).
+    """
+    return json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+
+
+def payload_key(payload: Dict[str, Any], namespace: str = "") -> str:
+    """
+    Returns the content address of a wire payload.
+
+    Args:
+        payload: The request payload as sent to the provider.
+        namespace: Extra scope mixed into the hash, e.g. the provider base URL.
+
+    Returns:
+        A hex SHA-256 digest.
+    """
+    digest = hashlib.sha256(namespace.encode())
+    digest.update(canonical_json(payload).encode())
+    return digest.hexdigest()
+
+
+def request_payload(request: Union[BaseModel, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Dumps a validated request model to its JSON wire payload.
+
+    `Iterable` fields such as `messages` are validated lazily by pydantic and can only be
+    consumed once, so the payload must be dumped a single time and reused for both the
+    cache key and the upstream call. Payloads that are already dumped, such as those
+    built by `completions.RequestTemplate`, are returned unchanged.
+    """
+    if isinstance(request, dict):
+        return request
+    return request.model_dump(mode="json", exclude_none=True)
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters for a cache and its single-flight group.
+
+    Attributes:
+        hits: Lookups answered from the backend.
+        misses: Lookups that went upstream.
+        coalesced: Requests that waited on an identical in-flight request instead of going upstream.
+        evictions: Entries removed for size or age.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / total if total else 0.0
+
+
+class CacheBackend(Protocol):
+    stats: CacheStats
+
+    def get(self, key: str) -> Optional[bytes]: ...
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def __len__(self) -> int: ...
+
+
+class MemoryCache:
+    """
+    Thread-safe in-process LRU cache with per-entry TTL and entry/byte bounds.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: Optional[int] = 256 * 1024 * 1024,
+        ttl: Optional[float] = None,
+    ):
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_entries: Maximum number of entries before the least recently used is evicted.
+            max_bytes: Maximum total size of stored values, or None for no byte bound.
+            ttl: Default time-to-live in seconds, or None for entries that never expire.
+        """
+        self.max_entries, self.max_bytes, self.ttl = max_entries, max_bytes, ttl
+        self.stats = CacheStats()
+        self._data: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                self._pop(key)
+                self.stats.evictions += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (value, expires)
+            self._bytes += len(value)
+            while self._data and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                self._pop(next(iter(self._data)))
+                self.stats.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _pop(self, key: str):
+        value, _ = self._data.pop(key)
+        self._bytes -= len(value)
+
+
+# The running total of stored bytes is kept by triggers, so it stays exact when several
+# processes write to the same file
+SCHEMA = """
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, expires REAL, accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache(expires) WHERE expires IS NOT NULL;
+CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO cache_size VALUES (0, (SELECT COALESCE(SUM(size), 0) FROM cache));
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_size SET bytes = bytes + new.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_size SET bytes = bytes - old.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache BEGIN
+    UPDATE cache_size SET bytes = bytes - old.size + new.size WHERE id = 0;
+END;
+COMMIT;
+"""
+
+
+class SQLiteCache:
+    """
+    On-disk cache in a single SQLite file, shared safely between threads and processes.
+
+    Entries carry an absolute expiry and a last-access time; when the stored values
+    exceed `max_bytes` the least recently accessed rows are deleted. The stored size is
+    kept as a running total and both timestamps are indexed, so a write costs O(log n)
+    plus the rows it evicts.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = ".swarm_cache.sqlite",
+        max_bytes: Optional[int] = 1024 * 1024 * 1024,
+        ttl: Optional[float] = None,
+    ):
+        """
+        Opens (and creates if needed) the cache database.
+
+        Args:
+            path: Location of the SQLite file.
+            max_bytes: Maximum total size of stored values, or None for no byte bound.
+            ttl: Default time-to-live in seconds, or None for entries that never expire.
+        """
+        self.path, self.max_bytes, self.ttl = Path(path), max_bytes, ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires = row
+            if expires is not None and expires <= now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.stats.evictions += 1
+                return None
+            self._conn.execute(
+                "UPDATE cache SET accessed = ? WHERE key = ?", (now, key)
+            )
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete skips the size triggers
+            self._conn.execute(
+                "INSERT INTO cache (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size,"
+                " expires = excluded.expires, accessed = excluded.accessed",
+                (key, value, len(value), now + ttl if ttl is not None else None, now),
+            )
+            self._evict(now)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def _evict(self, now: float):
+        """
+        Drops expired rows, then least recently accessed rows until the byte bound holds.
+        """
+        expired = self._conn.execute(
+            "DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (now,)
+        )
+        self.stats.evictions += max(expired.rowcount, 0)
+        if self.max_bytes is None:
+            return
+        while (
+            self._conn.execute("SELECT bytes FROM cache_size").fetchone()[0]
+            > self.max_bytes
+        ):
+            evicted = self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT 1)"
+            ).rowcount
+            if evicted <= 0:
+                break
+            self.stats.evictions += evicted
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is in flight
+    wait for and share its result (or exception). Works for both threads and coroutines.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._tasks: Dict[str, "asyncio.Future[Any]"] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """
+        Runs `fn` unless an identical call is already in flight.
+
+        Returns:
+            The result, and whether it was shared from another caller's execution.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        return future.result(), False
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Async counterpart of `do` for callers on one event loop.
+
+        Returns:
+            The result, and whether it was shared from another caller's execution.
+        """
+        task = self._tasks.get(key)
+        if task is not None:
+            return await asyncio.shield(task), True
+        task = self._tasks[key] = asyncio.ensure_future(fn())
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task), False
+
+
+class ResponseCache:
+    """
+    Content-addressed cache in front of the chat completions endpoint.
+
+    Requests are keyed on the canonical hash of their validated wire payload (model,
+    messages, instructions, sampling parameters, tools, ...) scoped to the client's base URL.
+    """
+
+    def __init__(
+        self, backend: Optional[CacheBackend] = None, ttl: Optional[float] = None
+    ):
+        """
+        Initializes the cache.
+
+        Args:
+            backend: Storage for serialized responses. Defaults to an in-memory LRU.
+            ttl: Time-to-live applied to stored responses, overriding the backend default.
+        """
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttl = ttl
+        self.flight = SingleFlight()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.backend.stats
+
+    def key(self, client: Any, payload: Dict[str, Any]) -> str:
+        return payload_key(payload, namespace=str(client.base_url))
+
+    def complete(self, client: Any, request: Union[BaseModel, Dict[str, Any]]) -> Any:
+        """
+        Returns the chat completion for a request, from cache when possible.
+
+        Args:
+            client: An `OpenAI` client.
+            request: A validated `BaseChatCompletions` (or subclass) instance, or its wire payload.
+
+        Returns:
+            A `ChatCompletion`.
+        """
+        from openai.types.chat import ChatCompletion
+
+        payload = request_payload(request)
+        key = self.key(client, payload)
+        cached = self.backend.get(key)
+        if cached is not None:
+            self.stats.hits += 1
+            return ChatCompletion.model_validate_json(cached)
+
+        def fetch() -> bytes:
+            response = client.chat.completions.create(**payload)
+            value = response.model_dump_json().encode()
+            self.backend.set(key, value, self.ttl)
+            return value
+
+        value, shared = self.flight.do(key, fetch)
+        self._count(shared)
+        return ChatCompletion.model_validate_json(value)
+
+    async def acomplete(
+        self, client: Any, request: Union[BaseModel, Dict[str, Any]]
+    ) -> Any:
+        """
+        Async counterpart of `complete`.
+
+        Args:
+            client: An `AsyncOpenAI` client.
+            request: A validated `BaseChatCompletions` (or subclass) instance, or its wire payload.
+
+        Returns:
+            A `ChatCompletion`.
+        """
+        from openai.types.chat import ChatCompletion
+
+        payload = request_payload(request)
+        key = self.key(client, payload)
+        cached = self.backend.get(key)
+        if cached is not None:
+            self.stats.hits += 1
+            return ChatCompletion.model_validate_json(cached)
+
+        async def fetch() -> bytes:
+            response = await client.chat.completions.create(**payload)
+            value = response.model_dump_json().encode()
+            self.backend.set(key, value, self.ttl)
+            return value
+
+        value, shared = await self.flight.ado(key, fetch)
+        self._count(shared)
+        return ChatCompletion.model_validate_json(value)
+
+    def _count(self, shared: bool):
+        if shared:
+            self.stats.coalesced += 1
+        else:
+            self.stats.misses += 1
@@ -0,0 +1,464 @@
+"""
+Indexed catalog of the models a provider lists, loaded from a JSON snapshot.
+
+The snapshot (`data/models.json`, or `SWARM_CATALOG_PATH`) holds one normalized record
+per model. It is read on the first query, and `Catalog.refresh` replaces it with
+OpenRouter's current model list. Capability queries are answered from bitsets and sorted
+arrays without building any `Model`; those are materialized only when asked for.
+
+From `libs/swarm`:
+
+    python -m catalog [--refresh] [--types reasoning] [--inputs image] [--max-price 5] [--sort price]
+"""
+
+import bisect
+import datetime
+import json
+import os
+import re
+import threading
+from functools import partial
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    get_args,
+)
+
+from models import (
+    MODEL_INPUTS,
+    MODEL_OUTPUTS,
+    MODEL_TYPES,
+    OPENROUTER_TAGS,
+    QUANTIZATIONS,
+    Model,
+    ModelRegistry,
+    Provider,
+    open_router,
+)
+
+OPENROUTER_MODELS_URL = "https://openrouter.ai/api/v1/models"
+SNAPSHOT = Path(__file__).resolve().parent / "data" / "models.json"
+
+FACETS: Dict[str, Any] = {
+    "types": MODEL_TYPES,
+    "inputs": MODEL_INPUTS,
+    "outputs": MODEL_OUTPUTS,
+    "tags": OPENROUTER_TAGS,
+    "quantizations": QUANTIZATIONS,
+}
+# Facets a model is assumed to have when its record leaves them out, as in `ModelRouter`
+IMPLIED = {"inputs": ["text"], "outputs": ["text"]}
+ORDERS = ("input_price", "output_price", "price", "context_window")
+ORDER = Literal["input_price", "output_price", "price", "context_window"]
+
+# Name tokens OpenRouter uses for its small, low-latency models
+FAST_HINTS = frozenset(
+    {"mini", "nano", "flash", "small", "haiku", "lite", "instant", "turbo"}
+)
+NAME_TOKENS = re.compile(r"[-:]")
+
+
+def members(mask: int) -> Iterator[int]:
+    """
+    Yields the positions of the set bits of a bitset, lowest first.
+    """
+    # Scanning the binary string is done in C; stepping through the int bit by bit is not
+    bits = bin(mask)[:1:-1]
+    position = bits.find("1")
+    while position != -1:
+        yield position
+        position = bits.find("1", position + 1)
+
+
+class SortedIndex:
+    """
+    Positions ordered by one numeric attribute, with a bitset per prefix for range queries.
+
+    Models without a value are left out, so they never satisfy a bound.
+    """
+
+    def __init__(self, values: Sequence[Optional[float]]):
+        self.order = sorted(
+            (i for i, v in enumerate(values) if v is not None), key=lambda i: values[i]
+        )
+        self.values = [values[i] for i in self.order]
+        self.rank = {i: rank for rank, i in enumerate(self.order)}
+        # prefixes[k] holds the first k positions in order
+        self.prefixes = [0]
+        for i in self.order:
+            self.prefixes.append(self.prefixes[-1] | (1 << i))
+
+    def at_most(self, value: float) -> int:
+        return self.prefixes[bisect.bisect_right(self.values, value)]
+
+    def at_least(self, value: float) -> int:
+        return (
+            self.prefixes[-1] & ~self.prefixes[bisect.bisect_left(self.values, value)]
+        )
+
+
+def normalize(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converts one model from OpenRouter's `/models` listing into a snapshot record.
+
+    Prices become USD per million tokens. Types are inferred: "embeddings" from the
+    output modalities, "reasoning" from the supported parameters, "grounding" from web
+    search support, "chat" for every text-in, text-out model, and "fast" for chat models whose
+    name has a token such as "mini" or "flash".
+    """
+    model_id = entry["id"]
+    architecture = entry.get("architecture") or {}
+    parameters = set(entry.get("supported_parameters") or ())
+    inputs = [
+        m
+        for m in architecture.get("input_modalities") or ["text"]
+        if m in get_args(MODEL_INPUTS)
+    ]
+    outputs = architecture.get("output_modalities") or ["text"]
+    pricing = entry.get("pricing") or {}
+
+    def per_million(key: str) -> Optional[float]:
+        value = pricing.get(key)
+        return (
+            None
+            if value in (None, "") or float(value) < 0
+            else round(float(value) * 1e6, 6)
+        )
+
+    types = []
+    if "embeddings" in outputs:
+        types.append("embeddings")
+    elif "text" in inputs and "text" in outputs:
+        types.append("chat")
+    if parameters & {"reasoning", "include_reasoning"}:
+        types.append("reasoning")
+    if (
+        "web_search_options" in parameters
+        or model_id.endswith(":online")
+        or "/sonar" in model_id
+    ):
+        types.append("grounding")
+    # Whole tokens only: "mini" is part of every "gemini" name
+    if "chat" in types and FAST_HINTS & set(
+        NAME_TOKENS.split(model_id.rsplit("/", 1)[-1])
+    ):
+        types.append("fast")
+
+    input_price, output_price = per_million("prompt"), per_million("completion")
+    tags = [tag for tag in get_args(OPENROUTER_TAGS) if model_id.endswith(f":{tag}")]
+    if "free" not in tags and input_price == 0 and output_price == 0:
+        tags.append("free")
+    return {
+        "id": model_id,
+        "types": types,
+        "inputs": inputs,
+        "outputs": [m for m in outputs if m in get_args(MODEL_OUTPUTS)],
+        "tags": tags,
+        "quantizations": [
+            q for q in entry.get("quantizations") or () if q in get_args(QUANTIZATIONS)
+        ],
+        "input_price": input_price,
+        "output_price": output_price,
+        "context_window": entry.get("context_length"),
+    }
+
+
+class Catalog:
+    """
+    Capability index over a model snapshot.
+
+    Each facet value (a type, input, output, tag or quantization) maps to a bitset with
+    one bit per model, so a query is a handful of integer ANDs. Prices and context
+    windows are kept sorted with a bitset per prefix, so bounds on them are a binary
+    search and one more AND. Matching ids come back as strings; `model` builds the
+    corresponding `Model` (and its `Provider`) on first use and caches it.
+
+    Model ids are `provider/name`, as OpenRouter lists them. `registry` exposes a query's
+    matches to `ModelRouter` under their short names.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initializes the catalog without reading the snapshot.
+
+        Args:
+            path: Snapshot file. Defaults to `SWARM_CATALOG_PATH` or the bundled `data/models.json`.
+        """
+        self.path = Path(path or os.getenv("SWARM_CATALOG_PATH") or SNAPSHOT)
+        self._records: Optional[List[Dict[str, Any]]] = None
+        self._positions: Dict[str, int] = {}
+        self._bitsets: Dict[str, Dict[str, int]] = {}
+        self._sorted: Dict[str, SortedIndex] = {}
+        self._providers_index: Dict[str, int] = {}
+        self._all = 0
+        self._models: Dict[str, Model] = {}
+        self._providers: Dict[str, Provider] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        if self._records is None:
+            self.load()
+        return self._records  # type: ignore[return-value]
+
+    def load(self):
+        """
+        Reads the snapshot and builds the indexes, dropping any materialized models.
+        """
+        with open(self.path) as f:
+            snapshot = json.load(f)
+        records = snapshot["models"] if isinstance(snapshot, dict) else snapshot
+        bitsets: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        providers: Dict[str, int] = {}
+        for position, record in enumerate(records):
+            bit = 1 << position
+            for facet in FACETS:
+                for value in record.get(facet) or IMPLIED.get(facet, ()):
+                    bitsets[facet][value] = bitsets[facet].get(value, 0) | bit
+            provider = record["id"].split("/", 1)[0]
+            providers[provider] = providers.get(provider, 0) | bit
+        prices = [
+            None
+            if r.get("input_price") is None and r.get("output_price") is None
+            else (r.get("input_price") or 0.0) + (r.get("output_price") or 0.0)
+            for r in records
+        ]
+        with self._lock:
+            self._records = records
+            self._positions = {
+                record["id"]: position for position, record in enumerate(records)
+            }
+            self._bitsets, self._providers_index = bitsets, providers
+            self._all = (1 << len(records)) - 1
+            self._sorted = {
+                "input_price": SortedIndex([r.get("input_price") for r in records]),
+                "output_price": SortedIndex([r.get("output_price") for r in records]),
+                "price": SortedIndex(prices),
+                "context_window": SortedIndex(
+                    [r.get("context_window") for r in records]
+                ),
+            }
+            self._models.clear()
+
+    def refresh(self, url: str = OPENROUTER_MODELS_URL, timeout: float = 30.0):
+        """
+        Downloads the provider's model list, rewrites the snapshot and reloads the indexes.
+
+        Raises:
+            httpx.HTTPError: If the list cannot be fetched.
+        """
+        import httpx
+
+        response = httpx.get(url, timeout=timeout)
+        response.raise_for_status()
+        snapshot = {
+            "source": url,
+            "fetched": datetime.datetime.now(datetime.timezone.utc).isoformat(
+                timespec="seconds"
+            ),
+            "models": [normalize(entry) for entry in response.json()["data"]],
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix(".tmp")
+        with open(temporary, "w") as f:
+            json.dump(snapshot, f, indent=1)
+        os.replace(temporary, self.path)
+        self.load()
+
+    def mask(
+        self,
+        types: Optional[Iterable[MODEL_TYPES]] = None,
+        inputs: Optional[Iterable[MODEL_INPUTS]] = None,
+        outputs: Optional[Iterable[MODEL_OUTPUTS]] = None,
+        tags: Optional[Iterable[OPENROUTER_TAGS]] = None,
+        quantizations: Optional[Iterable[QUANTIZATIONS]] = None,
+        providers: Optional[Iterable[str]] = None,
+        max_input_price: Optional[float] = None,
+        max_output_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_context: Optional[int] = None,
+    ) -> int:
+        """
+        Returns the bitset of models matching a query.
+
+        Every value listed for `types`, `inputs`, `outputs` and `tags` is required; any one
+        of `quantizations` or `providers` suffices. Prices are USD per million tokens, with
+        `max_price` bounding input plus output, and models without a price or context
+        window never satisfy a bound on it.
+        """
+        if self._records is None:
+            self.load()
+        result = self._all
+        for facet, values in (
+            ("types", types),
+            ("inputs", inputs),
+            ("outputs", outputs),
+            ("tags", tags),
+        ):
+            for value in values or ():
+                result &= self._bitsets[facet].get(value, 0)
+        if quantizations is not None:
+            result &= self._union(self._bitsets["quantizations"], quantizations)
+        if providers is not None:
+            result &= self._union(self._providers_index, providers)
+        for order, bound in (
+            ("input_price", max_input_price),
+            ("output_price", max_output_price),
+            ("price", max_price),
+        ):
+            if bound is not None:
+                result &= self._sorted[order].at_most(bound)
+        if min_context is not None:
+            result &= self._sorted["context_window"].at_least(min_context)
+        return result
+
+    def find(
+        self,
+        sort: Optional[ORDER] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        **query: Any,
+    ) -> List[str]:
+        """
+        Returns the ids of the models matching a query (see `mask`), optionally sorted.
+
+        Args:
+            sort: Attribute to order by; models without it come last. Snapshot order if omitted.
+            descending: Largest first, e.g. for the longest context window.
+            limit: Maximum number of ids.
+        """
+        mask = self.mask(**query)
+        records = self.records
+        if sort is None:
+            positions = list(members(mask))
+        else:
+            index = self._sorted[sort]
+            positions = sorted(
+                members(mask & index.prefixes[-1]),
+                key=index.rank.__getitem__,
+                reverse=descending,
+            )
+            positions.extend(members(mask & ~index.prefixes[-1]))
+        return [records[i]["id"] for i in positions[:limit]]
+
+    def count(self, **query: Any) -> int:
+        return self.mask(**query).bit_count()
+
+    def record(self, model_id: str) -> Dict[str, Any]:
+        """
+        Returns the raw snapshot record of a model.
+
+        Raises:
+            KeyError: If the model is not in the snapshot.
+        """
+        return self.records[self._positions[model_id]]
+
+    def model(self, model_id: str) -> Model:
+        """
+        Returns the `Model` for an id, building and caching it (and its `Provider`) on first use.
+
+        Raises:
+            KeyError: If the model is not in the snapshot.
+        """
+        model = self._models.get(model_id)
+        if model is not None:
+            return model
+        record = self.record(model_id)
+        name = model_id.split("/", 1)[0]
+        provider = self._providers.get(name)
+        if provider is None:
+            provider = self._providers.setdefault(name, open_router(name=name))
+        model = Model(
+            provider=provider,
+            types=record.get("types") or None,
+            inputs=record.get("inputs") or None,
+            outputs=record.get("outputs") or None,
+            tags=record.get("tags") or None,
+            input_price=record.get("input_price"),
+            output_price=record.get("output_price"),
+            context_window=record.get("context_window"),
+        )
+        return self._models.setdefault(model_id, model)
+
+    def registry(self, **query: Any) -> ModelRegistry:
+        """
+        Returns the models matching a query as a lazy `ModelRegistry` keyed by short name, for `ModelRouter`.
+
+        When two providers list the same short name, the first in snapshot order is kept.
+        """
+        factories: Dict[str, Any] = {}
+        for model_id in self.find(**query):
+            factories.setdefault(
+                model_id.split("/", 1)[-1], partial(self.model, model_id)
+            )
+        return ModelRegistry(factories)
+
+    def __contains__(self, model_id: object) -> bool:
+        if self._records is None:
+            self.load()
+        return model_id in self._positions
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[str]:
+        return (record["id"] for record in self.records)
+
+    @staticmethod
+    def _union(index: Dict[str, int], values: Iterable[str]) -> int:
+        result = 0
+        for value in values:
+            result |= index.get(value, 0)
+        return result
+
+
+catalog = Catalog()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query the model catalog")
+    parser.add_argument(
+        "--refresh", action="store_true", help="Download the current model list first"
+    )
+    parser.add_argument("--types", nargs="+", choices=get_args(MODEL_TYPES))
+    parser.add_argument("--inputs", nargs="+", choices=get_args(MODEL_INPUTS))
+    parser.add_argument("--outputs", nargs="+", choices=get_args(MODEL_OUTPUTS))
+    parser.add_argument("--tags", nargs="+", choices=get_args(OPENROUTER_TAGS))
+    parser.add_argument("--providers", nargs="+")
+    parser.add_argument(
+        "--max-price", type=float, help="USD per million input plus output tokens"
+    )
+    parser.add_argument("--min-context", type=int)
+    parser.add_argument("--sort", choices=ORDERS)
+    parser.add_argument("--descending", action="store_true")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.refresh:
+        catalog.refresh()
+    query = {
+        "types": args.types,
+        "inputs": args.inputs,
+        "outputs": args.outputs,
+        "tags": args.tags,
+        "providers": args.providers,
+        "max_price": args.max_price,
+        "min_context": args.min_context,
+    }
+    ids = catalog.find(args.sort, args.descending, args.limit, **query)
+    print(f"{catalog.count(**query)} of {len(catalog)} models match")
+    for model_id in ids:
+        record = catalog.record(model_id)
+        print(
+            f"  {model_id:<48} {','.join(record['types']):<28} "
+            f"in {record['input_price']!s:>8}  out {record['output_price']!s:>8}  ctx {record['context_window']}"
+        )
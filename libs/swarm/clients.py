@@ -0,0 +1,330 @@
+import atexit
+import importlib.util
+import os
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from loguru import logger
+from openai import DEFAULT_MAX_RETRIES, AsyncOpenAI, OpenAI
+
+from models import OPENROUTER_MODELS, PROVIDER, Provider
+from ratelimit import (
+    AsyncRateLimitedTransport,
+    Limiter,
+    RateLimitedTransport,
+    RetryPolicy,
+    limits_from_env,
+)
+from telemetry import telemetry
+
+ClientKey = Tuple[Optional[str], Optional[str]]
+
+
+@lru_cache(maxsize=None)
+def h2_available() -> bool:
+    """
+    Whether the `h2` package httpx needs for HTTP/2 is installed, warning once if not.
+    """
+    if importlib.util.find_spec("h2") is not None:
+        return True
+    logger.warning(
+        "HTTP/2 requested but h2 is not installed; using HTTP/1.1. Install httpx[http2]."
+    )
+    return False
+
+
+def resolve(model_name: str) -> Tuple[Optional[Provider], str]:
+    """
+    Maps a registry model name to its provider and routed model slug.
+
+    Names that are not in `OPENROUTER_MODELS` are returned unchanged with no provider,
+    which selects the SDK's environment defaults.
+    """
+    model = OPENROUTER_MODELS.get(model_name)
+    if model is None:
+        return None, model_name
+    return model.provider, f"{model.provider.name}/{model_name}"
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """
+    Connection pool and timeout settings shared by every client in a registry.
+
+    Attributes:
+        max_connections: Upper bound on open sockets per pool.
+        max_keepalive_connections: Idle sockets kept warm for reuse.
+        keepalive_expiry: Seconds an idle socket is kept before being closed.
+        connect_timeout: Seconds allowed for TCP + TLS setup.
+        read_timeout: Seconds allowed between received bytes; long to accommodate reasoning models.
+        write_timeout: Seconds allowed to send the request body.
+        pool_timeout: Seconds to wait for a free connection before failing.
+        http2: Negotiate HTTP/2; falls back to HTTP/1.1, with a warning, when `h2` is missing.
+        rate_limit: Admit requests through a per-endpoint `ratelimit.Limiter`, which also takes over retries from the SDK.
+        max_retries: Retries after a retryable failure.
+    """
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 600.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 30.0
+    http2: bool = True
+    rate_limit: bool = True
+    max_retries: int = DEFAULT_MAX_RETRIES
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        """
+        Builds a config from `SWARM_HTTP_*` environment variables, falling back to the defaults.
+        """
+        defaults = cls()
+        return cls(
+            max_connections=int(
+                os.getenv("SWARM_HTTP_MAX_CONNECTIONS", defaults.max_connections)
+            ),
+            max_keepalive_connections=int(
+                os.getenv(
+                    "SWARM_HTTP_MAX_KEEPALIVE", defaults.max_keepalive_connections
+                )
+            ),
+            keepalive_expiry=float(
+                os.getenv("SWARM_HTTP_KEEPALIVE_EXPIRY", defaults.keepalive_expiry)
+            ),
+            connect_timeout=float(
+                os.getenv("SWARM_HTTP_CONNECT_TIMEOUT", defaults.connect_timeout)
+            ),
+            read_timeout=float(
+                os.getenv("SWARM_HTTP_READ_TIMEOUT", defaults.read_timeout)
+            ),
+            write_timeout=float(
+                os.getenv("SWARM_HTTP_WRITE_TIMEOUT", defaults.write_timeout)
+            ),
+            pool_timeout=float(
+                os.getenv("SWARM_HTTP_POOL_TIMEOUT", defaults.pool_timeout)
+            ),
+            http2=os.getenv("SWARM_HTTP2", "1") != "0",
+            rate_limit=os.getenv("SWARM_RATE_LIMIT", "1") != "0",
+            max_retries=int(os.getenv("SWARM_MAX_RETRIES", defaults.max_retries)),
+        )
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+    @property
+    def use_http2(self) -> bool:
+        """
+        Whether HTTP/2 is both requested and available; httpx raises at construction time without `h2`.
+        """
+        return self.http2 and h2_available()
+
+
+class ClientRegistry:
+    """
+    Hands out one long-lived sync and async OpenAI client per (base_url, api_key).
+
+    All `Provider` partials pointing at the same endpoint share a client and therefore
+    its keep-alive pool, so switching models does not pay for a fresh TLS handshake.
+    Clients are created on first use and closed by `close()`. The local provider gets
+    the in-process client from `local_inference`, which serves the same call shapes.
+    With telemetry enabled, the HTTP clients count retries per provider.
+
+    Unless `PoolConfig.rate_limit` is off, both clients for an endpoint send through one
+    shared `Limiter`, which admits requests within the provider's concurrency, requests/min
+    and tokens/min budgets and retries 429s and server errors with decorrelated jitter.
+    """
+
+    def __init__(self, config: Optional[PoolConfig] = None):
+        """
+        Initializes an empty registry.
+
+        Args:
+            config: Pool and timeout settings applied to every client created by this registry.
+        """
+        self.config = config or PoolConfig.from_env()
+        self._sync: Dict[ClientKey, OpenAI] = {}
+        self._async: Dict[ClientKey, AsyncOpenAI] = {}
+        self._limiters: Dict[ClientKey, Limiter] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(provider: Optional[Provider]) -> ClientKey:
+        """
+        Returns the registry key for a provider; `None` means the SDK's environment defaults.
+        """
+        if provider is None:
+            return (None, None)
+        return (provider.base_url, provider.api_key)
+
+    def limiter(self, provider: Optional[Provider] = None) -> Limiter:
+        """
+        Returns the limiter shared by every client for a provider's endpoint.
+
+        Budgets come from the provider's `rpm`/`tpm`, else `SWARM_RPM`/`SWARM_TPM`, else
+        whatever the endpoint advertises in its rate-limit headers.
+        """
+        key = self.key(provider)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            rpm, tpm = limits_from_env()
+            if provider is not None:
+                rpm, tpm = provider.rpm or rpm, provider.tpm or tpm
+            limiter = self._limiters.setdefault(key, Limiter(rpm, tpm))
+        return limiter
+
+    def transport(
+        self, provider: Optional[Provider], asynchronous: bool = False
+    ) -> Any:
+        """
+        Builds the pooled HTTP transport for a provider's client, rate limited unless disabled.
+        """
+        options = {"limits": self.config.limits, "http2": self.config.use_http2}
+        if asynchronous:
+            inner: Any = httpx.AsyncHTTPTransport(**options)
+        else:
+            inner = httpx.HTTPTransport(**options)
+        if not self.config.rate_limit:
+            return inner
+        name = provider.name if provider is not None else None
+        wrapper = AsyncRateLimitedTransport if asynchronous else RateLimitedTransport
+        return wrapper(
+            self.limiter(provider),
+            inner,
+            RetryPolicy(max_retries=self.config.max_retries),
+            on_retry=lambda: telemetry.retried(name),
+        )
+
+    def get(self, provider: Optional[Provider] = None) -> OpenAI:
+        """
+        Returns the shared synchronous client for a provider, creating it on first use.
+
+        Args:
+            provider: The provider whose endpoint and credentials to use.
+
+        Returns:
+            A pooled `OpenAI` client.
+        """
+        if provider is not None and provider.name == PROVIDER.LOCAL:
+            from local_inference import runtime
+
+            return runtime.client  # type: ignore
+        key = self.key(provider)
+        client = self._sync.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            if key not in self._sync:
+                base_url, api_key = key
+                self._sync[key] = OpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    timeout=self.config.timeout,
+                    max_retries=0
+                    if self.config.rate_limit
+                    else self.config.max_retries,
+                    http_client=httpx.Client(
+                        timeout=self.config.timeout,
+                        transport=self.transport(provider),
+                        event_hooks=telemetry.retry_hooks(provider and provider.name),
+                    ),
+                )
+            return self._sync[key]
+
+    def get_async(self, provider: Optional[Provider] = None) -> AsyncOpenAI:
+        """
+        Returns the shared asynchronous client for a provider, creating it on first use.
+
+        The underlying `httpx.AsyncClient` binds its connections to the event loop that
+        first uses them, so a registry's async clients should be used from a single loop.
+
+        Args:
+            provider: The provider whose endpoint and credentials to use.
+
+        Returns:
+            A pooled `AsyncOpenAI` client.
+        """
+        if provider is not None and provider.name == PROVIDER.LOCAL:
+            from local_inference import runtime
+
+            return runtime.async_client  # type: ignore
+        key = self.key(provider)
+        client = self._async.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            if key not in self._async:
+                base_url, api_key = key
+                self._async[key] = AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    timeout=self.config.timeout,
+                    max_retries=0
+                    if self.config.rate_limit
+                    else self.config.max_retries,
+                    http_client=httpx.AsyncClient(
+                        timeout=self.config.timeout,
+                        transport=self.transport(provider, asynchronous=True),
+                        event_hooks=telemetry.retry_hooks(
+                            provider and provider.name, asynchronous=True
+                        ),
+                    ),
+                )
+            return self._async[key]
+
+    def close(self):
+        """
+        Closes every synchronous client and drops all cached clients.
+        """
+        with self._lock:
+            for client in self._sync.values():
+                client.close()
+            self._sync.clear()
+            self._async.clear()
+
+    async def aclose(self):
+        """
+        Closes every asynchronous client, then the synchronous ones.
+        """
+        with self._lock:
+            clients = list(self._async.values())
+            self._async.clear()
+        for client in clients:
+            await client.close()
+        self.close()
+
+
+registry = ClientRegistry()
+atexit.register(registry.close)
+
+
+def get_client(provider: Optional[Provider] = None) -> OpenAI:
+    """
+    Returns the process-wide pooled synchronous client for a provider.
+    """
+    return registry.get(provider)
+
+
+def get_async_client(provider: Optional[Provider] = None) -> AsyncOpenAI:
+    """
+    Returns the process-wide pooled asynchronous client for a provider.
+    """
+    return registry.get_async(provider)
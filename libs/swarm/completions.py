@@ -0,0 +1,156 @@
+from typing import Any, Dict, Iterable, List, Literal, Optional, Type, Union
+
+from openai.types.chat import (
+    ChatCompletionMessageParam,
+    ChatCompletionModality,
+    ChatCompletionAudioParam,
+    ChatCompletionReasoningEffort,
+    ChatCompletionPredictionContentParam,
+    ChatCompletionStreamOptionsParam,
+    ChatCompletionToolChoiceOptionParam,
+    ChatCompletionToolParam,
+    completion_create_params,
+)
+from openai.types.chat_model import ChatModel
+from openai.types.shared import Metadata
+from pydantic import BaseModel, Field, TypeAdapter, field_validator, ValidationInfo
+
+from cache import request_payload
+from models import REASONING_MODELS
+
+
+class BaseChatCompletions(BaseModel):
+    messages: Iterable[ChatCompletionMessageParam]
+    model: Union[str, ChatModel]
+    audio: Optional[ChatCompletionAudioParam] = None
+    frequency_penalty: Optional[float] = Field(ge=-2.0, le=2.0, default=0)
+    function_call: Optional[completion_create_params.FunctionCall] = None
+    functions: Optional[Iterable[completion_create_params.Function]] = None
+    logit_bias: Optional[Dict[str, int]] = None
+    logprobs: Optional[bool] = None
+    max_completion_tokens: Optional[int] = None
+    max_tokens: Optional[int] = None
+    metadata: Optional[Metadata] = None
+    modalities: Optional[List[ChatCompletionModality]] = None
+    n: Optional[int] = 1
+    parallel_tool_calls: Optional[bool] = None
+    prediction: Optional[ChatCompletionPredictionContentParam] = None
+    presence_penalty: Optional[float] = Field(ge=-2.0, le=2.0, default=0)
+    reasoning_effort: Optional[ChatCompletionReasoningEffort] = None
+    response_format: Optional[completion_create_params.ResponseFormat] = None
+    seed: Optional[int] = None
+    service_tier: Optional[Literal["auto", "default"]] = None
+    stop: Union[Optional[str], List[str]] = None
+    store: Optional[bool] = None
+    stream: Optional[Literal[False]] = None
+    stream_options: Optional[ChatCompletionStreamOptionsParam] = None
+    temperature: Optional[float] = None
+    tool_choice: Optional[ChatCompletionToolChoiceOptionParam] = None
+    tools: Optional[Iterable[ChatCompletionToolParam]] = None
+    top_logprobs: Optional[int] = None
+    top_p: Optional[float] = None
+    user: Optional[str] = None
+
+    @field_validator("reasoning_effort", mode="after")
+    @classmethod
+    def check_reasoning_effort(cls, v: str, info: ValidationInfo) -> str:
+        """
+        Validates that the reasoning_effort parameter is only set for supported models.
+
+        Raises:
+            ValueError: If reasoning_effort is provided for a model not in REASONING_MODELS.
+        """
+        if v and info.data["model"] not in REASONING_MODELS:
+            raise ValueError(
+                f"Model {info.data['model']} does not support reasoning_effort"
+            )
+        return v
+
+
+class PPLXChatCompletions(BaseChatCompletions):
+    search_domain_filter: Optional[List[str]] = None
+    return_images: Optional[bool] = None
+    return_related_questions: Optional[bool] = None
+    search_recency_filter: Optional[Literal["day", "week", "month", "hour"]] = None
+    top_k: Optional[int] = Field(ge=0, le=2048, default=0)
+
+
+_messages: Optional[TypeAdapter] = None
+
+
+def messages_adapter() -> TypeAdapter:
+    """
+    Returns the shared validator for a list of chat messages, building it on first use.
+    """
+    global _messages
+    if _messages is None:
+        _messages = TypeAdapter(List[ChatCompletionMessageParam])
+    return _messages
+
+
+class RequestTemplate:
+    """
+    Chat completion parameters validated once and reused for every call.
+
+    Validating a full `BaseChatCompletions` re-checks every field, runs the model-level
+    validators and walks the large OpenAI unions on each call, even though in most hot
+    paths only `messages` changes. A template validates and dumps the static parameters
+    once; `payload()` then merges in the messages and returns the wire payload directly.
+
+    Messages are sent exactly as given. A full `model_dump` can instead drop multi-part
+    message content, because pydantic consumes those lazily validated iterables while
+    matching the message union.
+    """
+
+    def __init__(
+        self,
+        request_type: Type[BaseChatCompletions] = BaseChatCompletions,
+        validate_messages: bool = True,
+        **params: Any,
+    ):
+        """
+        Validates the static parameters.
+
+        Args:
+            request_type: Request model the parameters are validated against.
+            validate_messages: Validate each call's messages. Turn off only for messages built by trusted code.
+            **params: Every request parameter except `messages`.
+
+        Raises:
+            pydantic.ValidationError: If the parameters are invalid for `request_type`.
+        """
+        request = request_type.model_validate({**params, "messages": []})
+        self.request_type = request_type
+        self.validate_messages = validate_messages
+        self.params = request_payload(request)
+        del self.params["messages"]
+
+    def payload(self, messages: Iterable[ChatCompletionMessageParam]) -> Dict[str, Any]:
+        """
+        Returns the wire payload for one call.
+
+        Args:
+            messages: The conversation to send.
+
+        Returns:
+            A new dict ready for `client.chat.completions.create(**payload)`, or `ResponseCache.complete`.
+
+        Raises:
+            pydantic.ValidationError: If `validate_messages` is set and a message is malformed.
+        """
+        if not isinstance(messages, list):
+            messages = list(messages)
+        if self.validate_messages:
+            # This checks what `model_validate` checks. Multi-part content is an `Iterable`
+            # that pydantic validates lazily and union matching consumes, so the validated
+            # copy is discarded and the caller's messages are sent.
+            messages_adapter().validate_python(messages)
+        return {**self.params, "messages": messages}
+
+    def replace(self, **params: Any) -> "RequestTemplate":
+        """
+        Returns a new template with some static parameters changed, validated again.
+        """
+        return RequestTemplate(
+            self.request_type, self.validate_messages, **{**self.params, **params}
+        )
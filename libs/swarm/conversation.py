@@ -0,0 +1,290 @@
+import json
+import os
+import threading
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from models import Model, Provider
+
+DEFAULT_BUDGET = 32_768
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+SUMMARIZE_INSTRUCTIONS = (
+    "Summarize the following conversation for your own future reference. Keep every"
+    " decision, requirement, open question, name, number and code identifier; drop"
+    " pleasantries and repetition. Respond with the summary only."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (about four characters per token) used until the provider reports usage.
+    """
+    return len(text) // 4 + 1
+
+
+def default_budget(model: Optional[Model]) -> int:
+    """
+    Returns the history budget for a model: 75% of its context window, capped by `SWARM_CONTEXT_BUDGET`.
+
+    The cap keeps long conversations on million-token models from resending (and paying for)
+    the whole transcript every turn.
+    """
+    cap = int(os.getenv("SWARM_CONTEXT_BUDGET", DEFAULT_BUDGET))
+    if model is None or not model.context_window:
+        return cap
+    return min(int(model.context_window * 0.75), cap)
+
+
+def supports_previous_response(provider: Optional[Provider]) -> bool:
+    """
+    Whether a provider keeps Responses API state server-side, so turns can be chained by id.
+    """
+    if provider is None:
+        return True
+    return bool(provider.base_url) and "api.openai.com" in provider.base_url
+
+
+@dataclass
+class Message:
+    seq: int
+    role: str
+    content: str
+    tokens: int
+
+
+class ConversationStore:
+    """
+    Append-only JSONL journal of conversation events.
+
+    Every turn appends a few small records; nothing is ever rewritten. A conversation is
+    rebuilt by replaying its records, where a compaction record replaces the leading
+    messages it folded into a summary.
+    """
+
+    def __init__(self, path: Union[str, Path, None] = None):
+        """
+        Opens the journal, creating it on first write.
+
+        Args:
+            path: Journal location. Defaults to `SWARM_CONVERSATIONS_PATH` or `conversations.jsonl` at the repository root.
+        """
+        default = Path(__file__).resolve().parents[2] / "conversations.jsonl"
+        self.path = Path(path or os.getenv("SWARM_CONVERSATIONS_PATH", default))
+        self._file = None
+        self._lock = threading.Lock()
+
+    def append(self, record: Dict[str, Any]):
+        with self._lock:
+            if self._file is None:
+                self._file = self.path.open("a", encoding="utf-8")
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def load(self, conversation_id: str) -> List[Dict[str, Any]]:
+        """
+        Returns every record of one conversation, in write order, skipping a torn last line.
+        """
+        if not self.path.exists():
+            return []
+        records = []
+        with self.path.open(encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                record = json.loads(line)
+                if record.get("conversation") == conversation_id:
+                    records.append(record)
+        return records
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+@dataclass
+class Conversation:
+    """
+    Multi-turn memory for the Responses API.
+
+    On providers that keep server-side state, turns are chained with `previous_response_id`
+    and only the new user input is sent. Elsewhere the history is kept locally with a
+    running token count; once it exceeds the budget, the oldest turns are folded into a
+    summary so each request stays under the model's budget. Every change is appended
+    to the store, so a conversation resumes where it left off.
+
+    Attributes:
+        store: Journal the conversation is persisted to.
+        conversation_id: Key of this conversation in the journal.
+        budget: Token budget for the history sent with each turn.
+        stateful: Chain turns by response id instead of resending history.
+        keep_recent: Number of most recent messages never folded into the summary.
+        summarizer: Turns a list of `{"role", "content"}` messages into a summary string.
+    """
+
+    store: ConversationStore
+    conversation_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    budget: int = DEFAULT_BUDGET
+    stateful: bool = False
+    keep_recent: int = 4
+    summarizer: Optional[Callable[[List[Dict[str, str]]], str]] = None
+    messages: List[Message] = field(default_factory=list, init=False)
+    tokens: int = field(default=0, init=False)
+    previous_response_id: Optional[str] = field(default=None, init=False)
+    _seq: int = field(default=0, init=False, repr=False)
+    _detached: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self):
+        """
+        Replays the conversation's journal records, if any.
+        """
+        for record in self.store.load(self.conversation_id):
+            self._seq = max(self._seq, record["seq"])
+            if record["type"] == "message":
+                self.messages.append(
+                    Message(
+                        record["seq"],
+                        record["role"],
+                        record["content"],
+                        record["tokens"],
+                    )
+                )
+                self._detached = record["role"] == "assistant"
+            elif record["type"] == "compaction":
+                del self.messages[: record["folded"]]
+                self.messages.insert(
+                    0,
+                    Message(
+                        record["seq"],
+                        "user",
+                        SUMMARY_PREFIX + record["summary"],
+                        record["tokens"],
+                    ),
+                )
+            elif record["type"] == "response":
+                self.previous_response_id = record["response_id"]
+                self._detached = False
+        self.tokens = sum(m.tokens for m in self.messages)
+
+    def prepare(self, user_input: str) -> Dict[str, Any]:
+        """
+        Records the user's turn and returns the `input` arguments for `responses.create`.
+
+        Args:
+            user_input: The new user message.
+
+        Returns:
+            `input` (and `previous_response_id` when chaining) to merge into the request.
+        """
+        self._add("user", user_input)
+        if self.stateful and not self._detached:
+            request: Dict[str, Any] = {"input": user_input, "store": True}
+            if self.previous_response_id:
+                request["previous_response_id"] = self.previous_response_id
+            return request
+
+        if self.tokens > self.budget:
+            self.compact()
+        request = {
+            "input": [{"role": m.role, "content": m.content} for m in self.messages]
+        }
+        if self.stateful:
+            # The server's chain is missing a turn answered locally; resend the history
+            # once and chain from the response it produces.
+            request["store"] = True
+        return request
+
+    def commit(
+        self,
+        output_text: str,
+        response_id: Optional[str] = None,
+        input_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None,
+    ):
+        """
+        Records the assistant's reply and reconciles the token count with reported usage.
+
+        A reply without a response id (e.g. served from a cache) is not part of the
+        server-side chain, so a stateful conversation resends its history next turn.
+
+        Args:
+            output_text: The assistant's full answer.
+            response_id: Id of the response, used to chain the next turn.
+            input_tokens: Input tokens the provider billed for this turn.
+            output_tokens: Output tokens the provider billed for this turn.
+        """
+        self._add("assistant", output_text, output_tokens)
+        self._detached = not response_id
+        if response_id:
+            self.previous_response_id = response_id
+            self._append({"type": "response", "response_id": response_id})
+        if input_tokens is not None and not self.stateful:
+            self.tokens = input_tokens + (output_tokens or self.messages[-1].tokens)
+
+    def compact(self):
+        """
+        Folds everything but the `keep_recent` most recent messages into one summary message.
+
+        Raises:
+            RuntimeError: If no summarizer was configured.
+        """
+        if self.summarizer is None:
+            raise RuntimeError(
+                "Conversation exceeds its budget and no summarizer is configured"
+            )
+        old, recent = (
+            self.messages[: -self.keep_recent],
+            self.messages[-self.keep_recent :],
+        )
+        if not old:
+            return
+        summary = self.summarizer([{"role": m.role, "content": m.content} for m in old])
+        self._seq += 1
+        tokens = estimate_tokens(summary)
+        self._append(
+            {
+                "type": "compaction",
+                "folded": len(old),
+                "summary": summary,
+                "tokens": tokens,
+            }
+        )
+        self.messages = [
+            Message(self._seq, "user", SUMMARY_PREFIX + summary, tokens),
+            *recent,
+        ]
+        self.tokens = sum(m.tokens for m in self.messages)
+
+    def _add(self, role: str, content: str, tokens: Optional[int] = None):
+        self._seq += 1
+        tokens = tokens or estimate_tokens(content)
+        self.messages.append(Message(self._seq, role, content, tokens))
+        self.tokens += tokens
+        self._append(
+            {"type": "message", "role": role, "content": content, "tokens": tokens}
+        )
+
+    def _append(self, record: Dict[str, Any]):
+        self.store.append(
+            {"conversation": self.conversation_id, "seq": self._seq, **record}
+        )
+
+
+def response_summarizer(
+    client: Any, model: str
+) -> Callable[[List[Dict[str, str]]], str]:
+    """
+    Returns a summarizer that asks `model` to compress a list of messages.
+    """
+
+    def summarize(messages: List[Dict[str, str]]) -> str:
+        transcript = "\n\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        response = client.responses.create(
+            model=model, instructions=SUMMARIZE_INSTRUCTIONS, input=transcript
+        )
+        return response.output_text
+
+    return summarize
@@ -0,0 +1,368 @@
+import asyncio
+import base64
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Iterator, List, Literal, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from conversation import estimate_tokens
+
+DEFAULT_MODEL = "text-embedding-3-small"
+# OpenAI's per-request limits for the embeddings endpoint
+MAX_INPUTS = 2048
+MAX_TOKENS = 300_000
+
+DTYPES = {"float32": np.float32, "int8": np.int8}
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scales each row to unit length so a dot product is the cosine similarity.
+    """
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+def quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-row int8 quantization.
+
+    Returns:
+        The int8 rows and the float32 scale of each row, so that `rows * scale ≈ vectors`.
+    """
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1.0
+    rows = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return rows, scales.astype(np.float32)
+
+
+class EmbeddingBatcher:
+    """
+    Embeds texts in as few provider calls as the endpoint's limits allow.
+
+    Texts are packed, in order, into requests of at most `max_inputs` texts and
+    `max_tokens` estimated tokens. Vectors are requested base64-encoded and decoded
+    straight into a float32 matrix instead of through lists of Python floats.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        model: Optional[str] = None,
+        dimensions: Optional[int] = None,
+        max_inputs: int = MAX_INPUTS,
+        max_tokens: int = MAX_TOKENS,
+        concurrency: int = 4,
+    ):
+        """
+        Initializes the batcher.
+
+        Args:
+            client: An `OpenAI` or `AsyncOpenAI` client. Defaults to the pooled client of the model's provider.
+            model: Registry name or provider model id. Defaults to `SWARM_EMBEDDING_MODEL` or `text-embedding-3-small`.
+            dimensions: Output dimensions, for models that support shortening.
+            max_inputs: Most texts sent in one request.
+            max_tokens: Most estimated tokens sent in one request.
+            concurrency: Requests in flight at once in `aembed`.
+        """
+        self.client = client
+        self.model = model or os.getenv("SWARM_EMBEDDING_MODEL", DEFAULT_MODEL)
+        self.dimensions = dimensions
+        self.max_inputs = max_inputs
+        self.max_tokens = max_tokens
+        self.concurrency = concurrency
+
+    def batches(self, texts: Sequence[str]) -> Iterator[Tuple[int, int]]:
+        """
+        Yields the `(start, stop)` slices of `texts` sent as one request each.
+        """
+        start, tokens = 0, 0
+        for i, text in enumerate(texts):
+            cost = estimate_tokens(text)
+            if i > start and (
+                i - start >= self.max_inputs or tokens + cost > self.max_tokens
+            ):
+                yield start, i
+                start, tokens = i, 0
+            tokens += cost
+        if start < len(texts):
+            yield start, len(texts)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embeds texts synchronously.
+
+        Returns:
+            A `(len(texts), dimensions)` float32 matrix, in input order.
+        """
+        from clients import get_client, resolve
+
+        provider, model = resolve(self.model)
+        client = self.client or get_client(provider)
+        parts = [
+            self._decode(client.embeddings.create(**self._request(model, texts[a:b])))
+            for a, b in self.batches(texts)
+        ]
+        return (
+            np.concatenate(parts)
+            if parts
+            else np.empty((0, self.dimensions or 0), np.float32)
+        )
+
+    async def aembed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embeds texts with up to `concurrency` requests in flight.
+
+        Returns:
+            A `(len(texts), dimensions)` float32 matrix, in input order.
+        """
+        from clients import get_async_client, resolve
+
+        provider, model = resolve(self.model)
+        client = self.client or get_async_client(provider)
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def send(a: int, b: int) -> np.ndarray:
+            async with slots:
+                request = self._request(model, texts[a:b])
+                return self._decode(await client.embeddings.create(**request))
+
+        parts = await asyncio.gather(*(send(a, b) for a, b in self.batches(texts)))
+        return (
+            np.concatenate(parts)
+            if parts
+            else np.empty((0, self.dimensions or 0), np.float32)
+        )
+
+    def _request(self, model: str, texts: Sequence[str]) -> dict:
+        request = {"model": model, "input": list(texts), "encoding_format": "base64"}
+        if self.dimensions is not None:
+            request["dimensions"] = self.dimensions
+        return request
+
+    @staticmethod
+    def _decode(response: Any) -> np.ndarray:
+        rows = sorted(response.data, key=lambda item: item.index)
+        return np.stack(
+            [
+                np.frombuffer(base64.b64decode(row.embedding), dtype=np.float32)
+                if isinstance(row.embedding, str)
+                else np.asarray(row.embedding, dtype=np.float32)
+                for row in rows
+            ]
+        )
+
+
+class VectorStore:
+    """
+    Append-only, memory-mapped store of unit-normalized vectors.
+
+    A store is a directory holding:
+
+    - `vectors.bin`: the raw row-major matrix, float32 or int8.
+    - `scales.bin`: one float32 scale per row, for int8 stores.
+    - `ids.txt`: one id per line, in row order; it is written last and is the commit record.
+    - `meta.json`: dimensions and dtype.
+
+    Rows are only ever appended, so a crash can at worst leave a partly written batch
+    past the last committed id; it is truncated the next time the store is opened.
+    Searches scan the matrix through `np.memmap` in chunks of at most `chunk_bytes`,
+    so memory use stays bounded however many rows are stored.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        dimensions: Optional[int] = None,
+        dtype: Literal["float32", "int8"] = "float32",
+        chunk_bytes: int = 64 << 20,
+    ):
+        """
+        Opens a store, creating it if `dimensions` is given and it does not exist.
+
+        Args:
+            path: Directory of the store.
+            dimensions: Vector size; required to create a store, checked against an existing one.
+            dtype: Row encoding for a new store. `int8` is four times smaller at a small cost in recall.
+            chunk_bytes: Upper bound on the matrix bytes scored at once during a search.
+
+        Raises:
+            ValueError: If the store does not exist and no dimensions were given, or the dimensions disagree.
+        """
+        self.path = Path(path)
+        self.chunk_bytes = chunk_bytes
+        self._lock = threading.Lock()
+        meta_path = self.path / "meta.json"
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            if dimensions is not None and dimensions != meta["dimensions"]:
+                raise ValueError(
+                    f"Store has {meta['dimensions']} dimensions, not {dimensions}"
+                )
+            self.dimensions, self.dtype = meta["dimensions"], meta["dtype"]
+        elif dimensions is None:
+            raise ValueError(
+                f"No vector store at {self.path}; pass dimensions to create one"
+            )
+        else:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.dimensions, self.dtype = dimensions, dtype
+            meta_path.write_text(json.dumps({"dimensions": dimensions, "dtype": dtype}))
+
+        self._ids = self._load_ids()
+        self._index = {id_: row for row, id_ in enumerate(self._ids)}
+        self._truncate(len(self._ids))
+
+    @property
+    def quantized(self) -> bool:
+        return self.dtype == "int8"
+
+    @property
+    def row_bytes(self) -> int:
+        return self.dimensions * np.dtype(DTYPES[self.dtype]).itemsize
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, id_: object) -> bool:
+        return id_ in self._index
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray):
+        """
+        Normalizes and appends vectors.
+
+        Ids that are already stored are appended again; lookups by id return the newest row.
+
+        Args:
+            ids: One id per vector; must not contain newlines.
+            vectors: A `(len(ids), dimensions)` matrix.
+
+        Raises:
+            ValueError: If the shapes disagree or an id contains a newline.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape != (len(ids), self.dimensions):
+            raise ValueError(
+                f"Expected a ({len(ids)}, {self.dimensions}) matrix, got {vectors.shape}"
+            )
+        if any("\n" in id_ for id_ in ids):
+            raise ValueError("Ids must not contain newlines")
+
+        vectors = normalize(vectors)
+        with self._lock:
+            if self.quantized:
+                rows, scales = quantize(vectors)
+                with (self.path / "scales.bin").open("ab") as f:
+                    f.write(scales.tobytes())
+            else:
+                rows = vectors
+            with (self.path / "vectors.bin").open("ab") as f:
+                f.write(np.ascontiguousarray(rows).tobytes())
+            with (self.path / "ids.txt").open("a", encoding="utf-8") as f:
+                f.write("".join(f"{id_}\n" for id_ in ids))
+            for id_ in ids:
+                self._index[id_] = len(self._ids)
+                self._ids.append(id_)
+
+    def get(self, id_: str) -> Optional[np.ndarray]:
+        """
+        Returns the stored (normalized, dequantized) vector for an id, or None.
+        """
+        row = self._index.get(id_)
+        if row is None:
+            return None
+        matrix, scales = self._matrix(len(self._ids))
+        vector = np.array(matrix[row], dtype=np.float32)
+        return vector * scales[row] if scales is not None else vector
+
+    def search(
+        self, query: np.ndarray, k: int = 10
+    ) -> Union[List[Tuple[str, float]], List[List[Tuple[str, float]]]]:
+        """
+        Returns the `k` stored vectors most cosine-similar to each query.
+
+        Args:
+            query: One vector, or a `(queries, dimensions)` matrix to search for several at once.
+            k: Number of results per query.
+
+        Returns:
+            `(id, score)` pairs, best first; a list of them per query if `query` is a matrix.
+        """
+        queries = normalize(np.atleast_2d(np.asarray(query, dtype=np.float32)))
+        count = len(self._ids)
+        k = min(k, count)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+
+        if k > 0:
+            matrix, scales = self._matrix(count)
+            chunk = max(1, self.chunk_bytes // self.row_bytes)
+            for start in range(0, count, chunk):
+                stop = min(start + chunk, count)
+                block = np.asarray(matrix[start:stop], dtype=np.float32)
+                scores = queries @ block.T
+                if scales is not None:
+                    scores *= scales[start:stop]
+                rows = np.broadcast_to(np.arange(start, stop), scores.shape)
+                best_scores = np.concatenate([best_scores, scores], axis=1)
+                best_rows = np.concatenate([best_rows, rows], axis=1)
+                if best_scores.shape[1] > k:
+                    keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                    best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                    best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        results = [
+            [(self._ids[row], float(score)) for row, score in zip(rows[o], scores[o])]
+            for rows, scores, o in zip(best_rows, best_scores, order)
+        ]
+        return results[0] if np.ndim(query) == 1 else results
+
+    def _matrix(self, count: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Maps the first `count` committed rows (and their scales) read-only.
+        """
+        if count == 0:
+            return np.empty((0, self.dimensions), DTYPES[self.dtype]), None
+        matrix = np.memmap(
+            self.path / "vectors.bin",
+            dtype=DTYPES[self.dtype],
+            mode="r",
+            shape=(count, self.dimensions),
+        )
+        scales = None
+        if self.quantized:
+            scales = np.memmap(
+                self.path / "scales.bin", dtype=np.float32, mode="r", shape=(count,)
+            )
+        return matrix, scales
+
+    def _load_ids(self) -> List[str]:
+        """
+        Reads the committed ids, ignoring a torn final line.
+        """
+        path = self.path / "ids.txt"
+        if not path.exists():
+            return []
+        with path.open(encoding="utf-8") as f:
+            return [line[:-1] for line in f if line.endswith("\n")]
+
+    def _truncate(self, count: int):
+        """
+        Drops rows written after the last committed id.
+        """
+        files = [("vectors.bin", self.row_bytes), ("scales.bin", 4), ("ids.txt", None)]
+        for name, size in files:
+            path = self.path / name
+            if not path.exists():
+                continue
+            if size is None:
+                committed = sum(len(id_.encode("utf-8")) + 1 for id_ in self._ids)
+            else:
+                committed = count * size
+            if path.stat().st_size > committed:
+                with path.open("r+b") as f:
+                    f.truncate(committed)
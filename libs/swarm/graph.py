@@ -0,0 +1,397 @@
+import asyncio
+import inspect
+import json
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Callable, Dict, List, Literal, Optional, Sequence
+
+from agent_types import Agent, AgentFunction, Result
+from runner import Runner, accepts_context, to_result
+from utils.schema import CONTEXT_VARIABLES
+
+STATUS = Literal["ok", "error", "timeout", "skipped"]
+Inputs = Dict[str, Any]
+
+
+@dataclass
+class Node:
+    """
+    One step of a `Graph`: an agent run or a plain function.
+
+    Attributes:
+        name: Unique name, used by dependents and in the results.
+        agent: Agent run to completion with `Runner.run`.
+        function: Callable run instead of an agent, as `function(inputs)` or
+            `function(inputs, context_variables=...)`. Coroutine functions run on the event
+            loop, others on the runner's thread pool, or on the process pool with `process`.
+        after: Names of the nodes whose outputs this one needs.
+        messages: Builds the node's messages from the graph's messages and its inputs.
+            Defaults to the graph's messages followed by one user message with the inputs.
+        timeout: Seconds the node may run before it is cancelled.
+        process: Run `function` in a worker process; it and its arguments must be picklable.
+        max_turns: Model calls allowed for an agent node.
+    """
+
+    name: str
+    agent: Optional[Agent] = None
+    function: Optional[Callable[..., Any]] = None
+    after: Sequence[str] = ()
+    messages: Optional[
+        Callable[[List[Dict[str, Any]], Inputs], List[Dict[str, Any]]]
+    ] = None
+    timeout: Optional[float] = None
+    process: bool = False
+    max_turns: int = 20
+
+
+@dataclass
+class NodeResult:
+    """
+    Outcome of one node.
+
+    Attributes:
+        name: Node name.
+        status: "ok", or why the node produced nothing.
+        output: The agent's final answer, or the function's return value.
+        context_variables: Context variables the node set or changed.
+        messages: Messages an agent node produced.
+        error: Description of the failure, if any.
+        elapsed: Seconds the node ran.
+    """
+
+    name: str
+    status: STATUS
+    output: Any = None
+    context_variables: Dict[str, str] = field(default_factory=dict)
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+
+@dataclass
+class GraphResult:
+    """
+    Outcome of a graph run.
+
+    Attributes:
+        nodes: Result per node, in the order the nodes were added.
+        context_variables: Initial context variables with every successful node's changes
+            applied in node order, so a later node wins a conflict regardless of timing.
+        elapsed: Seconds the run took.
+    """
+
+    nodes: Dict[str, NodeResult]
+    context_variables: Dict[str, str]
+    elapsed: float
+
+    @property
+    def ok(self) -> bool:
+        return all(node.status == "ok" for node in self.nodes.values())
+
+    def outputs(self) -> Dict[str, Any]:
+        """
+        Returns the output of every successful node by name.
+        """
+        return {
+            name: node.output
+            for name, node in self.nodes.items()
+            if node.status == "ok"
+        }
+
+
+def default_messages(
+    messages: List[Dict[str, Any]], inputs: Inputs
+) -> List[Dict[str, Any]]:
+    if not inputs:
+        return list(messages)
+    text = "\n\n".join(
+        f"Result from {name}:\n{output}" for name, output in inputs.items()
+    )
+    return [*messages, {"role": "user", "content": text}]
+
+
+def final_answer(messages: List[Dict[str, Any]]) -> Optional[str]:
+    for message in reversed(messages):
+        if message.get("role") == "assistant" and message.get("content"):
+            return message["content"]
+    return None
+
+
+def changes(before: Dict[str, str], after: Dict[str, str]) -> Dict[str, str]:
+    return {key: value for key, value in after.items() if before.get(key) != value}
+
+
+class Graph:
+    """
+    A DAG of agent runs and functions executed concurrently.
+
+    Every node starts as soon as the nodes it comes `after` have finished, so independent
+    branches run at the same time and a fan-out/fan-in graph takes about as long as its
+    slowest branch. A node receives its dependencies' outputs as `inputs` and starts from
+    the graph's context variables with the changes of all its ancestors, direct or not,
+    merged in node order.
+
+    Nodes must be added after the nodes they depend on, which keeps the graph acyclic and
+    makes insertion order a valid execution order for merging results deterministically.
+
+    A node that fails or times out has no output, and the nodes depending on it are
+    skipped; other branches carry on. Cancelling a run cancels every running node.
+    """
+
+    def __init__(self, name: str = "graph"):
+        self.name = name
+        self.nodes: Dict[str, Node] = {}
+
+    def add(
+        self,
+        name: str,
+        agent: Optional[Agent] = None,
+        function: Optional[Callable[..., Any]] = None,
+        **options: Any,
+    ) -> "Graph":
+        """
+        Adds a node; see `Node` for the options. Returns the graph for chaining.
+
+        Raises:
+            ValueError: If the name is taken, a dependency is unknown, or not exactly one of `agent` and `function` is given.
+        """
+        if name in self.nodes:
+            raise ValueError(f"Node {name} already exists")
+        if (agent is None) == (function is None):
+            raise ValueError(f"Node {name} needs either an agent or a function")
+        node = Node(name, agent, function, **options)
+        unknown = [
+            dependency for dependency in node.after if dependency not in self.nodes
+        ]
+        if unknown:
+            raise ValueError(
+                f"Node {name} depends on unknown nodes {unknown}; add them first"
+            )
+        self.nodes[name] = node
+        return self
+
+    def fan_out(
+        self,
+        agents: Dict[str, Agent],
+        join: Optional[Agent] = None,
+        join_name: str = "join",
+        **options: Any,
+    ) -> "Graph":
+        """
+        Adds one node per agent, all independent, and optionally an agent that receives all their answers.
+        """
+        for name, agent in agents.items():
+            self.add(name, agent, **options)
+        if join is not None:
+            self.add(join_name, join, after=list(agents), **options)
+        return self
+
+    async def run(
+        self,
+        runner: Runner,
+        messages: Optional[List[Dict[str, Any]]] = None,
+        context_variables: Optional[Dict[str, str]] = None,
+        processes: Optional[Executor] = None,
+    ) -> GraphResult:
+        """
+        Runs every node and waits for all of them.
+
+        Args:
+            runner: Runner for agent nodes; its thread pool runs blocking function nodes.
+            messages: Messages every agent node starts from.
+            context_variables: Initial shared state.
+            processes: Pool for `process` nodes. A process pool is created for the run if omitted and needed.
+        """
+        started = time.perf_counter()
+        messages = list(messages or [])
+        initial = dict(context_variables or {})
+        results: Dict[str, NodeResult] = {}
+        running: Dict["asyncio.Task[NodeResult]", str] = {}
+        pending = list(self.nodes.values())
+        ancestors = self.ancestors()
+        owned = None
+        if processes is None and any(node.process for node in pending):
+            processes = owned = ProcessPoolExecutor()
+
+        try:
+            while pending or running:
+                for node in list(pending):
+                    dependencies = [results.get(name) for name in node.after]
+                    if any(result is None for result in dependencies):
+                        continue
+                    pending.remove(node)
+                    failed = [
+                        result.name for result in dependencies if result.status != "ok"
+                    ]  # type: ignore[union-attr]
+                    if failed:
+                        results[node.name] = NodeResult(
+                            node.name, "skipped", error=f"dependencies failed: {failed}"
+                        )
+                        continue
+                    context = dict(initial)
+                    for name in ancestors[node.name]:
+                        context.update(results[name].context_variables)
+                    inputs = {name: results[name].output for name in node.after}
+                    task = asyncio.ensure_future(
+                        self._run_node(
+                            node, runner, messages, inputs, context, processes
+                        )
+                    )
+                    running[task] = node.name
+                if not running:
+                    continue
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    results[running.pop(task)] = task.result()
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            if owned is not None:
+                owned.shutdown(wait=False, cancel_futures=True)
+
+        ordered = {name: results[name] for name in self.nodes}
+        merged = dict(initial)
+        for result in ordered.values():
+            if result.status == "ok":
+                merged.update(result.context_variables)
+        return GraphResult(ordered, merged, time.perf_counter() - started)
+
+    def ancestors(self) -> Dict[str, List[str]]:
+        """
+        Returns the nodes each node depends on, directly or transitively, in node order.
+        """
+        order = {name: index for index, name in enumerate(self.nodes)}
+        found: Dict[str, List[str]] = {}
+        for name, node in self.nodes.items():
+            names = {
+                ancestor
+                for dependency in node.after
+                for ancestor in (dependency, *found[dependency])
+            }
+            found[name] = sorted(names, key=order.__getitem__)
+        return found
+
+    def run_sync(
+        self,
+        runner: Runner,
+        messages: Optional[List[Dict[str, Any]]] = None,
+        **kwargs: Any,
+    ) -> GraphResult:
+        """
+        Blocking wrapper around `run` for callers outside an event loop.
+        """
+        return asyncio.run(self.run(runner, messages, **kwargs))
+
+    def as_tool(
+        self,
+        runner: Runner,
+        name: Optional[str] = None,
+        description: Optional[str] = None,
+    ) -> AgentFunction:
+        """
+        Wraps the graph as a tool, so an orchestrator agent can fan a task out to it.
+
+        The tool takes a `task`, runs the graph on it as a user message, and returns the
+        outputs of the nodes without dependents as JSON, along with the merged context variables.
+        """
+        leaves = [
+            n
+            for n in self.nodes
+            if not any(n in other.after for other in self.nodes.values())
+        ]
+
+        async def tool(task: str, context_variables: Dict[str, str]) -> Result:
+            result = await self.run(
+                runner, [{"role": "user", "content": task}], context_variables
+            )
+            answers = {}
+            for leaf in leaves:
+                node = result.nodes[leaf]
+                answers[leaf] = (
+                    node.output if node.status == "ok" else f"Error: {node.error}"
+                )
+            return Result(
+                value=json.dumps(answers),
+                agent=None,
+                context_variables=result.context_variables,
+            )
+
+        tool.__name__ = name or self.name
+        tool.__doc__ = (
+            description
+            or f"Runs {', '.join(self.nodes)} concurrently on a task and returns their answers."
+        )
+        return tool
+
+    async def _run_node(
+        self,
+        node: Node,
+        runner: Runner,
+        messages: List[Dict[str, Any]],
+        inputs: Inputs,
+        context: Dict[str, str],
+        processes: Optional[Executor],
+    ) -> NodeResult:
+        started = time.perf_counter()
+        try:
+            if node.agent is not None:
+                compose = node.messages or default_messages
+                work: Any = runner.run(
+                    node.agent, compose(messages, inputs), context, node.max_turns
+                )
+            else:
+                work = self._call(node, runner, inputs, context, processes)
+            result = await asyncio.wait_for(work, node.timeout)
+        except asyncio.TimeoutError:
+            error = f"timed out after {node.timeout}s"
+            return NodeResult(
+                node.name, "timeout", error=error, elapsed=time.perf_counter() - started
+            )
+        except Exception as e:
+            return NodeResult(
+                node.name, "error", error=repr(e), elapsed=time.perf_counter() - started
+            )
+
+        elapsed = time.perf_counter() - started
+        if node.agent is not None:
+            return NodeResult(
+                node.name,
+                "ok",
+                output=final_answer(result["messages"]),
+                context_variables=changes(context, result["context_variables"]),
+                messages=result["messages"],
+                elapsed=elapsed,
+            )
+        if (
+            isinstance(result, dict)
+            and "value" in result
+            and result.keys() <= Result.__annotations__.keys()
+        ):
+            # A function returning a `Result` may update the context variables like a tool
+            result = to_result(result)
+            updated = changes(context, {**context, **result["context_variables"]})
+            return NodeResult(
+                node.name, "ok", result["value"], updated, elapsed=elapsed
+            )
+        return NodeResult(node.name, "ok", result, elapsed=elapsed)
+
+    async def _call(
+        self,
+        node: Node,
+        runner: Runner,
+        inputs: Inputs,
+        context: Dict[str, str],
+        processes: Optional[Executor],
+    ) -> Any:
+        func = node.function
+        kwargs = {CONTEXT_VARIABLES: dict(context)} if accepts_context(func) else {}  # type: ignore[arg-type]
+        if inspect.iscoroutinefunction(func):
+            return await func(inputs, **kwargs)  # type: ignore[misc]
+        loop = asyncio.get_running_loop()
+        executor = processes if node.process else runner.executor
+        return await loop.run_in_executor(executor, partial(func, inputs, **kwargs))  # type: ignore[arg-type]
@@ -0,0 +1,278 @@
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from router import SORT, ModelRouter, Route, output_tokens
+
+T = TypeVar("T")
+
+
+@dataclass
+class HedgeStats:
+    """
+    Counters for a `Hedger`.
+
+    Attributes:
+        calls: Calls made through the hedger.
+        hedges: Duplicate requests fired because the first answer was late.
+        wins: Calls answered first by a duplicate rather than the original request.
+        denied: Hedges not fired because the in-flight budget was exhausted.
+    """
+
+    calls: int = 0
+    hedges: int = 0
+    wins: int = 0
+    denied: int = 0
+
+
+class Primed:
+    """
+    An async stream whose first token has already arrived.
+
+    Iterating yields the items read while waiting for it, then the rest of the underlying
+    stream. Hedged streaming calls return one of these so "answered" means "sent its first
+    token".
+    """
+
+    def __init__(
+        self, stream: Any, iterator: AsyncIterator[Any], head: List[Any], ttft: float
+    ):
+        self.stream, self.ttft = stream, ttft
+        self._iterator, self._head = iterator, head
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        for item in self._head:
+            yield item
+        async for item in self._iterator:
+            yield item
+
+    async def close(self):
+        close = getattr(self.stream, "close", None)
+        if close is not None:
+            await close()
+
+
+async def prime(
+    stream: Any,
+    started: Optional[float] = None,
+    ready: Optional[Callable[[Any], bool]] = None,
+) -> Primed:
+    """
+    Waits for the first token of an async stream, e.g. a streamed chat completion.
+
+    Args:
+        stream: The stream returned by `create(..., stream=True)`.
+        started: `time.perf_counter()` value taken before the request was sent.
+        ready: Whether an item carries the first token, e.g. an output text delta of a Responses
+            API stream, whose first events only acknowledge the request. Defaults to any item.
+            Items before it are buffered; a stream that ends first counts as answered.
+    """
+    started = time.perf_counter() if started is None else started
+    iterator = stream.__aiter__()
+    head: List[Any] = []
+    try:
+        while True:
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            head.append(item)
+            if ready is None or ready(item):
+                break
+    except BaseException:
+        await Primed(stream, iterator, [], 0.0).close()
+        raise
+    return Primed(stream, iterator, head, time.perf_counter() - started)
+
+
+class Hedger:
+    """
+    Cuts tail latency by racing a late request against a duplicate on another upstream.
+
+    A call goes to the first route. If it has not answered after the hedge delay, the same
+    call is fired at the next route (the model's next upstream in `Provider.order`, or the
+    same unpinned route, which lets OpenRouter pick again), and whichever answers first
+    wins; the other is cancelled, closing its connection. A failure before the delay
+    fails over to the next route at once.
+
+    The delay adapts to the `quantile` of recent answer times per model, so only the
+    slowest tail is hedged. Duplicates in flight across all calls are capped by
+    `max_in_flight`, bounding the extra load when an upstream slows down for everyone.
+
+    "Answered" means the awaitable returned: the full response for plain calls, or the
+    first token when the call returns `prime(stream)`.
+    """
+
+    def __init__(
+        self,
+        router: Optional[ModelRouter] = None,
+        quantile: float = 0.9,
+        initial_delay: float = 2.0,
+        min_delay: float = 0.05,
+        max_delay: float = 30.0,
+        max_hedges: int = 1,
+        max_in_flight: Optional[int] = None,
+        window: int = 256,
+        min_samples: int = 16,
+    ):
+        """
+        Initializes the hedger.
+
+        Args:
+            router: Router whose routes and health statistics are used. A new one is created if omitted.
+            quantile: Quantile of recent answer times after which a request is hedged.
+            initial_delay: Delay used until `min_samples` answers have been observed for a model.
+            min_delay: Lower bound on the delay.
+            max_delay: Upper bound on the delay.
+            max_hedges: Duplicates fired per call at most.
+            max_in_flight: Duplicates in flight across all calls at most. Defaults to `SWARM_HEDGE_BUDGET` or 8.
+            window: Answer times remembered per model.
+            min_samples: Answer times needed before the delay adapts.
+        """
+        self.router = router or ModelRouter()
+        self.quantile, self.initial_delay = quantile, initial_delay
+        self.min_delay, self.max_delay = min_delay, max_delay
+        self.max_hedges = max_hedges
+        self.max_in_flight = (
+            max_in_flight
+            if max_in_flight is not None
+            else int(os.getenv("SWARM_HEDGE_BUDGET", 8))
+        )
+        self.window, self.min_samples = window, min_samples
+        self.stats = HedgeStats()
+        self._samples: Dict[str, Deque[float]] = {}
+        self._in_flight = 0
+
+    def delay(self, name: str) -> float:
+        """
+        Returns the current hedge delay for a model.
+        """
+        samples = self._samples.get(name)
+        if samples is None or len(samples) < self.min_samples:
+            return self.initial_delay
+        ordered = sorted(samples)
+        value = ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+        return min(max(value, self.min_delay), self.max_delay)
+
+    async def call(
+        self,
+        fn: Callable[[Route], Awaitable[T]],
+        sort: Optional[SORT] = None,
+        **capabilities: Any,
+    ) -> T:
+        """
+        Hedged counterpart of `ModelRouter.acall`: races the planned routes for a capability request.
+        """
+        return await self.race(self.router.plan(sort, **capabilities), fn)
+
+    async def call_model(self, name: str, fn: Callable[[Route], Awaitable[T]]) -> T:
+        """
+        Races the upstreams of one registry model.
+        """
+        return await self.race(self.router.upstreams(name), fn)
+
+    async def race(self, routes: List[Route], fn: Callable[[Route], Awaitable[T]]) -> T:
+        """
+        Calls `fn` with the first route, hedging onto the following ones as described above.
+
+        Raises:
+            LookupError: If `routes` is empty.
+            Exception: The last error, if every attempt fails.
+        """
+        if not routes:
+            raise LookupError("No route to call")
+        self.stats.calls += 1
+        delay = self.delay(routes[0].name)
+        untried = list(routes[1:])
+        attempts: Dict["asyncio.Task[T]", Tuple[Route, float, bool]] = {}
+        hedges = 0
+        error: Optional[BaseException] = None
+
+        def launch(route: Route, hedge: bool) -> float:
+            task = asyncio.ensure_future(fn(route))
+            attempts[task] = (route, time.perf_counter(), hedge)
+            if hedge:
+                self._in_flight += 1
+                self.stats.hedges += 1
+            return time.perf_counter() + delay
+
+        deadline = launch(routes[0], False)
+        try:
+            while attempts:
+                hedging = hedges < self.max_hedges and (untried or len(routes) == 1)
+                timeout = max(0.0, deadline - time.perf_counter()) if hedging else None
+                done, _ = await asyncio.wait(
+                    attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    hedges += 1
+                    if self._in_flight < self.max_in_flight:
+                        deadline = launch(
+                            untried.pop(0) if untried else routes[0], True
+                        )
+                    else:
+                        self.stats.denied += 1
+                    continue
+
+                winner: Optional["asyncio.Task[T]"] = None
+                for task in done:
+                    route, began, hedge = attempts.pop(task)
+                    if hedge:
+                        self._in_flight -= 1
+                    if task.exception() is not None:
+                        self.router.observe_error(route)
+                        error = task.exception()
+                    elif winner is None:
+                        winner = task
+                        self._observe(route, time.perf_counter() - began, task.result())
+                        self.stats.wins += hedge
+                    else:
+                        await close(task.result())
+
+                if winner is not None:
+                    return winner.result()
+                if not attempts and untried:
+                    deadline = launch(untried.pop(0), False)
+            assert error is not None
+            raise error
+        finally:
+            for task, (_, _, hedge) in attempts.items():
+                task.cancel()
+                if hedge:
+                    self._in_flight -= 1
+            for result in await asyncio.gather(*attempts, return_exceptions=True):
+                if not isinstance(result, BaseException):
+                    await close(result)
+
+    def _observe(self, route: Route, elapsed: float, result: Any):
+        samples = self._samples.get(route.name)
+        if samples is None:
+            samples = self._samples[route.name] = deque(maxlen=self.window)
+        samples.append(elapsed)
+        if not isinstance(result, Primed):
+            self.router.observe(
+                route, elapsed, getattr(result, "ttft", None), output_tokens(result)
+            )
+
+
+async def close(result: Any):
+    """
+    Releases the connection behind a losing answer, if it is a stream.
+    """
+    if isinstance(result, Primed):
+        await result.close()
@@ -0,0 +1,508 @@
+import asyncio
+import base64
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Literal, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from models import OPENROUTER_MODELS, PROVIDER
+
+Tokenizer = Callable[[str], Sequence[int]]
+Inputs = Union[Sequence[str], Sequence[Sequence[int]], np.ndarray]
+POOLING = Literal["mean", "cls", "none"]
+
+ORT_TYPES = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(double)": np.float64,
+    "tensor(int64)": np.int64,
+    "tensor(int32)": np.int32,
+}
+
+
+def onnxruntime() -> Any:
+    """
+    Imports onnxruntime, which is only needed once a local model is loaded.
+
+    Raises:
+        ImportError: If onnxruntime is not installed.
+    """
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError(f"Local models need onnxruntime: {e}") from e
+    return onnxruntime
+
+
+@dataclass
+class Request:
+    inputs: Any
+    future: "Future[np.ndarray]" = field(default_factory=Future)
+
+
+class Worker:
+    """
+    One `InferenceSession` with its preallocated buffers, driven by one thread.
+
+    Inputs are written into flat buffers sized for `max_batch x max_length` and handed to
+    the session as contiguous views, so steady-state batches allocate no input memory.
+    Outputs whose shape can be derived from the input dimensions are bound to
+    preallocated buffers the same way; any others are allocated by onnxruntime.
+    """
+
+    def __init__(self, model: "OnnxModel", session: Any):
+        self.model = model
+        self.session = session
+        self.inputs = {i.name: i for i in session.get_inputs()}
+        self.outputs = session.get_outputs()
+        self.buffers: Dict[str, np.ndarray] = {}
+        self.binding = session.io_binding()
+
+    def buffer(self, name: str, dtype: Any, size: int) -> np.ndarray:
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.size < size or buffer.dtype != dtype:
+            buffer = self.buffers[name] = np.empty(size, dtype=dtype)
+        return buffer[:size]
+
+    def feed(
+        self, inputs: List[Any]
+    ) -> Tuple[Dict[str, np.ndarray], Optional[np.ndarray]]:
+        """
+        Writes a batch into the input buffers.
+
+        Returns:
+            The input arrays by name, and the attention mask for pooling (None for numeric inputs).
+
+        Raises:
+            ValueError: If the batch holds text and the model has no tokenizer.
+        """
+        model = self.model
+        if model.tokenizer is None and any(isinstance(item, str) for item in inputs):
+            raise ValueError(
+                f"{model.path} has no tokenizer; register one to embed text, or pass token ids"
+            )
+        if model.tokenizer is None and not isinstance(inputs[0], (list, tuple)):
+            rows = np.stack([np.asarray(row) for row in inputs])
+            name, meta = next(iter(self.inputs.items()))
+            dtype = ORT_TYPES.get(meta.type, np.float32)
+            array = self.buffer(name, dtype, rows.size).reshape(rows.shape)
+            array[...] = rows
+            return {name: array}, None
+
+        ids = [
+            list(model.tokenizer(item) if isinstance(item, str) else item)[
+                : model.max_length
+            ]
+            for item in inputs
+        ]
+        batch, length = len(ids), max(1, max(len(row) for row in ids))
+        feeds: Dict[str, np.ndarray] = {}
+        for name in ("input_ids", "attention_mask", "token_type_ids"):
+            if name not in self.inputs:
+                continue
+            dtype = ORT_TYPES.get(self.inputs[name].type, np.int64)
+            feeds[name] = self.buffer(name, dtype, batch * length).reshape(
+                batch, length
+            )
+            feeds[name].fill(0)
+        if "input_ids" not in feeds:
+            raise ValueError(
+                f"{model.path} does not take input_ids; pass numeric rows instead of text"
+            )
+        mask = feeds.get("attention_mask")
+        if mask is None:
+            mask = self.buffer("_mask", np.int64, batch * length).reshape(batch, length)
+            mask.fill(0)
+        for row, tokens in enumerate(ids):
+            feeds["input_ids"][row, : len(tokens)] = tokens
+            mask[row, : len(tokens)] = 1
+        return feeds, mask
+
+    def run(self, inputs: List[Any]) -> np.ndarray:
+        feeds, mask = self.feed(inputs)
+        self.binding.clear_binding_inputs()
+        self.binding.clear_binding_outputs()
+        for name, array in feeds.items():
+            self.binding.bind_cpu_input(name, array)
+
+        dims = self._dims(feeds)
+        output = self.outputs[self.model.output]
+        shape = [dims.get(d) if isinstance(d, str) else d for d in output.shape]
+        preallocated = None
+        if all(isinstance(d, int) for d in shape) and output.type in ORT_TYPES:
+            size = int(np.prod(shape))
+            preallocated = self.buffer(
+                f"_out_{output.name}", ORT_TYPES[output.type], size
+            ).reshape(shape)
+            self.binding.bind_output(
+                output.name,
+                "cpu",
+                0,
+                preallocated.dtype,
+                shape,
+                preallocated.ctypes.data,
+            )
+        else:
+            self.binding.bind_output(output.name, "cpu")
+        self.session.run_with_iobinding(self.binding)
+        result = (
+            preallocated
+            if preallocated is not None
+            else self.binding.copy_outputs_to_cpu()[0]
+        )
+        return self.model.pool(result, mask)
+
+    def _dims(self, feeds: Dict[str, np.ndarray]) -> Dict[str, int]:
+        """
+        Maps the symbolic dimension names of the inputs (e.g. "batch_size") to this batch's sizes.
+        """
+        dims: Dict[str, int] = {}
+        for name, array in feeds.items():
+            for symbol, size in zip(self.inputs[name].shape, array.shape):
+                if isinstance(symbol, str):
+                    dims[symbol] = size
+        return dims
+
+
+class OnnxModel:
+    """
+    An ONNX model served in-process from a pool of `InferenceSession`s.
+
+    Each session is owned by one worker thread. Requests from any number of threads or
+    event loops go onto a shared queue; a free worker takes the oldest request, waits up to
+    `max_wait` seconds for more, and runs them together as one batch of up to `max_batch`
+    rows. Under load batches fill up immediately, and a lone request only pays `max_wait`.
+
+    Text inputs are tokenized with `tokenizer`; token-id lists and numeric feature rows
+    are passed through. Text-model outputs of shape (batch, tokens, hidden) are pooled
+    to one vector per input.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        tokenizer: Optional[Tokenizer] = None,
+        sessions: Optional[int] = None,
+        threads: Optional[int] = None,
+        max_batch: int = 32,
+        max_wait: float = 0.002,
+        max_length: int = 512,
+        pooling: POOLING = "mean",
+        normalize: bool = False,
+        output: int = 0,
+    ):
+        """
+        Loads the model into a pool of sessions.
+
+        Args:
+            path: The `.onnx` file.
+            tokenizer: Turns a text into token ids. Required to pass strings.
+            sessions: Number of sessions (and worker threads). Defaults to the cores divided by `threads`.
+            threads: Intra-op threads per session. Defaults to min(4, cores).
+            max_batch: Most rows run in one session call.
+            max_wait: Seconds a worker waits to fill a batch once it holds a request.
+            max_length: Token sequences are truncated to this length.
+            pooling: How (batch, tokens, hidden) outputs become vectors: masked mean, first token, or not at all.
+            normalize: Scale output vectors to unit length.
+            output: Index of the session output to return.
+        """
+        ort = onnxruntime()
+        cores = os.cpu_count() or 1
+        self.threads = threads or min(4, cores)
+        self.size = sessions or max(1, cores // self.threads)
+        self.path, self.tokenizer = path, tokenizer
+        self.max_batch, self.max_wait, self.max_length = max_batch, max_wait, max_length
+        self.pooling, self.normalize, self.output = pooling, normalize, output
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._queue: "queue.Queue[Optional[Request]]" = queue.Queue()
+        self._workers = [
+            Worker(
+                self,
+                ort.InferenceSession(path, options, providers=["CPUExecutionProvider"]),
+            )
+            for _ in range(self.size)
+        ]
+        self._threads = [
+            threading.Thread(
+                target=self._serve, args=(worker,), daemon=True, name=f"onnx-{i}"
+            )
+            for i, worker in enumerate(self._workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, inputs: Inputs) -> "Future[np.ndarray]":
+        """
+        Queues inputs for inference.
+
+        Returns:
+            A future resolving to one output row per input, in order.
+        """
+        inputs = list(inputs)
+        if not inputs:
+            done: "Future[np.ndarray]" = Future()
+            done.set_result(np.empty((0,), dtype=np.float32))
+            return done
+        parts = [
+            Request(inputs[start : start + self.max_batch])
+            for start in range(0, len(inputs), self.max_batch)
+        ]
+        for part in parts:
+            self._queue.put(part)
+        if len(parts) == 1:
+            return parts[0].future
+
+        combined: "Future[np.ndarray]" = Future()
+        remaining = [len(parts)]
+        lock = threading.Lock()
+
+        def on_done(_: Future):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                combined.set_result(
+                    np.concatenate([part.future.result() for part in parts])
+                )
+            except Exception as e:
+                combined.set_exception(e)
+
+        for part in parts:
+            part.future.add_done_callback(on_done)
+        return combined
+
+    def run(self, inputs: Inputs) -> np.ndarray:
+        """
+        Runs inputs and waits for the result.
+        """
+        return self.submit(inputs).result()
+
+    async def arun(self, inputs: Inputs) -> np.ndarray:
+        """
+        Runs inputs without blocking the event loop.
+        """
+        return await asyncio.wrap_future(self.submit(inputs))
+
+    def pool(self, output: np.ndarray, mask: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Reduces a (batch, tokens, hidden) output to (batch, hidden) and copies it out of the worker's buffers.
+        """
+        if output.ndim == 3 and mask is not None and self.pooling != "none":
+            if self.pooling == "cls":
+                output = output[:, 0]
+            else:
+                weights = mask[..., None].astype(output.dtype)
+                output = (output * weights).sum(axis=1) / np.maximum(
+                    weights.sum(axis=1), 1
+                )
+        output = np.array(output, dtype=np.float32)
+        if self.normalize:
+            output /= np.maximum(np.linalg.norm(output, axis=-1, keepdims=True), 1e-12)
+        return output
+
+    def close(self):
+        """
+        Stops the workers once the queued requests are done.
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _serve(self, worker: Worker):
+        carry: Optional[Request] = None
+        while True:
+            first = carry or self._queue.get()
+            carry = None
+            if first is None:
+                return
+            batch, rows = [first], len(first.inputs)
+            deadline = time.perf_counter() + self.max_wait
+            while rows < self.max_batch:
+                try:
+                    request = self._queue.get(
+                        timeout=max(0.0, deadline - time.perf_counter())
+                    )
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._queue.put(None)
+                    break
+                if rows + len(request.inputs) > self.max_batch:
+                    carry = request
+                    break
+                batch.append(request)
+                rows += len(request.inputs)
+            self._execute(worker, batch)
+
+    def _execute(self, worker: Worker, batch: List[Request]):
+        try:
+            outputs = worker.run([item for request in batch for item in request.inputs])
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        start = 0
+        for request in batch:
+            request.future.set_result(outputs[start : start + len(request.inputs)])
+            start += len(request.inputs)
+
+
+class LocalRuntime:
+    """
+    Loads the registry's local models on first use and keeps them for the process.
+
+    A model is described by its registry entry (provider `LOCAL`, `path` set) plus
+    options registered here, most importantly its tokenizer.
+    """
+
+    def __init__(self):
+        self._options: Dict[str, Dict[str, Any]] = {}
+        self._models: Dict[str, OnnxModel] = {}
+        self._lock = threading.Lock()
+        self.client = LocalClient(self)
+        self.async_client = AsyncLocalClient(self)
+
+    def register(self, name: str, path: Optional[str] = None, **options: Any):
+        """
+        Sets how a local model is loaded.
+
+        Args:
+            name: Registry model name, or any name when `path` is given.
+            path: The `.onnx` file. Defaults to the registry entry's `path`.
+            **options: `OnnxModel` options such as `tokenizer`, `max_batch` or `pooling`.
+        """
+        with self._lock:
+            self._options[name] = {"path": path, **options}
+            stale = self._models.pop(name, None)
+        if stale is not None:
+            stale.close()
+
+    def get(self, name: str) -> OnnxModel:
+        """
+        Returns the loaded model for a registry name or `local/<name>` slug.
+
+        Raises:
+            LookupError: If the name is neither registered here nor a local registry model.
+        """
+        name = name.removeprefix(f"{PROVIDER.LOCAL}/")
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._lock:
+            if name not in self._models:
+                options = dict(self._options.get(name, {}))
+                path = options.pop("path", None) or self._registry_path(name)
+                self._models[name] = OnnxModel(path, **options)
+            return self._models[name]
+
+    def close(self):
+        with self._lock:
+            models = list(self._models.values())
+            self._models.clear()
+        for model in models:
+            model.close()
+
+    @staticmethod
+    def _registry_path(name: str) -> str:
+        entry = OPENROUTER_MODELS.get(name)
+        if entry is None or entry.provider.name != PROVIDER.LOCAL or not entry.path:
+            raise LookupError(f"{name} is not a local model")
+        return entry.path
+
+
+def embedding_response(
+    model: str, vectors: np.ndarray, encoding_format: Optional[str]
+) -> Any:
+    """
+    Wraps vectors in the SDK's `CreateEmbeddingResponse`, encoded like the HTTP API would.
+    """
+    from openai.types import CreateEmbeddingResponse, Embedding
+    from openai.types.create_embedding_response import Usage
+
+    data = [
+        Embedding.model_construct(
+            index=i,
+            object="embedding",
+            embedding=base64.b64encode(row.astype(np.float32).tobytes()).decode()
+            if encoding_format == "base64"
+            else row.tolist(),
+        )
+        for i, row in enumerate(vectors)
+    ]
+    return CreateEmbeddingResponse.model_construct(
+        data=data,
+        model=model,
+        object="list",
+        usage=Usage(prompt_tokens=0, total_tokens=0),
+    )
+
+
+class LocalEmbeddings:
+    def __init__(self, runtime: LocalRuntime):
+        self.runtime = runtime
+
+    def create(
+        self,
+        *,
+        model: str,
+        input: Union[str, Inputs],
+        encoding_format: Optional[str] = None,
+        dimensions: Optional[int] = None,
+        **_: Any,
+    ) -> Any:
+        vectors = self.runtime.get(model).run(
+            [input] if isinstance(input, str) else input
+        )
+        return embedding_response(model, vectors[:, :dimensions], encoding_format)
+
+
+class AsyncLocalEmbeddings(LocalEmbeddings):
+    async def create(  # type: ignore
+        self,
+        *,
+        model: str,
+        input: Union[str, Inputs],
+        encoding_format: Optional[str] = None,
+        dimensions: Optional[int] = None,
+        **_: Any,
+    ) -> Any:
+        vectors = await self.runtime.get(model).arun(
+            [input] if isinstance(input, str) else input
+        )
+        return embedding_response(model, vectors[:, :dimensions], encoding_format)
+
+
+class LocalClient:
+    """
+    The slice of the `OpenAI` client surface served in-process: `embeddings.create`.
+    """
+
+    def __init__(self, runtime: LocalRuntime):
+        self.base_url = f"{PROVIDER.LOCAL}://"
+        self.embeddings = LocalEmbeddings(runtime)
+
+    def close(self):
+        pass
+
+
+class AsyncLocalClient(LocalClient):
+    def __init__(self, runtime: LocalRuntime):
+        super().__init__(runtime)
+        self.embeddings = AsyncLocalEmbeddings(runtime)
+
+    async def close(self):  # type: ignore
+        pass
+
+
+runtime = LocalRuntime()
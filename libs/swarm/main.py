@@ -1,27 +1,14 @@
-import loguru
+import argparse
+import asyncio
+import importlib
+import threading
+import time
+from typing import Optional
+
 from rich.prompt import Prompt
-from rich.logging import RichHandler
-from rich.console import Console
-from rich.markdown import Markdown
-from openai import OpenAI
-from openai.types.responses import Response
-from models import OPENROUTER_MODELS, PROVIDER
-from dotenv import load_dotenv
-
-
-load_dotenv()
-
-
-logger = loguru.logger
-logger.configure(
-    handlers=[
-        {
-            "sink": RichHandler(rich_tracebacks=True),
-            "level": "INFO",
-            "format": "{message}",
-        },
-    ]
-)
+
+# Everything else is imported inside `main()`: the OpenAI SDK alone takes about a second
+# to import, and none of it is needed to show the first prompt.
 
 
 reasoning_system_message = (
@@ -41,7 +28,7 @@ reasoning_system_message = (
     "Always respond using the GitHub Flavored Markdown Spec with fenced code blocks."
 )
 
-system_message = (
+default_system_message = (
     "You are a senior software engineer & AI researcher who is capable of using a combination"
     " of techniques and tools to solve problems efficiently and effectively."
     " When given a specification & requirements, you are able to execute"
@@ -51,35 +38,327 @@ system_message = (
     "Always respond using the GitHub Flavored Markdown Spec with fenced code blocks."
 )
 
-model_name = Prompt.ask("Enter model").strip()
-provider = Prompt.ask("Enter provider").strip()
-if provider == PROVIDER.OPENROUTER:
-    model = OPENROUTER_MODELS.get(model_name)
-    if not model:
-        raise ValueError(f"Model {model_name} not found")
-    if model.types and "reasoning" in model.types:
-        system_message = reasoning_system_message
-
-    client = OpenAI(
-        api_key=model.provider.api_key,
-        base_url=model.provider.base_url,
+
+def prefetch():
+    """
+    Imports the modules the first turn needs while the user is still typing.
+    """
+    for module in (
+        "clients",
+        "conversation",
+        "router",
+        "streaming",
+        "openai.types.responses",
+    ):
+        importlib.import_module(module)
+
+
+def configure_logging():
+    """
+    Routes loguru through rich and returns the configured logger.
+    """
+    import loguru
+    from rich.logging import RichHandler
+
+    logger = loguru.logger
+    logger.configure(
+        handlers=[
+            {
+                "sink": RichHandler(rich_tracebacks=True),
+                "level": "INFO",
+                "format": "{message}",
+            },
+        ]
+    )
+    return logger
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Interactive swarm REPL")
+    parser.add_argument(
+        "--no-stream",
+        dest="stream",
+        action="store_false",
+        help="Wait for the full response instead of rendering tokens as they arrive",
+    )
+    parser.add_argument(
+        "--types",
+        type=lambda s: s.split(","),
+        help="Route each turn to the best model with these types, e.g. chat,fast",
+    )
+    parser.add_argument(
+        "--inputs",
+        type=lambda s: s.split(","),
+        help="Input modalities the routed model must accept, e.g. text,image",
+    )
+    parser.add_argument(
+        "--sort",
+        choices=["price", "throughput", "latency"],
+        help="Ranking used by the router instead of the provider's configured sort",
+    )
+    parser.add_argument(
+        "--conversation",
+        help="Conversation id to resume; a new conversation is started if omitted",
+    )
+    parser.add_argument(
+        "--semantic-cache",
+        action="store_true",
+        help="Answer prompts similar to earlier ones in the same context from cache; /miss reports a wrong answer",
+    )
+    parser.add_argument(
+        "--similarity",
+        type=float,
+        help="Minimum cosine similarity for a semantic cache hit",
+    )
+    parser.add_argument(
+        "--semantic-context",
+        type=int,
+        default=0,
+        help="Recent messages that must also match for a semantic cache hit; with 0, answers are shared across turns and conversations",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Race a turn whose first token is late against another upstream (routed or OpenRouter models)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    threading.Thread(target=prefetch, daemon=True).start()
+    system_message = default_system_message
+    routed = bool(args.types or args.inputs)
+    if not routed:
+        model_name = Prompt.ask("Enter model").strip()
+        provider_name = Prompt.ask("Enter provider").strip()
+
+    from dotenv import load_dotenv
+    from openai.types.responses import Response
+    from rich.console import Console
+    from rich.markdown import Markdown
+    from models import OPENROUTER_MODELS, PROVIDER
+    from clients import get_async_client, get_client
+    from router import ModelRouter, Route
+    from conversation import (
+        Conversation,
+        ConversationStore,
+        default_budget,
+        response_summarizer,
+        supports_previous_response,
     )
-    model_name = f"{model.provider.name}/{model_name}"
-else:
-    client = OpenAI()
+    from streaming import astream_response, stream_response
+    from telemetry import telemetry
+
+    load_dotenv()
+    logger = configure_logging()
 
-while True:
-    user_input = Prompt.ask("User").strip()
+    router, registry_name = None, None
+    if routed:
+        router = ModelRouter()
+        capabilities = {"types": args.types, "inputs": args.inputs}
+        best = router.select(args.sort, **capabilities)
+        if best.model.types and "reasoning" in best.model.types:
+            system_message = reasoning_system_message
+        logger.info(f"Routing to {best.slug}")
+        model, provider = best.model, best.model.provider
+        model_name = best.slug
+        summarizer = response_summarizer(get_client(provider), best.slug)
+    elif provider_name == PROVIDER.OPENROUTER:
+        model = OPENROUTER_MODELS.get(model_name)
+        if not model:
+            raise ValueError(f"Model {model_name} not found")
+        if model.types and "reasoning" in model.types:
+            system_message = reasoning_system_message
 
-    if not user_input:
-        raise ValueError("User input cannot be empty")
+        client = get_client(model.provider)
+        registry_name = model_name
+        model_name = f"{model.provider.name}/{model_name}"
+        provider = model.provider
+        summarizer = response_summarizer(client, model_name)
+    else:
+        model, provider = None, None
+        client = get_client()
+        summarizer = response_summarizer(client, model_name)
 
-    response: Response = client.responses.create(
-        model=model_name, instructions=system_message, input=user_input
+    conversation = Conversation(
+        store=ConversationStore(),
+        budget=default_budget(model),
+        stateful=supports_previous_response(provider),
+        summarizer=summarizer,
+        **({"conversation_id": args.conversation} if args.conversation else {}),
     )
-    logger.info(response)
+    logger.info(f"Conversation {conversation.conversation_id}")
 
     console = Console()
+    semantic, last_hit = None, None
+    if args.semantic_cache:
+        from semantic_cache import SemanticCache
+
+        semantic = SemanticCache(threshold=args.similarity)
+
+    hedger, loop = None, None
+    if args.hedge and (router is not None or registry_name is not None):
+        from hedge import Hedger, prime
+
+        hedger = Hedger(router)
+        # One loop for every turn: the pooled async clients keep connections bound to it
+        loop = asyncio.new_event_loop()
+    elif args.hedge:
+        logger.warning(
+            "--hedge needs a routed or OpenRouter model; turns are not hedged"
+        )
+
+    def stream_turn(route: Optional[Route] = None):
+        """
+        Sends the current turn with streaming enabled and renders it as it arrives.
+        """
+        started = time.perf_counter()
+        with telemetry.track(route.slug if route else model_name) as span:
+            span.prompt = turn["input"]
+            if route is None:
+                events = client.responses.create(
+                    model=model_name, instructions=system_message, **turn, stream=True
+                )
+            else:
+                events = get_client(route.model.provider).responses.create(
+                    **route.options(), instructions=system_message, **turn, stream=True
+                )
+            stats = span.result = stream_response(
+                events, console=console, started=started
+            )
+        return stats
+
+    def create_turn(route: Optional[Route] = None) -> Response:
+        """
+        Sends the current turn and waits for the complete response.
+        """
+        with telemetry.track(route.slug if route else model_name) as span:
+            span.prompt = turn["input"]
+            if route is None:
+                response = client.responses.create(
+                    model=model_name, instructions=system_message, **turn
+                )
+            else:
+                response = get_client(route.model.provider).responses.create(
+                    **route.options(), instructions=system_message, **turn
+                )
+            span.result = response
+        return response
+
+    async def hedged_turn():
+        """
+        Sends the current turn through the hedger, racing a slow first token (or a slow
+        response, without streaming) against the next upstream.
+        """
+        started = time.perf_counter()
+
+        async def attempt(route: Route):
+            client = get_async_client(route.model.provider)
+            request = {**route.options(), "instructions": system_message, **turn}
+            if not args.stream:
+                return await client.responses.create(**request)
+            events = await client.responses.create(**request, stream=True)
+            return await prime(
+                events, ready=lambda event: event.type == "response.output_text.delta"
+            )
+
+        with telemetry.track(model_name) as span:
+            span.prompt = turn["input"]
+            if router is None:
+                result = await hedger.call_model(registry_name, attempt)
+            else:
+                result = await hedger.call(attempt, args.sort, **capabilities)
+            if args.stream:
+                result = await astream_response(
+                    result, console=console, started=started
+                )
+            span.result = result
+        return result
+
+    while True:
+        user_input = Prompt.ask("User").strip()
+
+        if not user_input:
+            raise ValueError("User input cannot be empty")
+
+        if user_input == "/miss":
+            if (
+                semantic is not None
+                and last_hit
+                and semantic.report_false_hit(*last_hit)
+            ):
+                console.print("Dropped the cached answer; ask again for a fresh one.")
+            else:
+                console.print("No cached answer to report.")
+            continue
+
+        if semantic is not None:
+            last_hit = None
+            # The full history would make every turn's scope unique; only the last few
+            # messages, if any, have to match
+            recent = (
+                conversation.messages[-args.semantic_context :]
+                if args.semantic_context > 0
+                else []
+            )
+            scope = semantic.scope(
+                model_name, system_message, [(m.role, m.content) for m in recent]
+            )
+            hit = semantic.get(scope, user_input)
+            if hit is not None:
+                last_hit = (scope, user_input)
+                conversation.prepare(user_input)
+                conversation.commit(hit.response)
+                logger.info(
+                    f"Semantic cache hit, similarity {hit.similarity:.3f}: {semantic.stats}"
+                )
+                console.print("\nAssistant: ", "\n\n", Markdown(hit.response))
+                continue
+
+        turn = conversation.prepare(user_input)
+
+        send = stream_turn if args.stream else create_turn
+        if args.stream:
+            console.print("\nAssistant: ", "\n")
+
+        if hedger is not None:
+            result = loop.run_until_complete(hedged_turn())
+        elif router is None:
+            result = send()
+        else:
+            result = router.call(send, args.sort, **capabilities)
+
+        if args.stream:
+            logger.info(result)
+            conversation.commit(
+                result.text,
+                result.response_id,
+                result.input_tokens,
+                result.output_tokens,
+            )
+            answer = result.text
+        else:
+            response: Response = result
+            usage = response.usage
+            logger.info(
+                f"{response.id}: {usage.input_tokens if usage else '?'} input,"
+                f" {usage.output_tokens if usage else '?'} output tokens"
+            )
+            conversation.commit(
+                response.output_text,
+                response.id,
+                usage.input_tokens if usage else None,
+                usage.output_tokens if usage else None,
+            )
+
+            assistant_message = Markdown(response.output_text)
+            console.print("\nAssistant: ", "\n\n", assistant_message)
+            answer = response.output_text
+
+        if semantic is not None:
+            semantic.set(scope, user_input, answer)
+
 
-    assistant_message = Markdown(response.output_text)
-    console.print("\nAssistant: ", "\n\n", assistant_message)
+if __name__ == "__main__":
+    main()
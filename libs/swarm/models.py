@@ -1,25 +1,11 @@
 import os
 from dotenv import load_dotenv
-from pydantic import BaseModel, Field, field_validator, ValidationInfo
+from pydantic import Field
 from pydantic.dataclasses import dataclass
-from typing import Dict, Iterable, List, Literal, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Literal, Mapping, Optional
 from functools import partial
 from enum import StrEnum
 
-from openai.types.chat import (
-    ChatCompletionMessageParam,
-    ChatCompletionModality,
-    ChatCompletionAudioParam,
-    ChatCompletionReasoningEffort,
-    ChatCompletionPredictionContentParam,
-    ChatCompletionStreamOptionsParam,
-    ChatCompletionToolChoiceOptionParam,
-    ChatCompletionToolParam,
-    completion_create_params,
-)
-from openai.types.chat_model import ChatModel
-from openai.types.shared import Metadata
-
 load_dotenv()
 
 QUANTIZATIONS = Literal["int4", "int8", "fp6", "fp8", "fp16", "bf16", "fp32", "unknown"]
@@ -67,6 +53,7 @@ REASONING_MODELS = (
 class PROVIDER(StrEnum):
     OPENAI = "openai"
     OPENROUTER = "openrouter"
+    LOCAL = "local"
 
 
 @dataclass
@@ -81,6 +68,9 @@ class Provider:
     data_collection: Literal["allow", "deny"] = "allow"
     ignore: Optional[List[str]] = None
     quantizations: Optional[List[QUANTIZATIONS]] = None
+    # Requests and tokens per minute the client may send; learned from response headers if unset
+    rpm: Optional[int] = None
+    tpm: Optional[int] = None
 
     def __post_init__(self):
         """
@@ -89,6 +79,23 @@ class Provider:
         if self.api_key is None:
             self.api_key = os.getenv("OPENAI_API_KEY")
 
+    def preferences(self) -> Dict[str, object]:
+        """
+        Returns the OpenRouter `provider` routing object for this provider's settings.
+
+        Unset optional fields are omitted so OpenRouter applies its own defaults.
+        """
+        preferences = {
+            "sort": self.sort,
+            "order": self.order,
+            "allow_fallbacks": self.allow_fallbacks,
+            "require_parameters": self.require_parameters,
+            "data_collection": self.data_collection,
+            "ignore": self.ignore,
+            "quantizations": self.quantizations,
+        }
+        return {k: v for k, v in preferences.items() if v is not None}
+
 
 @dataclass
 class Model:
@@ -97,6 +104,12 @@ class Model:
     inputs: Optional[List[MODEL_INPUTS]] = None
     outputs: Optional[List[MODEL_OUTPUTS]] = None
     tags: Optional[List[OPENROUTER_TAGS]] = None
+    # USD per million tokens, used by price-sorted routing and cost estimates
+    input_price: Optional[float] = None
+    output_price: Optional[float] = None
+    context_window: Optional[int] = None
+    # ONNX file of a model served in-process by the local provider
+    path: Optional[str] = None
 
     def __post_init__(self):
         """
@@ -106,60 +119,45 @@ class Model:
             self.tags = []
 
 
-class BaseChatCompletions(BaseModel):
-    messages: Iterable[ChatCompletionMessageParam]
-    model: Union[str, ChatModel]
-    audio: Optional[ChatCompletionAudioParam] = None
-    frequency_penalty: Optional[float] = Field(ge=-2.0, le=2.0, default=0)
-    function_call: Optional[completion_create_params.FunctionCall] = None
-    functions: Optional[Iterable[completion_create_params.Function]] = None
-    logit_bias: Optional[Dict[str, int]] = None
-    logprobs: Optional[bool] = None
-    max_completion_tokens: Optional[int] = None
-    max_tokens: Optional[int] = None
-    metadata: Optional[Metadata] = None
-    modalities: Optional[List[ChatCompletionModality]] = None
-    n: Optional[int] = 1
-    parallel_tool_calls: Optional[bool] = None
-    prediction: Optional[ChatCompletionPredictionContentParam] = None
-    presence_penalty: Optional[float] = Field(ge=-2.0, le=2.0, default=0)
-    reasoning_effort: Optional[ChatCompletionReasoningEffort] = None
-    response_format: Optional[completion_create_params.ResponseFormat] = None
-    seed: Optional[int] = None
-    service_tier: Optional[Literal["auto", "default"]] = None
-    stop: Union[Optional[str], List[str]] = None
-    store: Optional[bool] = None
-    stream: Optional[Literal[False]] = None
-    stream_options: Optional[ChatCompletionStreamOptionsParam] = None
-    temperature: Optional[float] = None
-    tool_choice: Optional[ChatCompletionToolChoiceOptionParam] = None
-    tools: Optional[Iterable[ChatCompletionToolParam]] = None
-    top_logprobs: Optional[int] = None
-    top_p: Optional[float] = None
-    user: Optional[str] = None
-
-    @field_validator("reasoning_effort", mode="after")
-    @classmethod
-    def check_reasoning_effort(cls, v: str, info: ValidationInfo) -> str:
-        """
-        Validates that the reasoning_effort parameter is only set for supported models.
-        
-        Raises:
-            ValueError: If reasoning_effort is provided for a model not in REASONING_MODELS.
-        """
-        if v and info.data["model"] not in REASONING_MODELS:
-            raise ValueError(
-                f"Model {info.data['model']} does not support reasoning_effort"
-            )
-        return v
+class ModelRegistry(Mapping[str, Model]):
+    """
+    Read-only mapping of model names to `Model`s that are built on first access.
+
+    Entries are declared as zero-argument factories, so importing the registry only
+    stores them; a `Model` is validated the first time it is looked up and cached from
+    then on. Lookups that only need names (`in`, `len`, iteration) build nothing.
+    """
+
+    def __init__(self, factories: Dict[str, Callable[[], Model]]):
+        self._factories = factories
+        self._models: Dict[str, Model] = {}
+
+    def __getitem__(self, name: str) -> Model:
+        model = self._models.get(name)
+        if model is None:
+            model = self._models[name] = self._factories[name]()
+        return model
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._factories
 
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factories)
 
-class PPLXChatCompletions(BaseChatCompletions):
-    search_domain_filter: Optional[List[str]] = None
-    return_images: Optional[bool] = None
-    return_related_questions: Optional[bool] = None
-    search_recency_filter: Optional[Literal["day", "week", "month", "hour"]] = None
-    top_k: Optional[int] = Field(ge=0, le=2048, default=0)
+    def __len__(self) -> int:
+        return len(self._factories)
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Keeps `from models import BaseChatCompletions` working now that the request models,
+    and the OpenAI SDK types they pull in, live in `completions`.
+    """
+    if name in ("BaseChatCompletions", "PPLXChatCompletions"):
+        import completions
+
+        return getattr(completions, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 open_router = partial(
@@ -174,73 +172,142 @@ OR_GOOGLE = open_router(name="google")
 OR_XAI = open_router(name="xai")
 OR_MISTRAL = open_router(name="mistralai")
 
+# Runs models in-process with onnxruntime (see `local_inference`); no endpoint or key
+LOCAL = Provider(name=PROVIDER.LOCAL, api_key="", base_url=None)
 
-OPENROUTER_MODELS = {
-    "gpt-4.1": Model(
+
+# Prices are OpenRouter list prices in USD per million tokens; `catalog --refresh` fetches current ones
+OPENROUTER_MODELS = ModelRegistry({
+    "gpt-4.1": partial(
+        Model,
         provider=OR_OAI,
         types=["chat"],
         inputs=["text", "image"],
         outputs=["text"],
+        context_window=1047576,
+        input_price=2.0,
+        output_price=8.0,
     ),
-    "gpt-4.1-nano": Model(
+    "gpt-4.1-nano": partial(
+        Model,
         provider=OR_OAI,
         types=["chat", "fast"],
         inputs=["text", "image"],
         outputs=["text"],
+        context_window=1047576,
+        input_price=0.1,
+        output_price=0.4,
     ),
-    "gpt-4.1-mini": Model(
+    "gpt-4.1-mini": partial(
+        Model,
         provider=OR_OAI,
         types=["chat", "fast"],
         inputs=["text", "image"],
         outputs=["text"],
+        context_window=1047576,
+        input_price=0.4,
+        output_price=1.6,
     ),
-    "o3": Model(
+    "o3": partial(
+        Model,
         provider=OR_OAI,
         types=["reasoning"],
+        context_window=200000,
+        input_price=2.0,
+        output_price=8.0,
     ),
-    "o4-mini": Model(
+    "o4-mini": partial(
+        Model,
         provider=OR_OAI,
         types=["reasoning", "fast"],
+        context_window=200000,
+        input_price=1.1,
+        output_price=4.4,
     ),
-    "sonar": Model(
+    "sonar": partial(
+        Model,
         provider=OR_PPLX,
         types=["chat", "grounding"],
+        input_price=1.0,
+        output_price=1.0,
     ),
-    "sonar-reasoning": Model(
+    "sonar-reasoning": partial(
+        Model,
         provider=OR_PPLX,
         types=["reasoning", "grounding"],
+        input_price=1.0,
+        output_price=5.0,
     ),
-    "r1-1776": Model(
+    "r1-1776": partial(
+        Model,
         provider=OR_PPLX,
         types=["reasoning"],
+        input_price=2.0,
+        output_price=8.0,
     ),
-    "gemini-2.0-flash-001": Model(
+    "gemini-2.0-flash-001": partial(
+        Model,
         provider=OR_GOOGLE,
         types=["chat", "fast", "grounding"],
+        context_window=1048576,
+        input_price=0.1,
+        output_price=0.4,
     ),
-    "gemini-2.0-pro-exp-02-05": Model(
-        provider=OR_GOOGLE, types=["chat"], tags=["free"]
+    "gemini-2.0-pro-exp-02-05": partial(
+        Model,
+        provider=OR_GOOGLE,
+        types=["chat"],
+        tags=["free"],
+        input_price=0.0,
+        output_price=0.0,
     ),
-    "gemini-2.0-flash-thinking-exp": Model(
-        provider=OR_GOOGLE, types=["reasoning"], tags=["free"]
+    "gemini-2.0-flash-thinking-exp": partial(
+        Model,
+        provider=OR_GOOGLE,
+        types=["reasoning"],
+        tags=["free"],
+        input_price=0.0,
+        output_price=0.0,
     ),
-    "grok-2-1212": Model(
+    "grok-2-1212": partial(
+        Model,
         provider=OR_XAI,
         types=["chat"],
         inputs=["text"],
         outputs=["text"],
+        context_window=131072,
+        input_price=2.0,
+        output_price=10.0,
     ),
-    "grok-2-vision-1212": Model(
+    "grok-2-vision-1212": partial(
+        Model,
         provider=OR_XAI,
         types=["chat"],
         inputs=["text", "image"],
         outputs=["text"],
+        context_window=32768,
+        input_price=2.0,
+        output_price=10.0,
     ),
-    "mistral-small-24b-instruct-2501": Model(
+    "mistral-small-24b-instruct-2501": partial(
+        Model,
         provider=OR_MISTRAL,
         types=["chat", "fast"],
         inputs=["text"],
         outputs=["text"],
         tags=["free"],
+        context_window=32768,
+        input_price=0.0,
+        output_price=0.0,
+    ),
+    "bge-small-en-v1.5": partial(
+        Model,
+        provider=LOCAL,
+        types=["embeddings"],
+        inputs=["text"],
+        input_price=0.0,
+        output_price=0.0,
+        context_window=512,
+        path=os.getenv("SWARM_LOCAL_EMBEDDINGS_PATH", "models/bge-small-en-v1.5/model.onnx"),
     ),
-}
+})
@@ -0,0 +1,511 @@
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Tuple
+
+import httpx
+
+RETRY_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+# Wait between checks for a free concurrency slot
+POLL_INTERVAL = 0.01
+DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a rate-limit reset header into seconds from now.
+
+    Accepts OpenAI's durations ("1s", "6m0s", "20ms"), plain seconds, and OpenRouter's
+    epoch timestamps in milliseconds.
+    """
+    if not value:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        parts = DURATION.findall(value)
+        return (
+            sum(float(amount) * UNITS[unit] for amount, unit in parts)
+            if parts
+            else None
+        )
+    if number > 1e12:
+        return max(0.0, number / 1000 - time.time())
+    return number
+
+
+def retry_after(headers: httpx.Headers) -> Optional[float]:
+    """
+    Returns the seconds a 429 or 503 asks the client to wait, if it says.
+    """
+    if (value := headers.get("retry-after-ms")) is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    return parse_duration(headers.get("retry-after"))
+
+
+def estimate_request_tokens(content: bytes) -> int:
+    """
+    Estimates the tokens a request will be billed: its body at ~4 bytes per token plus the
+    requested output cap.
+    """
+    tokens = len(content) // 4
+    if b'"max_' in content:
+        try:
+            body = json.loads(content)
+        except ValueError:
+            return tokens
+        for key in ("max_completion_tokens", "max_tokens", "max_output_tokens"):
+            if isinstance(body.get(key), int):
+                return tokens + body[key]
+    return tokens
+
+
+class TokenBucket:
+    """
+    Refills `rate` units per second up to `capacity`; `take` reports how long a shortfall lasts.
+    """
+
+    def __init__(self, per_minute: float):
+        self.set_rate(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def set_rate(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+
+    def take(self, amount: float, now: float) -> float:
+        """
+        Takes `amount` units if available and returns 0, else returns the seconds until they are.
+        """
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            self.level -= amount
+            return 0.0
+        return (amount - self.level) / self.rate
+
+
+@dataclass
+class LimiterStats:
+    """
+    Counters for a `Limiter`.
+
+    Attributes:
+        admitted: Requests let through.
+        delayed: Admissions that had to wait for a slot, a bucket or a pause.
+        throttled: 429 responses received.
+        retries: Requests re-sent after a retryable failure.
+        decreases: Times the concurrency limit was cut.
+    """
+
+    admitted: int = 0
+    delayed: int = 0
+    throttled: int = 0
+    retries: int = 0
+    decreases: int = 0
+
+
+class Limiter:
+    """
+    Admission control for one provider endpoint: concurrency, requests/min and tokens/min.
+
+    Concurrency adapts by AIMD. While requests use the whole window, each success raises
+    the limit by about one per window's worth of requests. A 429, or time-to-headers
+    inflating beyond `inflation` times its long-run baseline, halves the limit, at most
+    once per `cooldown`.
+
+    The request and token budgets are token buckets. They start from the configured
+    rpm/tpm and follow the provider's `x-ratelimit-limit-*` headers when it sends them. A
+    `retry-after`, or a `x-ratelimit-remaining-*` of zero, pauses every admission until
+    the advertised reset.
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        concurrency: float = 16,
+        min_concurrency: float = 1,
+        max_concurrency: float = 512,
+        decrease: float = 0.5,
+        inflation: float = 3.0,
+        cooldown: float = 1.0,
+    ):
+        """
+        Initializes the limiter.
+
+        Args:
+            rpm: Requests per minute allowed. Unlimited if None, until the provider advertises a limit.
+            tpm: Tokens per minute allowed. Unlimited if None, until the provider advertises a limit.
+            concurrency: Initial concurrency limit.
+            min_concurrency: Floor the limit never drops below.
+            max_concurrency: Ceiling the limit never grows above.
+            decrease: Factor applied to the limit on congestion.
+            inflation: Time-to-headers over baseline that counts as congestion.
+            cooldown: Minimum seconds between two decreases.
+        """
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.limit, self.min_concurrency, self.max_concurrency = (
+            concurrency,
+            min_concurrency,
+            max_concurrency,
+        )
+        self.decrease, self.inflation, self.cooldown = decrease, inflation, cooldown
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.latency: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.samples = 0
+        self.stats = LimiterStats()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def admit(self, tokens: int) -> float:
+        """
+        Admits a request if every budget allows it and returns 0, else returns seconds to wait.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.in_flight >= max(self.min_concurrency, int(self.limit)):
+                return POLL_INTERVAL
+            if self.requests is not None and (wait := self.requests.take(1, now)):
+                return wait
+            if self.tokens is not None and (wait := self.tokens.take(tokens, now)):
+                if self.requests is not None:
+                    self.requests.level += 1
+                return wait
+            self.in_flight += 1
+            self.stats.admitted += 1
+            return 0.0
+
+    def release(
+        self,
+        status: Optional[int],
+        elapsed: float,
+        headers: Optional[httpx.Headers] = None,
+    ):
+        """
+        Returns a slot and adapts the limits to the outcome of the request.
+
+        Args:
+            status: HTTP status, or None if the request failed without a response.
+            elapsed: Seconds until the response headers arrived.
+            headers: Response headers carrying rate-limit state.
+        """
+        with self._lock:
+            busy = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            now = time.monotonic()
+            if headers is not None:
+                self._follow(headers, now)
+            if status == 429:
+                self.stats.throttled += 1
+                wait = retry_after(headers) if headers is not None else None
+                self.paused_until = max(self.paused_until, now + (wait or 0.0))
+                self._back_off(now)
+                return
+            if status is None or status >= 500:
+                return
+            self.latency = (
+                elapsed
+                if self.latency is None
+                else self.latency + 0.2 * (elapsed - self.latency)
+            )
+            self.baseline = (
+                elapsed
+                if self.baseline is None
+                else self.baseline + 0.01 * (elapsed - self.baseline)
+            )
+            self.samples += 1
+            if self.samples >= 20 and self.latency > self.inflation * self.baseline:
+                self._back_off(now)
+            elif busy:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    def _back_off(self, now: float):
+        if now - self._last_decrease < self.cooldown:
+            return
+        self.limit = max(self.min_concurrency, self.limit * self.decrease)
+        self._last_decrease = now
+        self.stats.decreases += 1
+
+    def _follow(self, headers: httpx.Headers, now: float):
+        """
+        Adopts the limits a provider advertises and pauses when a budget is spent.
+        """
+        for kind in ("requests", "tokens"):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            if limit is not None and limit.isdigit() and int(limit) > 0:
+                bucket = getattr(self, kind)
+                if bucket is None:
+                    setattr(self, kind, TokenBucket(int(limit)))
+                elif bucket.capacity != int(limit):
+                    bucket.set_rate(int(limit))
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining == "0":
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if reset:
+                    self.paused_until = max(self.paused_until, now + reset)
+        # OpenRouter's per-key window
+        if headers.get("x-ratelimit-remaining") == "0":
+            reset = parse_duration(headers.get("x-ratelimit-reset"))
+            if reset:
+                self.paused_until = max(self.paused_until, now + reset)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Retries with decorrelated jitter: each wait is drawn from [base, 3 x previous wait], capped.
+
+    Attributes:
+        max_retries: Retries after the first attempt.
+        base: Smallest wait in seconds.
+        cap: Largest wait in seconds.
+    """
+
+    max_retries: int = 3
+    base: float = 0.5
+    cap: float = 30.0
+
+    def backoff(self, previous: float) -> float:
+        return min(self.cap, random.uniform(self.base, max(self.base, previous * 3)))
+
+    def wait(self, previous: float, response: Optional[httpx.Response]) -> float:
+        """
+        Returns the next wait: the server's `retry-after` plus up to 10% jitter when it sends a
+        sane one, else the next decorrelated backoff.
+        """
+        advised = retry_after(response.headers) if response is not None else None
+        if advised is not None and advised <= self.cap * 2:
+            return advised * random.uniform(1.0, 1.1)
+        return self.backoff(previous)
+
+
+class ReleasingStream(httpx.SyncByteStream):
+    """
+    Response body that returns the limiter slot once the body is closed, so a streamed
+    reply holds its slot until it is fully read. A body dropped without being closed
+    returns the slot when it is garbage collected.
+    """
+
+    def __init__(self, stream: Any, release: Callable[[], None]):
+        self.stream = stream
+        self.release = weakref.finalize(self, release)
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self.stream
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            self.release()
+
+
+class AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: Any, release: Callable[[], None]):
+        self.stream = stream
+        self.release = weakref.finalize(self, release)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            self.release()
+
+
+def retried(limiter: Limiter, on_retry: Optional[Callable[[], None]]):
+    limiter.stats.retries += 1
+    if on_retry is not None:
+        on_retry()
+
+
+def releaser(
+    limiter: Limiter, response: httpx.Response, elapsed: float
+) -> Callable[[], None]:
+    # Must not reference the response, or its finalizer would keep it alive
+    status, headers = response.status_code, response.headers
+    return lambda: limiter.release(status, elapsed, headers)
+
+
+def admission_deadline(request: httpx.Request) -> Optional[float]:
+    """
+    Returns when waiting for admission should give up: after the request's pool timeout.
+    """
+    timeout = (request.extensions.get("timeout") or {}).get("pool")
+    return None if timeout is None else time.monotonic() + timeout
+
+
+def bounded(wait: float, deadline: Optional[float], request: httpx.Request) -> float:
+    """
+    Shortens a wait to the admission deadline.
+
+    Raises:
+        httpx.PoolTimeout: If the deadline has passed.
+    """
+    if deadline is None:
+        return wait
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise httpx.PoolTimeout(
+            "Timed out waiting for the rate limiter to admit the request",
+            request=request,
+        )
+    return min(wait, remaining)
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """
+    httpx transport that admits every request through a `Limiter` and retries retryable
+    failures with decorrelated jitter.
+
+    Installed by `ClientRegistry` under each provider's client, so every call path shares
+    one limiter per endpoint; the SDK's own retries are turned off in favour of these.
+    Waiting for admission gives up with `httpx.PoolTimeout` after the request's pool timeout.
+    """
+
+    def __init__(
+        self,
+        limiter: Limiter,
+        transport: Optional[httpx.BaseTransport] = None,
+        retry: Optional[RetryPolicy] = None,
+        on_retry: Optional[Callable[[], None]] = None,
+    ):
+        self.limiter = limiter
+        self.transport = transport or httpx.HTTPTransport()
+        self.retry = retry or RetryPolicy()
+        self.on_retry = on_retry
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        tokens = estimate_request_tokens(request.content)
+        previous = self.retry.base
+        for attempt in range(self.retry.max_retries + 1):
+            if wait := self.limiter.admit(tokens):
+                self.limiter.stats.delayed += 1
+                deadline = admission_deadline(request)
+                while wait:
+                    time.sleep(bounded(wait, deadline, request))
+                    wait = self.limiter.admit(tokens)
+            started = time.perf_counter()
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError:
+                self.limiter.release(None, time.perf_counter() - started)
+                if attempt == self.retry.max_retries:
+                    raise
+                response = None
+            except BaseException:
+                self.limiter.release(None, time.perf_counter() - started)
+                raise
+            else:
+                elapsed = time.perf_counter() - started
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or attempt == self.retry.max_retries
+                ):
+                    release = releaser(self.limiter, response, elapsed)
+                    if response.is_closed:
+                        # The body was already read into memory
+                        release()
+                    else:
+                        response.stream = ReleasingStream(response.stream, release)
+                    return response
+                response.close()
+                self.limiter.release(response.status_code, elapsed, response.headers)
+            previous = self.retry.wait(previous, response)
+            retried(self.limiter, self.on_retry)
+            time.sleep(previous)
+        raise AssertionError("unreachable")
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Async counterpart of `RateLimitedTransport`, sharing the same `Limiter`.
+    """
+
+    def __init__(
+        self,
+        limiter: Limiter,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        retry: Optional[RetryPolicy] = None,
+        on_retry: Optional[Callable[[], None]] = None,
+    ):
+        self.limiter = limiter
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.retry = retry or RetryPolicy()
+        self.on_retry = on_retry
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        tokens = estimate_request_tokens(request.content)
+        previous = self.retry.base
+        for attempt in range(self.retry.max_retries + 1):
+            if wait := self.limiter.admit(tokens):
+                self.limiter.stats.delayed += 1
+                deadline = admission_deadline(request)
+                while wait:
+                    await asyncio.sleep(bounded(wait, deadline, request))
+                    wait = self.limiter.admit(tokens)
+            started = time.perf_counter()
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError:
+                self.limiter.release(None, time.perf_counter() - started)
+                if attempt == self.retry.max_retries:
+                    raise
+                response = None
+            except BaseException:
+                self.limiter.release(None, time.perf_counter() - started)
+                raise
+            else:
+                elapsed = time.perf_counter() - started
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or attempt == self.retry.max_retries
+                ):
+                    release = releaser(self.limiter, response, elapsed)
+                    if response.is_closed:
+                        # The body was already read into memory
+                        release()
+                    else:
+                        response.stream = AsyncReleasingStream(response.stream, release)
+                    return response
+                await response.aclose()
+                self.limiter.release(response.status_code, elapsed, response.headers)
+            previous = self.retry.wait(previous, response)
+            retried(self.limiter, self.on_retry)
+            await asyncio.sleep(previous)
+        raise AssertionError("unreachable")
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def limits_from_env() -> Tuple[Optional[float], Optional[float]]:
+    """
+    Returns the default (rpm, tpm) budgets from `SWARM_RPM` / `SWARM_TPM`.
+    """
+    rpm, tpm = os.getenv("SWARM_RPM"), os.getenv("SWARM_TPM")
+    return (float(rpm) if rpm else None, float(tpm) if tpm else None)
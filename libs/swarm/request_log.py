@@ -0,0 +1,445 @@
+"""
+Append-only columnar log of model calls, for offline analysis with polars.
+
+Calls are buffered in memory and written by a background thread as Parquet (or Arrow IPC)
+files named `requests-<time>-<pid>-<token>-<sequence>.<ext>`, unique across processes
+sharing a directory. Each flush writes a new, immutable part file; once the parts of the
+open segment reach the size limit, or the log is closed, they are compacted into a single
+file under the first part's name, so a directory holds a few large files rather than many
+tiny ones. Every write goes through a temporary file and a rename, so readers never see a
+partial file, though a scan racing a compaction may count the compacted rows twice.
+
+Query a log lazily, without loading it:
+
+    frame = scan("logs/requests", since=timedelta(hours=1))
+    print(summary(frame))
+
+or from `libs/swarm`:
+
+    python -m request_log logs/requests [--since 3600] [--by model provider]
+"""
+
+import atexit
+import datetime
+import glob
+import hashlib
+import os
+import secrets
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Literal, Optional, Sequence, Tuple, Union
+
+import polars as pl
+from loguru import logger
+
+from cache import canonical_json
+
+FORMAT = Literal["parquet", "ipc"]
+EXTENSIONS: Dict[str, str] = {"parquet": "parquet", "ipc": "arrow"}
+
+SCHEMA: Dict[str, Any] = {
+    "time": pl.Datetime("us", "UTC"),
+    "id": pl.String,
+    "model": pl.String,
+    "provider": pl.String,
+    "status": pl.String,
+    "error": pl.String,
+    "latency": pl.Float64,
+    "ttft": pl.Float64,
+    "input_tokens": pl.Int64,
+    "output_tokens": pl.Int64,
+    "reasoning_tokens": pl.Int64,
+    "cost": pl.Float64,
+    "prompt_hash": pl.String,
+    "prompt": pl.String,
+    "response": pl.String,
+}
+
+
+def prompt_hash(prompt: Any) -> Optional[str]:
+    """
+    Returns a short content hash of a prompt (a string or a list of messages), for grouping repeats.
+    """
+    if prompt is None:
+        return None
+    text = prompt if isinstance(prompt, str) else canonical_json(prompt)
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def response_id(result: Any) -> Optional[str]:
+    return getattr(result, "id", None) or getattr(result, "response_id", None)
+
+
+def response_text(result: Any) -> Optional[str]:
+    """
+    Extracts the output text from a chat completion, a Responses API response or a `TurnStats`.
+    """
+    if result is None:
+        return None
+    choices = getattr(result, "choices", None)
+    if choices:
+        return getattr(choices[0].message, "content", None)
+    for name in ("output_text", "text", "content"):
+        value = getattr(result, name, None)
+        if isinstance(value, str):
+            return value
+    return None
+
+
+@dataclass
+class RequestLogStats:
+    """
+    Counters for a `RequestLog`.
+
+    Attributes:
+        rows: Calls written to disk.
+        flushes: Part files written.
+        segments: Segments compacted from their parts.
+        dropped: Calls discarded because the buffer was full or a write failed.
+    """
+
+    rows: int = 0
+    flushes: int = 0
+    segments: int = 0
+    dropped: int = 0
+
+
+class RequestLog:
+    """
+    Buffers call records and writes them as columnar segments from a background thread.
+
+    `append` only queues the record, so logging never blocks the request path; hashing,
+    payload extraction and file writes happen on the writer thread. The writer flushes
+    every `flush_interval` seconds, or sooner once `batch_size` records are waiting, and
+    once more at exit.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        format: FORMAT = "parquet",
+        payloads: bool = False,
+        batch_size: int = 1024,
+        flush_interval: float = 5.0,
+        segment_bytes: int = 16 * 2**20,
+        max_bytes: Optional[int] = None,
+        max_pending: int = 100_000,
+    ):
+        """
+        Initializes the log, creating `directory` if needed.
+
+        Args:
+            directory: Directory holding the segments.
+            format: "parquet" for zstd-compressed Parquet, "ipc" for Arrow IPC files.
+            payloads: Store the prompt and response text as well as their metadata.
+            batch_size: Queued records that trigger an early flush.
+            flush_interval: Seconds between flushes.
+            segment_bytes: In-memory size at which a segment's parts are compacted and a new one started; files are smaller once compressed.
+            max_bytes: Total size of the segments on disk, beyond which the oldest are deleted. Unbounded if None.
+            max_pending: Queued records kept at most; older ones are dropped if the writer falls this far behind.
+        """
+        self.directory, self.format, self.payloads = directory, format, payloads
+        self.batch_size, self.flush_interval = batch_size, flush_interval
+        self.segment_bytes, self.max_bytes = segment_bytes, max_bytes
+        self.stats = RequestLogStats()
+        os.makedirs(directory, exist_ok=True)
+        self._pending: Deque[Tuple[datetime.datetime, Dict[str, Any]]] = deque(
+            maxlen=max_pending
+        )
+        self._parts: List[str] = []
+        self._size = 0
+        self._sequence = 0
+        self._token = secrets.token_hex(3)
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @classmethod
+    def from_env(cls) -> Optional["RequestLog"]:
+        """
+        Builds a log from `SWARM_REQUEST_LOG*` environment variables, or returns None if unset.
+
+        `SWARM_REQUEST_LOG` names the directory, `SWARM_REQUEST_LOG_FORMAT` picks "parquet" or
+        "ipc", `SWARM_REQUEST_LOG_PAYLOADS=1` keeps prompt and response text, and
+        `SWARM_REQUEST_LOG_MAX_BYTES` bounds the directory size.
+        """
+        directory = os.getenv("SWARM_REQUEST_LOG")
+        if not directory:
+            return None
+        max_bytes = os.getenv("SWARM_REQUEST_LOG_MAX_BYTES")
+        return cls(
+            directory,
+            format=os.getenv("SWARM_REQUEST_LOG_FORMAT", "parquet"),  # type: ignore[arg-type]
+            payloads=os.getenv("SWARM_REQUEST_LOG_PAYLOADS", "0") not in ("", "0"),
+            max_bytes=int(max_bytes) if max_bytes else None,
+        )
+
+    def append(self, **fields: Any):
+        """
+        Queues one call record.
+
+        Args:
+            fields: Columns of `SCHEMA` other than `time`, `prompt_hash`, `id` and `response`,
+                plus the raw `prompt` and `result`, which are hashed and extracted on the writer thread.
+        """
+        if self._closed:
+            return
+        if len(self._pending) == self._pending.maxlen:
+            self.stats.dropped += 1
+        self._pending.append((datetime.datetime.now(datetime.timezone.utc), fields))
+        if self._thread is None:
+            self._start()
+        elif len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def flush(self):
+        """
+        Writes every queued record as a new part of the open segment, compacting the segment if it has grown too large.
+        """
+        with self._lock:
+            rows = [
+                self._row(*self._pending.popleft()) for _ in range(len(self._pending))
+            ]
+            if not rows:
+                return
+            batch = pl.from_dicts(rows, schema=SCHEMA)
+            path = self._next_path()
+            try:
+                self._write(batch, path)
+            except Exception:
+                self.stats.dropped += len(rows)
+                logger.opt(exception=True).warning(
+                    f"Could not write request log part {path}"
+                )
+                return
+            self.stats.rows += len(rows)
+            self.stats.flushes += 1
+            self._parts.append(path)
+            self._size += batch.estimated_size()
+            if self._size >= self.segment_bytes:
+                self._rotate()
+
+    def close(self):
+        """
+        Stops the writer thread after a final flush.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        with self._lock:
+            self._rotate()
+
+    def segments(self) -> List[str]:
+        """
+        Lists the segment files, oldest first.
+        """
+        return segments(self.directory, self.format)
+
+    def scan(self, **filters: Any) -> pl.LazyFrame:
+        """
+        Scans this log's segments lazily; see `scan`. Records still queued are not included.
+        """
+        return scan(self.directory, **filters)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="swarm-request-log", daemon=True
+            )
+            self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _row(self, time: datetime.datetime, fields: Dict[str, Any]) -> Dict[str, Any]:
+        prompt, result = fields.pop("prompt", None), fields.pop("result", None)
+        row = {
+            **fields,
+            "time": time,
+            "id": response_id(result),
+            "prompt_hash": prompt_hash(prompt),
+        }
+        row["status"] = "error" if row.get("error") else "ok"
+        if self.payloads:
+            row["prompt"] = (
+                prompt
+                if prompt is None or isinstance(prompt, str)
+                else canonical_json(prompt)
+            )
+            row["response"] = response_text(result)
+        return row
+
+    def _next_path(self) -> str:
+        self._sequence += 1
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S")
+        name = f"requests-{stamp}-{os.getpid()}-{self._token}-{self._sequence:06d}.{EXTENSIONS[self.format]}"
+        return os.path.join(self.directory, name)
+
+    def _rotate(self):
+        """
+        Compacts the open segment's parts into one file under the first part's name and starts a new segment.
+        """
+        parts = [path for path in self._parts if os.path.exists(path)]
+        self._parts, self._size = [], 0
+        if len(parts) > 1:
+            try:
+                if self.format == "ipc":
+                    segment = pl.concat(
+                        [pl.read_ipc(path, memory_map=False) for path in parts]
+                    )
+                else:
+                    segment = pl.read_parquet(parts)
+                self._write(segment, parts[0])
+            except Exception:
+                logger.opt(exception=True).warning(
+                    f"Could not compact request log segment {parts[0]}"
+                )
+                return
+            for path in parts[1:]:
+                os.remove(path)
+        if parts:
+            self.stats.segments += 1
+        self._retain()
+
+    def _write(self, frame: pl.DataFrame, path: str):
+        directory, name = os.path.split(path)
+        temporary = os.path.join(directory, f".{name}.tmp")
+        if self.format == "ipc":
+            frame.write_ipc(temporary, compression="zstd")
+        else:
+            frame.write_parquet(temporary, compression="zstd", statistics=True)
+        os.replace(temporary, path)
+
+    def _retain(self):
+        if self.max_bytes is None:
+            return
+        files = self.segments()
+        sizes = [os.path.getsize(f) for f in files]
+        total = sum(sizes)
+        for path, size in zip(files, sizes):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+def segments(directory: str, format: Optional[FORMAT] = None) -> List[str]:
+    """
+    Lists the segment files in a log directory, oldest first, optionally of one format only.
+    """
+    formats = [format] if format else list(EXTENSIONS)
+    files = [
+        f
+        for fmt in formats
+        for f in glob.glob(os.path.join(directory, f"requests-*.{EXTENSIONS[fmt]}"))
+    ]
+    return sorted(files, key=os.path.basename)
+
+
+def scan(
+    directory: str,
+    since: Union[datetime.datetime, datetime.timedelta, None] = None,
+    until: Optional[datetime.datetime] = None,
+) -> pl.LazyFrame:
+    """
+    Lazily scans every segment in a log directory, Parquet and IPC alike.
+
+    Nothing is read until the frame is collected, and filters on `time`, `model` and the
+    other columns are pushed down to the scan, skipping row groups whose statistics rule
+    them out.
+
+    Args:
+        directory: Directory holding the segments.
+        since: Earliest call time, or how far back from now to start.
+        until: Latest call time.
+    """
+    frames = []
+    for fmt, extension in EXTENSIONS.items():
+        if segments(directory, fmt):  # type: ignore[arg-type]
+            pattern = os.path.join(directory, f"requests-*.{extension}")
+            frames.append(
+                pl.scan_parquet(pattern) if fmt == "parquet" else pl.scan_ipc(pattern)
+            )
+    if not frames:
+        return pl.LazyFrame(schema=SCHEMA)
+    frame = frames[0] if len(frames) == 1 else pl.concat(frames, how="vertical_relaxed")
+    if isinstance(since, datetime.timedelta):
+        since = datetime.datetime.now(datetime.timezone.utc) - since
+    if since is not None:
+        frame = frame.filter(pl.col("time") >= since)
+    if until is not None:
+        frame = frame.filter(pl.col("time") <= until)
+    return frame
+
+
+def summary(
+    frame: pl.LazyFrame, by: Sequence[str] = ("model", "provider")
+) -> pl.DataFrame:
+    """
+    Aggregates calls per group: volume, error rate, latency and TTFT percentiles, tokens and cost.
+    """
+    return (
+        frame.group_by(list(by))
+        .agg(
+            pl.len().alias("calls"),
+            (pl.col("status") == "error").mean().alias("error_rate"),
+            pl.col("latency").quantile(0.5).alias("latency_p50"),
+            pl.col("latency").quantile(0.95).alias("latency_p95"),
+            pl.col("ttft").quantile(0.5).alias("ttft_p50"),
+            pl.col("input_tokens").sum(),
+            pl.col("output_tokens").sum(),
+            pl.col("cost").sum(),
+        )
+        .sort("calls", descending=True)
+        .collect()
+    )
+
+
+def repeats(frame: pl.LazyFrame, min_count: int = 2) -> pl.DataFrame:
+    """
+    Counts prompts sent more than once per model: the calls a response cache could have answered.
+    """
+    return (
+        frame.filter(pl.col("prompt_hash").is_not_null())
+        .group_by("model", "prompt_hash")
+        .agg(pl.len().alias("calls"), pl.col("cost").sum())
+        .filter(pl.col("calls") >= min_count)
+        .sort("calls", descending=True)
+        .collect()
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize a request log directory")
+    parser.add_argument("directory")
+    parser.add_argument(
+        "--since", type=float, help="Only calls from the last N seconds"
+    )
+    parser.add_argument(
+        "--by", nargs="+", default=["model", "provider"], help="Columns to group by"
+    )
+    parser.add_argument(
+        "--repeats", action="store_true", help="List repeated prompts instead"
+    )
+    args = parser.parse_args()
+
+    frame = scan(
+        args.directory,
+        since=datetime.timedelta(seconds=args.since) if args.since else None,
+    )
+    with pl.Config(tbl_rows=50, tbl_cols=-1):
+        print(repeats(frame) if args.repeats else summary(frame, args.by))
@@ -0,0 +1,415 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from models import (
+    MODEL_INPUTS,
+    MODEL_OUTPUTS,
+    MODEL_TYPES,
+    OPENROUTER_MODELS,
+    OPENROUTER_TAGS,
+    Model,
+)
+
+T = TypeVar("T")
+
+SORT = Literal["price", "throughput", "latency"]
+
+
+@dataclass
+class EndpointStats:
+    """
+    Live performance statistics for one model served by one upstream provider.
+
+    Latency, TTFT and throughput are exponentially weighted moving averages. A second,
+    slower average of latency serves as the baseline for detecting degradation.
+
+    Attributes:
+        alpha: Weight of the newest sample in the fast averages.
+        latency: Smoothed end-to-end latency in seconds.
+        baseline: Slowly smoothed latency used as the reference for degradation.
+        ttft: Smoothed time-to-first-token in seconds, when streaming callers report it.
+        throughput: Smoothed output tokens per second.
+        error_rate: Smoothed fraction of failed calls.
+        failures: Consecutive failures since the last success.
+        cooldown_until: Monotonic time before which the endpoint is skipped.
+        samples: Number of successful calls observed.
+    """
+
+    alpha: float = 0.2
+    latency: Optional[float] = None
+    baseline: Optional[float] = None
+    ttft: Optional[float] = None
+    throughput: Optional[float] = None
+    error_rate: float = 0.0
+    failures: int = 0
+    cooldown_until: float = 0.0
+    samples: int = 0
+
+    def observe(
+        self,
+        latency: float,
+        ttft: Optional[float] = None,
+        output_tokens: Optional[int] = None,
+    ):
+        """
+        Folds a successful call into the averages and clears the failure streak.
+        """
+        self.latency = self._ewma(self.latency, latency, self.alpha)
+        self.baseline = self._ewma(self.baseline, latency, self.alpha / 10)
+        if ttft is not None:
+            self.ttft = self._ewma(self.ttft, ttft, self.alpha)
+        if output_tokens:
+            generation = latency - (ttft or 0.0)
+            if generation > 0:
+                self.throughput = self._ewma(
+                    self.throughput, output_tokens / generation, self.alpha
+                )
+        self.error_rate *= 1 - self.alpha
+        self.failures = 0
+        self.samples += 1
+
+    def observe_error(self, max_failures: int, cooldown: float):
+        """
+        Records a failed call, putting the endpoint on cooldown after `max_failures` in a row.
+        """
+        self.error_rate = self.error_rate * (1 - self.alpha) + self.alpha
+        self.failures += 1
+        if self.failures >= max_failures:
+            self.cooldown_until = time.monotonic() + cooldown
+
+    def degraded(self, factor: float) -> bool:
+        """
+        Whether recent latency has inflated beyond `factor` times the long-run baseline.
+        """
+        return (
+            self.samples >= 5
+            and self.latency is not None
+            and self.baseline is not None
+            and self.latency > factor * self.baseline
+        )
+
+    @staticmethod
+    def _ewma(current: Optional[float], sample: float, alpha: float) -> float:
+        return sample if current is None else current + alpha * (sample - current)
+
+
+@dataclass(frozen=True)
+class Route:
+    """
+    A concrete target for a request: a registry model, optionally pinned to one upstream.
+
+    Attributes:
+        name: Key of the model in the registry, e.g. "gpt-4.1".
+        model: The registry entry.
+        upstream: Upstream provider to pin via OpenRouter routing, taken from `Provider.order`.
+        rank: Position of the model in the registry, used to break ties deterministically.
+    """
+
+    name: str
+    model: Model = field(compare=False, hash=False)
+    upstream: Optional[str] = None
+    rank: int = field(default=0, compare=False)
+
+    @property
+    def slug(self) -> str:
+        return f"{self.model.provider.name}/{self.name}"
+
+    @property
+    def key(self) -> Tuple[str, Optional[str]]:
+        return (self.slug, self.upstream)
+
+    def options(self) -> Dict[str, Any]:
+        """
+        Returns the keyword arguments that point a client call at this route.
+
+        When the route is pinned to an upstream, OpenRouter's own fallbacks are disabled
+        so failover decisions stay with the router.
+        """
+        preferences = self.model.provider.preferences()
+        if self.upstream is not None:
+            preferences["order"] = [self.upstream]
+            preferences["allow_fallbacks"] = False
+        return {"model": self.slug, "extra_body": {"provider": preferences}}
+
+
+class ModelRouter:
+    """
+    Picks models by capability and orders them by live latency, TTFT and throughput.
+
+    Candidates are ranked by the requested sort (falling back to the sort configured on
+    the best candidate's `Provider`). Upstreams named in `Provider.order` are tried in that
+    order, minus anything in `Provider.ignore`; other models are only tried when the
+    provider sets `allow_fallbacks`. Endpoints that fail repeatedly are put on cooldown and
+    endpoints whose latency inflates are demoted behind healthy ones. Endpoints with no
+    samples yet rank ahead of measured ones, so every candidate is explored.
+    """
+
+    def __init__(
+        self,
+        models: Optional[Mapping[str, Model]] = None,
+        alpha: float = 0.2,
+        max_failures: int = 3,
+        cooldown: float = 30.0,
+        degrade_factor: float = 3.0,
+    ):
+        """
+        Initializes the router.
+
+        Args:
+            models: Registry to route over. Defaults to `OPENROUTER_MODELS`.
+            alpha: Weight of the newest sample in the moving averages.
+            max_failures: Consecutive failures that put an endpoint on cooldown.
+            cooldown: Seconds an endpoint is skipped after tripping `max_failures`.
+            degrade_factor: Latency inflation over baseline that marks an endpoint as degraded.
+        """
+        self.models = OPENROUTER_MODELS if models is None else models
+        self.alpha, self.max_failures, self.cooldown, self.degrade_factor = (
+            alpha,
+            max_failures,
+            cooldown,
+            degrade_factor,
+        )
+        self._stats: Dict[Tuple[str, Optional[str]], EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def stats(self, route: Route) -> EndpointStats:
+        """
+        Returns the live statistics for a route, creating empty ones on first use.
+        """
+        stats = self._stats.get(route.key)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(
+                    route.key, EndpointStats(alpha=self.alpha)
+                )
+        return stats
+
+    def candidates(
+        self,
+        types: Optional[List[MODEL_TYPES]] = None,
+        inputs: Optional[List[MODEL_INPUTS]] = None,
+        outputs: Optional[List[MODEL_OUTPUTS]] = None,
+        tags: Optional[List[OPENROUTER_TAGS]] = None,
+    ) -> List[Route]:
+        """
+        Lists every route whose model offers all of the requested capabilities.
+
+        Models that do not declare inputs or outputs are assumed to be text-only. Embeddings
+        models cannot take chat turns, so they are only listed when "embeddings" is requested.
+        """
+        routes = []
+        for rank, (name, model) in enumerate(self.models.items()):
+            if "embeddings" in (model.types or ()) and "embeddings" not in (
+                types or ()
+            ):
+                continue
+            if not (
+                set(types or ()) <= set(model.types or ())
+                and set(inputs or ()) <= set(model.inputs or ["text"])
+                and set(outputs or ()) <= set(model.outputs or ["text"])
+                and set(tags or ()) <= set(model.tags or ())
+            ):
+                continue
+            routes.extend(self.upstreams(name, model, rank))
+        return routes
+
+    def upstreams(
+        self, name: str, model: Optional[Model] = None, rank: int = 0
+    ) -> List[Route]:
+        """
+        Returns one route per upstream of a registry model, in `Provider.order` minus `Provider.ignore`.
+
+        A model without an explicit order gets a single unpinned route.
+        """
+        model = self.models[name] if model is None else model
+        ignored = set(model.provider.ignore or ())
+        upstreams = [u for u in model.provider.order or () if u not in ignored] or [
+            None
+        ]
+        return [Route(name, model, upstream, rank) for upstream in upstreams]
+
+    def plan(self, sort: Optional[SORT] = None, **capabilities: Any) -> List[Route]:
+        """
+        Returns the routes to try, in order, for a capability request.
+
+        Args:
+            sort: Ranking criterion; defaults to the `Provider.sort` of the best-declared candidate.
+            **capabilities: `types`, `inputs`, `outputs` and `tags` filters.
+
+        Returns:
+            The best route first, followed by its model's remaining upstreams in `Provider.order`,
+            then every other candidate if the chosen provider allows fallbacks.
+
+        Raises:
+            LookupError: If no registry model matches the requested capabilities.
+        """
+        routes = self.candidates(**capabilities)
+        if not routes:
+            raise LookupError(f"No model matches {capabilities}")
+        sort = sort or routes[0].model.provider.sort
+        ranked = sorted(routes, key=lambda route: self._sort_key(route, sort))
+
+        best = ranked[0]
+        plan = [best] + [
+            r for r in routes if r.name == best.name and r != best and self._healthy(r)
+        ]
+        if best.model.provider.allow_fallbacks:
+            plan += [r for r in ranked if r not in plan]
+        return plan
+
+    def select(self, sort: Optional[SORT] = None, **capabilities: Any) -> Route:
+        """
+        Returns the single best route for a capability request.
+        """
+        return self.plan(sort, **capabilities)[0]
+
+    def observe(
+        self,
+        route: Route,
+        latency: float,
+        ttft: Optional[float] = None,
+        output_tokens: Optional[int] = None,
+    ):
+        """
+        Records a successful call against a route.
+        """
+        stats = self.stats(route)
+        with self._lock:
+            stats.observe(latency, ttft, output_tokens)
+
+    def observe_error(self, route: Route):
+        """
+        Records a failed call against a route.
+        """
+        stats = self.stats(route)
+        with self._lock:
+            stats.observe_error(self.max_failures, self.cooldown)
+
+    def call(
+        self, fn: Callable[[Route], T], sort: Optional[SORT] = None, **capabilities: Any
+    ) -> T:
+        """
+        Calls `fn` with each planned route until one succeeds.
+
+        Successful calls update the route's latency and, when the result carries `usage`
+        (or `ttft`/`output_tokens`, like a streamed `TurnStats`), its TTFT and throughput.
+        Failed calls count towards the route's cooldown.
+
+        Raises:
+            Exception: The last error, if every planned route fails.
+        """
+        error: Optional[Exception] = None
+        for route in self.plan(sort, **capabilities):
+            started = time.perf_counter()
+            try:
+                result = fn(route)
+            except Exception as e:
+                self.observe_error(route)
+                error = e
+                continue
+            self.observe(
+                route,
+                time.perf_counter() - started,
+                ttft=getattr(result, "ttft", None),
+                output_tokens=output_tokens(result),
+            )
+            return result
+        assert error is not None
+        raise error
+
+    async def acall(
+        self,
+        fn: Callable[[Route], Awaitable[T]],
+        sort: Optional[SORT] = None,
+        **capabilities: Any,
+    ) -> T:
+        """
+        Async counterpart of `call`.
+        """
+        error: Optional[Exception] = None
+        for route in self.plan(sort, **capabilities):
+            started = time.perf_counter()
+            try:
+                result = await fn(route)
+            except Exception as e:
+                self.observe_error(route)
+                error = e
+                continue
+            self.observe(
+                route,
+                time.perf_counter() - started,
+                ttft=getattr(result, "ttft", None),
+                output_tokens=output_tokens(result),
+            )
+            return result
+        assert error is not None
+        raise error
+
+    def _healthy(self, route: Route) -> bool:
+        stats = self._stats.get(route.key)
+        if stats is None:
+            return True
+        return stats.cooldown_until <= time.monotonic() and not stats.degraded(
+            self.degrade_factor
+        )
+
+    def _sort_key(self, route: Route, sort: SORT) -> Tuple[Any, ...]:
+        """
+        Orders healthy before unhealthy, then by the metric, then by registry rank.
+
+        Routes without a sample yet rank ahead of measured ones, so every candidate gets
+        tried once instead of the first measured route winning until it degrades. Price
+        ties, including models with no known price, are broken by measured latency.
+        """
+        stats = self._stats.get(route.key)
+        latency = self._latency(stats)
+        if sort == "price":
+            price = route.model.input_price
+            output = route.model.output_price
+            known = price is not None or output is not None
+            metric: Tuple[Any, ...] = (
+                not known,
+                (price or 0.0) + (output or 0.0),
+                *latency,
+            )
+        elif sort == "latency":
+            metric = latency
+        else:
+            throughput = None if stats is None else stats.throughput
+            metric = (
+                stats is not None and throughput is not None,
+                -(throughput or 0.0),
+            )
+        return (not self._healthy(route), *metric, route.rank)
+
+    @staticmethod
+    def _latency(stats: Optional[EndpointStats]) -> Tuple[bool, float]:
+        # Unmeasured routes sort first, optimistically
+        if stats is None or stats.latency is None:
+            return (False, 0.0)
+        return (True, stats.ttft if stats.ttft is not None else stats.latency)
+
+
+def output_tokens(result: Any) -> Optional[int]:
+    """
+    Extracts the output token count from a chat completion, Responses API result or `TurnStats`.
+    """
+    usage = getattr(result, "usage", None)
+    if usage is None:
+        return getattr(result, "output_tokens", None)
+    return getattr(usage, "completion_tokens", None) or getattr(
+        usage, "output_tokens", None
+    )
@@ -0,0 +1,300 @@
+import asyncio
+import copy
+import inspect
+import json
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from agent_types import Agent, AgentFunction, Response, Result
+from clients import get_async_client, resolve
+from models import OPENROUTER_MODELS
+from router import Route
+from telemetry import telemetry
+from tool_cache import ToolCache, cache_policy
+from tool_cache import tool_cache as shared_tool_cache
+from utils.schema import CONTEXT_VARIABLES, tools_payload
+
+if TYPE_CHECKING:
+    from hedge import Hedger
+    from semantic_cache import SemanticCache
+
+
+def is_agent(value: Any) -> bool:
+    """
+    Whether a value returned by a tool is an `Agent` to hand off to.
+    """
+    return isinstance(value, dict) and {"name", "model", "instructions"} <= value.keys()
+
+
+def to_result(value: Any) -> Result:
+    """
+    Normalizes whatever a tool returned into a `Result`.
+
+    A `Result` passes through, an `Agent` becomes a handoff, and anything else is
+    serialized into the tool message content.
+    """
+    if (
+        isinstance(value, dict)
+        and "value" in value
+        and value.keys() <= Result.__annotations__.keys()
+    ):
+        return Result(
+            value=str(value["value"]),
+            agent=value.get("agent"),
+            context_variables=value.get("context_variables") or {},
+        )
+    if is_agent(value):
+        return Result(
+            value=json.dumps({"assistant": value["name"]}),
+            agent=value,
+            context_variables={},
+        )
+    if isinstance(value, str):
+        return Result(value=value, agent=None, context_variables={})
+    try:
+        return Result(value=json.dumps(value), agent=None, context_variables={})
+    except TypeError:
+        return Result(value=str(value), agent=None, context_variables={})
+
+
+def accepts_context(func: AgentFunction) -> bool:
+    try:
+        return CONTEXT_VARIABLES in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+class Runner:
+    """
+    Drives an agent through model turns and tool calls until it produces a final answer.
+
+    Each turn sends the agent's instructions, the history and its functions (as tools) to
+    the model. Requested tool calls are executed, their results appended as tool messages,
+    and the loop continues. A tool returning an `Agent` (or a `Result` with `agent` set)
+    hands the conversation off to that agent; `context_variables` returned by tools are
+    merged in call order and passed to functions that declare a `context_variables` parameter.
+
+    With `parallel_tool_calls`, all calls from one turn run at once: coroutine functions on
+    the event loop and blocking functions on a thread pool, so a turn costs as much as its
+    slowest call rather than the sum of them.
+
+    With a `semantic_cache`, a turn that answers a user message directly (no tool calls)
+    is cached under the agent's model, instructions, tools and earlier history, and later
+    similar user messages in the same situation are answered without a model call.
+
+    With a `hedger`, turns for registry models are raced across the model's upstreams
+    when the first one is slow to answer (see `hedge.Hedger`).
+
+    Functions declared with `tool_cache.cached_tool` are called through the `tool_cache`,
+    so repeated calls with the same arguments, within a run or across runs, reuse the result.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        executor: Optional[Executor] = None,
+        max_workers: Optional[int] = None,
+        semantic_cache: Optional["SemanticCache"] = None,
+        hedger: Optional["Hedger"] = None,
+        tool_cache: Optional[ToolCache] = None,
+    ):
+        """
+        Initializes the runner.
+
+        Args:
+            client: An `AsyncOpenAI` client. Defaults to the pooled client for each agent's model.
+            executor: Pool for blocking tool functions. A thread pool is created if omitted.
+            max_workers: Size of the default thread pool.
+            semantic_cache: Cache consulted before model turns that answer a user message.
+            hedger: Hedger that races slow turns for registry models across upstreams.
+            tool_cache: Cache for functions with a declared caching policy. Defaults to the shared `tool_cache.tool_cache`.
+        """
+        self.client = client
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="swarm-tool"
+        )
+        self.semantic_cache = semantic_cache
+        self.hedger = hedger
+        self.tool_cache = tool_cache or shared_tool_cache
+
+    async def run(
+        self,
+        agent: Agent,
+        messages: List[Dict[str, Any]],
+        context_variables: Optional[Dict[str, str]] = None,
+        max_turns: int = 20,
+    ) -> Response:
+        """
+        Runs the conversation until the active agent answers without tool calls.
+
+        Args:
+            agent: The agent that handles the first turn.
+            messages: Prior chat history; it is copied, not mutated.
+            context_variables: Initial shared state for instructions and tools.
+            max_turns: Upper bound on model calls.
+
+        Returns:
+            The messages produced during the run, the last active agent and the final context variables.
+        """
+        context_variables = dict(context_variables or {})
+        history = copy.deepcopy(messages)
+        start = len(history)
+
+        for _ in range(max_turns):
+            message = await self._complete(agent, history, context_variables)
+            history.append(message)
+            tool_calls = message.get("tool_calls")
+            if not tool_calls:
+                break
+
+            results = await self._call_tools(agent, tool_calls, context_variables)
+            for call, result in zip(tool_calls, results):
+                history.append(
+                    {
+                        "role": "tool",
+                        "tool_call_id": call["id"],
+                        "content": result["value"],
+                    }
+                )
+                context_variables.update(result["context_variables"])
+                if result["agent"] is not None:
+                    agent = result["agent"]
+
+        return Response(
+            messages=history[start:], agent=agent, context_variables=context_variables
+        )
+
+    def run_sync(
+        self, agent: Agent, messages: List[Dict[str, Any]], **kwargs: Any
+    ) -> Response:
+        """
+        Blocking wrapper around `run` for callers outside an event loop.
+        """
+        return asyncio.run(self.run(agent, messages, **kwargs))
+
+    async def _complete(
+        self,
+        agent: Agent,
+        history: List[Dict[str, Any]],
+        context_variables: Dict[str, str],
+    ) -> Dict[str, Any]:
+        """
+        Sends one model turn and returns the assistant message as a plain dict.
+        """
+        instructions = agent["instructions"]
+        if callable(instructions):
+            instructions = (
+                instructions(context_variables)
+                if accepts_context(instructions)
+                else instructions()
+            )
+
+        provider, model = resolve(agent["model"])
+        client = self.client or get_async_client(provider)
+        request: Dict[str, Any] = {
+            "model": model,
+            "messages": [{"role": "system", "content": instructions}, *history],
+        }
+        functions = agent.get("functions") or []
+        if functions:
+            request["tools"] = tools_payload(functions)
+            if agent.get("tool_choice"):
+                request["tool_choice"] = agent["tool_choice"]
+            if agent.get("parallel_tool_calls") is not None:
+                request["parallel_tool_calls"] = agent["parallel_tool_calls"]
+
+        cache, scope = self.semantic_cache, None
+        prompt = (
+            history[-1].get("content")
+            if history and history[-1].get("role") == "user"
+            else None
+        )
+        if cache is not None and isinstance(prompt, str):
+            tools = [f.__name__ for f in functions]
+            scope = cache.scope(model, instructions, history[:-1], tools=tools)
+            hit = await cache.aget(scope, prompt)
+            if hit is not None:
+                return {"role": "assistant", "content": hit.response}
+
+        async def send(route: Optional[Route] = None) -> Any:
+            target, options = client, {}
+            if route is not None:
+                target, options = (
+                    self.client or get_async_client(route.model.provider),
+                    route.options(),
+                )
+            with telemetry.track(
+                options.get("model", model), provider.name if provider else None
+            ) as span:
+                span.prompt = request["messages"]
+                completion = span.result = await target.chat.completions.create(
+                    **{**request, **options}
+                )
+            return completion
+
+        if self.hedger is not None and agent["model"] in OPENROUTER_MODELS:
+            completion = await self.hedger.call_model(agent["model"], send)
+        else:
+            completion = await send()
+        message = completion.choices[0].message.model_dump(
+            mode="json", exclude_none=True
+        )
+        if (
+            scope is not None
+            and message.get("content")
+            and not message.get("tool_calls")
+        ):
+            await cache.aset(scope, prompt, message["content"])  # type: ignore
+        return message
+
+    async def _call_tools(
+        self,
+        agent: Agent,
+        tool_calls: List[Dict[str, Any]],
+        context_variables: Dict[str, str],
+    ) -> List[Result]:
+        """
+        Executes a turn's tool calls, concurrently when the agent allows parallel calls.
+
+        Every call sees the context variables as they were at the start of the turn, so
+        the outcome does not depend on which call finishes first.
+        """
+        functions = {f.__name__: f for f in agent.get("functions") or []}
+        snapshot = dict(context_variables)
+        calls = [self._call_tool(functions, call, snapshot) for call in tool_calls]
+        if agent.get("parallel_tool_calls"):
+            return list(await asyncio.gather(*calls))
+        return [await call for call in calls]
+
+    async def _call_tool(
+        self,
+        functions: Dict[str, AgentFunction],
+        call: Dict[str, Any],
+        context_variables: Dict[str, str],
+    ) -> Result:
+        name = call["function"]["name"]
+        func = functions.get(name)
+        if func is None:
+            return to_result(f"Error: tool {name} not found")
+
+        try:
+            kwargs = json.loads(call["function"]["arguments"] or "{}")
+            if accepts_context(func):
+                kwargs[CONTEXT_VARIABLES] = dict(context_variables)
+            cached = cache_policy(func) is not None
+            if inspect.iscoroutinefunction(func):
+                value = await (
+                    self.tool_cache.acall(func, kwargs) if cached else func(**kwargs)
+                )
+            else:
+                loop = asyncio.get_running_loop()
+                invoke = (
+                    partial(self.tool_cache.call, func, kwargs)
+                    if cached
+                    else partial(func, **kwargs)
+                )
+                value = await loop.run_in_executor(self.executor, invoke)
+        except Exception as e:
+            return to_result(f"Error: {name} raised {e!r}")
+        return to_result(value)
@@ -0,0 +1,323 @@
+import hashlib
+import os
+import re
+import string
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from cache import canonical_json
+from embeddings import EmbeddingBatcher, normalize
+
+DEFAULT_THRESHOLD = 0.95
+EntryKey = Tuple[str, str]
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Folds case, collapses whitespace and trims surrounding punctuation, so trivially
+    different spellings of a prompt share one exact key and one embedding.
+    """
+    return (
+        re.sub(r"\s+", " ", prompt.casefold()).strip().strip(string.punctuation + " ")
+    )
+
+
+@dataclass
+class SemanticCacheStats:
+    """
+    Counters for a semantic cache.
+
+    Attributes:
+        hits: Lookups answered from the cache, exact or similar.
+        exact_hits: Hits whose normalized prompt matched exactly, answered without an embedding call.
+        misses: Lookups that went upstream.
+        false_hits: Hits reported as wrong answers by the caller.
+        evictions: Entries removed for size or age.
+    """
+
+    hits: int = 0
+    exact_hits: int = 0
+    misses: int = 0
+    false_hits: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def false_hit_rate(self) -> float:
+        return self.false_hits / self.hits if self.hits else 0.0
+
+
+@dataclass
+class Entry:
+    scope: str
+    prompt: str
+    response: str
+    created: float
+    row: int = 0
+
+
+@dataclass
+class Hit:
+    """
+    A cached answer and how closely its prompt matched.
+    """
+
+    response: str
+    similarity: float
+    prompt: str
+
+
+@dataclass
+class Index:
+    """
+    Unit vectors of one scope's prompts, one row per entry, grown by doubling.
+    """
+
+    vectors: np.ndarray
+    entries: List[Entry] = field(default_factory=list)
+
+    def add(self, entry: Entry, vector: np.ndarray):
+        if len(self.entries) == len(self.vectors):
+            grown = np.empty(
+                (max(16, 2 * len(self.vectors)), self.vectors.shape[1]), np.float32
+            )
+            grown[: len(self.vectors)] = self.vectors
+            self.vectors = grown
+        entry.row = len(self.entries)
+        self.vectors[entry.row] = vector
+        self.entries.append(entry)
+
+    def remove(self, entry: Entry):
+        """
+        Removes an entry by moving the last row into its slot.
+        """
+        last = self.entries.pop()
+        if last is not entry:
+            self.vectors[entry.row] = self.vectors[last.row]
+            last.row = entry.row
+            self.entries[entry.row] = last
+
+    def nearest(self, vector: np.ndarray) -> Tuple[Optional[Entry], float]:
+        if not self.entries:
+            return None, 0.0
+        scores = self.vectors[: len(self.entries)] @ vector
+        best = int(np.argmax(scores))
+        return self.entries[best], float(scores[best])
+
+
+class SemanticCache:
+    """
+    Response cache that also answers prompts similar to ones seen before.
+
+    Prompts are normalized and first looked up exactly; otherwise the prompt is embedded
+    and compared by cosine similarity with the prompts stored under the same scope. A
+    scope is everything besides the prompt that shapes the answer (model, instructions,
+    and whatever earlier turns the caller includes), so answers never cross models or
+    personas. Above `threshold` the stored answer is returned.
+
+    Entries are evicted least-recently-used beyond `max_entries`, and after `ttl` seconds.
+    Callers that find a cached answer wrong call `report_false_hit`, which drops the
+    entry and counts it, so the false-hit rate can guide the threshold.
+    """
+
+    def __init__(
+        self,
+        embedder: Any = None,
+        threshold: Optional[float] = None,
+        max_entries: int = 4096,
+        ttl: Optional[float] = None,
+    ):
+        """
+        Initializes an empty cache.
+
+        Args:
+            embedder: Object with `embed(texts)` (and `aembed(texts)` for async use) returning a matrix. Defaults to an `EmbeddingBatcher`.
+            threshold: Minimum cosine similarity for a hit. Defaults to `SWARM_SEMANTIC_THRESHOLD` or 0.95.
+            max_entries: Entries kept across all scopes.
+            ttl: Seconds an entry stays valid. Entries never expire if None.
+        """
+        self.embedder = embedder if embedder is not None else EmbeddingBatcher()
+        self.threshold = (
+            threshold
+            if threshold is not None
+            else float(os.getenv("SWARM_SEMANTIC_THRESHOLD", DEFAULT_THRESHOLD))
+        )
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = SemanticCacheStats()
+        self._entries: "OrderedDict[EntryKey, Entry]" = OrderedDict()
+        self._indexes: Dict[str, Index] = {}
+        self._vectors: "OrderedDict[EntryKey, np.ndarray]" = OrderedDict()
+        self._served: Dict[EntryKey, EntryKey] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def scope(
+        model: str,
+        instructions: Optional[str] = None,
+        context: Any = None,
+        **params: Any,
+    ) -> str:
+        """
+        Returns the scope key for everything besides the prompt that shapes an answer.
+
+        Args:
+            model: Model (or route) that answers.
+            instructions: System prompt.
+            context: Earlier turns or other state the answer depends on; any JSON-serializable value.
+            **params: Sampling parameters and the like.
+        """
+        payload = {
+            "model": model,
+            "instructions": instructions,
+            "context": context,
+            **params,
+        }
+        return hashlib.sha256(canonical_json(payload).encode()).hexdigest()
+
+    def get(self, scope: str, prompt: str) -> Optional[Hit]:
+        """
+        Returns the cached answer for a prompt, or None on a miss.
+        """
+        key = (scope, normalize_prompt(prompt))
+        hit = self._exact(key)
+        if hit is not None:
+            return hit
+        return self._similar(key, self._embed(key))
+
+    async def aget(self, scope: str, prompt: str) -> Optional[Hit]:
+        """
+        Async counterpart of `get`; the embedding call does not block the event loop.
+        """
+        key = (scope, normalize_prompt(prompt))
+        hit = self._exact(key)
+        if hit is not None:
+            return hit
+        return self._similar(key, await self._aembed(key))
+
+    def set(self, scope: str, prompt: str, response: str):
+        """
+        Stores an answer, reusing the embedding computed by the preceding miss.
+        """
+        key = (scope, normalize_prompt(prompt))
+        self._insert(key, response, self._embed(key))
+
+    async def aset(self, scope: str, prompt: str, response: str):
+        key = (scope, normalize_prompt(prompt))
+        self._insert(key, response, await self._aembed(key))
+
+    def report_false_hit(self, scope: str, prompt: str) -> bool:
+        """
+        Marks the answer last served for a prompt as wrong and drops the entry that served it.
+
+        Returns:
+            Whether a served answer was found for the prompt.
+        """
+        key = (scope, normalize_prompt(prompt))
+        with self._lock:
+            source = self._served.pop(key, None)
+            if source is None:
+                return False
+            self.stats.false_hits += 1
+            entry = self._entries.pop(source, None)
+            if entry is not None:
+                self._indexes[entry.scope].remove(entry)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._indexes.clear()
+            self._vectors.clear()
+            self._served.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _exact(self, key: EntryKey) -> Optional[Hit]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expire(key, entry):
+                return None
+            self._entries.move_to_end(key)
+            self._served[key] = key
+            self.stats.hits += 1
+            self.stats.exact_hits += 1
+            return Hit(entry.response, 1.0, entry.prompt)
+
+    def _similar(self, key: EntryKey, vector: np.ndarray) -> Optional[Hit]:
+        with self._lock:
+            index = self._indexes.get(key[0])
+            entry, similarity = (
+                index.nearest(vector) if index is not None else (None, 0.0)
+            )
+            if entry is not None:
+                source = (entry.scope, entry.prompt)
+                if similarity >= self.threshold and not self._expire(source, entry):
+                    self._entries.move_to_end(source)
+                    self._served[key] = source
+                    self.stats.hits += 1
+                    return Hit(entry.response, similarity, entry.prompt)
+            self.stats.misses += 1
+            return None
+
+    def _insert(self, key: EntryKey, response: str, vector: np.ndarray):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._indexes[previous.scope].remove(previous)
+            entry = Entry(key[0], key[1], response, time.monotonic())
+            index = self._indexes.get(key[0])
+            if index is None:
+                index = self._indexes[key[0]] = Index(
+                    np.empty((0, len(vector)), np.float32)
+                )
+            index.add(entry, vector)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                _, oldest = self._entries.popitem(last=False)
+                self._indexes[oldest.scope].remove(oldest)
+                self.stats.evictions += 1
+
+    def _expire(self, key: EntryKey, entry: Entry) -> bool:
+        """
+        Drops an entry older than the TTL; the caller holds the lock.
+        """
+        if self.ttl is None or time.monotonic() - entry.created < self.ttl:
+            return False
+        del self._entries[key]
+        self._indexes[entry.scope].remove(entry)
+        self.stats.evictions += 1
+        return True
+
+    def _embed(self, key: EntryKey) -> np.ndarray:
+        vector = self._vectors.get(key)
+        if vector is None:
+            vector = self._remember(key, self.embedder.embed([key[1]])[0])
+        return vector
+
+    async def _aembed(self, key: EntryKey) -> np.ndarray:
+        vector = self._vectors.get(key)
+        if vector is None:
+            vector = self._remember(key, (await self.embedder.aembed([key[1]]))[0])
+        return vector
+
+    def _remember(self, key: EntryKey, vector: np.ndarray) -> np.ndarray:
+        """
+        Keeps the last few prompt embeddings so a miss followed by `set` embeds once.
+        """
+        vector = normalize(np.asarray(vector, dtype=np.float32))
+        with self._lock:
+            self._vectors[key] = vector
+            while len(self._vectors) > 64:
+                self._vectors.popitem(last=False)
+        return vector
@@ -0,0 +1,264 @@
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, AsyncIterable, Callable, Iterable, List, Optional
+
+from rich.console import Console
+from rich.live import Live
+from rich.markdown import Markdown
+from rich.text import Text
+
+if TYPE_CHECKING:
+    from structured import FieldEvent, StructuredStream
+
+FENCES = ("```", "~~~")
+
+
+@dataclass
+class TurnStats:
+    """
+    Timing and throughput figures for a single streamed turn.
+
+    Attributes:
+        ttft: Seconds from sending the request to the first output token.
+        elapsed: Seconds from sending the request to the end of the stream.
+        output_tokens: Output tokens reported by the provider, or the number of deltas received if usage is missing.
+        response_id: Identifier of the completed response, if the stream reported one.
+        input_tokens: Input tokens reported by the provider, if usage was included.
+        text: The full output text.
+        parsed: The validated structured output, when the turn was parsed with a `StructuredStream`.
+    """
+
+    ttft: Optional[float]
+    elapsed: float
+    output_tokens: int
+    response_id: Optional[str] = None
+    input_tokens: Optional[int] = None
+    text: str = ""
+    parsed: Any = None
+
+    @property
+    def tokens_per_second(self) -> float:
+        """
+        Decode throughput, measured from the first token to the end of the stream.
+        """
+        generation = self.elapsed - (self.ttft or 0.0)
+        return self.output_tokens / generation if generation > 0 else 0.0
+
+    def __str__(self) -> str:
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "n/a"
+        return (
+            f"TTFT {ttft} | {self.output_tokens} tokens in {self.elapsed:.2f}s"
+            f" | {self.tokens_per_second:.1f} tok/s"
+        )
+
+
+class MarkdownStream:
+    """
+    Renders a growing Markdown document inside a `rich.live.Live` view.
+
+    Completed top-level blocks (text terminated by a blank line outside a fenced
+    code block) are rendered exactly once and printed above the live region; only
+    the trailing, still-growing block is re-parsed on refresh. The cost of each
+    delta is therefore bounded by the size of the current block, not the whole answer.
+    """
+
+    def __init__(self, console: Optional[Console] = None, refresh_per_second: int = 12):
+        """
+        Initializes the stream renderer.
+
+        Args:
+            console: Console to render to. A new one is created if omitted.
+            refresh_per_second: Upper bound on how often the live tail is re-rendered.
+        """
+        self.console = console or Console()
+        self.min_interval = 1 / refresh_per_second
+        self._live = Live(
+            Text(""),
+            console=self.console,
+            refresh_per_second=refresh_per_second,
+            vertical_overflow="visible",
+        )
+        self._tail = ""
+        self._scan = 0
+        self._boundary = 0
+        self._in_fence = False
+        self._dirty = False
+        self._last_render = 0.0
+
+    def __enter__(self) -> "MarkdownStream":
+        self._live.start()
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def feed(self, delta: str):
+        """
+        Appends a text delta and refreshes the live view if the refresh interval has elapsed.
+
+        Args:
+            delta: The newly received chunk of Markdown text.
+        """
+        self._tail += delta
+        self._dirty = True
+        self._commit_blocks()
+        if time.perf_counter() - self._last_render >= self.min_interval:
+            self._render_tail()
+
+    def close(self):
+        """
+        Renders whatever remains in the buffer and stops the live view.
+        """
+        if self._tail:
+            self._live.update(Markdown(self._tail), refresh=True)
+        self._live.stop()
+        self._tail = ""
+
+    def _commit_blocks(self):
+        """
+        Scans newly completed lines and prints every block that can no longer change.
+        """
+        tail = self._tail
+        while (newline := tail.find("\n", self._scan)) != -1:
+            line = tail[self._scan : newline]
+            if line.lstrip().startswith(FENCES):
+                self._in_fence = not self._in_fence
+            elif not self._in_fence and not line.strip():
+                self._boundary = newline + 1
+            self._scan = newline + 1
+
+        if not self._boundary:
+            return
+
+        block, self._tail = tail[: self._boundary], tail[self._boundary :]
+        self._scan -= self._boundary
+        self._boundary = 0
+        if block.strip():
+            self._live.console.print(Markdown(block))
+        self._render_tail()
+
+    def _render_tail(self):
+        if not self._dirty:
+            return
+        self._live.update(Markdown(self._tail) if self._tail else Text(""))
+        self._last_render = time.perf_counter()
+        self._dirty = False
+
+
+class TurnRecorder:
+    """
+    Accumulates the text, usage and timing of a Responses API event stream while rendering it.
+    """
+
+    def __init__(
+        self,
+        view: MarkdownStream,
+        started: float,
+        structured: Optional["StructuredStream"] = None,
+        on_field: Optional[Callable[["FieldEvent"], None]] = None,
+    ):
+        self.view, self.started = view, started
+        self.structured, self.on_field = structured, on_field
+        self.first_token: Optional[float] = None
+        self.deltas: List[str] = []
+        self.usage_tokens: Optional[int] = None
+        self.input_tokens: Optional[int] = None
+        self.response_id: Optional[str] = None
+
+    def feed(self, event: Any):
+        """
+        Handles one stream event.
+
+        Raises:
+            RuntimeError: If the event reports that the response failed.
+        """
+        if event.type == "response.output_text.delta":
+            if self.first_token is None:
+                self.first_token = time.perf_counter()
+            self.deltas.append(event.delta)
+            self.view.feed(event.delta)
+            if self.structured is not None:
+                for field in self.structured.feed(event.delta):
+                    if self.on_field is not None:
+                        self.on_field(field)
+        elif event.type in ("response.completed", "response.incomplete"):
+            self.response_id = event.response.id
+            if event.response.usage:
+                self.usage_tokens = event.response.usage.output_tokens
+                self.input_tokens = event.response.usage.input_tokens
+        elif event.type in ("error", "response.failed"):
+            message = getattr(event, "message", None) or event.response.error
+            raise RuntimeError(f"Streaming response failed: {message}")
+
+    def stats(self) -> TurnStats:
+        return TurnStats(
+            ttft=self.first_token - self.started
+            if self.first_token is not None
+            else None,
+            elapsed=time.perf_counter() - self.started,
+            output_tokens=self.usage_tokens
+            if self.usage_tokens is not None
+            else len(self.deltas),
+            response_id=self.response_id,
+            input_tokens=self.input_tokens,
+            text="".join(self.deltas),
+            parsed=self.structured.finish() if self.structured is not None else None,
+        )
+
+
+def stream_response(
+    events: Iterable[Any],
+    console: Optional[Console] = None,
+    started: Optional[float] = None,
+    structured: Optional["StructuredStream"] = None,
+    on_field: Optional[Callable[["FieldEvent"], None]] = None,
+) -> TurnStats:
+    """
+    Consumes a Responses API event stream, rendering output text as it arrives.
+
+    Args:
+        events: The stream returned by `client.responses.create(..., stream=True)`.
+        console: Console to render to.
+        started: `time.perf_counter()` value taken just before the request was sent.
+        structured: Parser for a JSON-schema output; it is fed every delta and validated at the end.
+        on_field: Called with each field event from `structured` as soon as the field completes.
+
+    Returns:
+        The timing and throughput figures for the turn.
+    """
+    started = time.perf_counter() if started is None else started
+    try:
+        with MarkdownStream(console) as view:
+            turn = TurnRecorder(view, started, structured, on_field)
+            for event in events:
+                turn.feed(event)
+    finally:
+        # Close the stream even when a failure or a parse error ends the turn early, so the
+        # connection and its rate-limit slot are returned at once
+        close = getattr(events, "close", None)
+        if close is not None:
+            close()
+    return turn.stats()
+
+
+async def astream_response(
+    events: AsyncIterable[Any],
+    console: Optional[Console] = None,
+    started: Optional[float] = None,
+    structured: Optional["StructuredStream"] = None,
+    on_field: Optional[Callable[["FieldEvent"], None]] = None,
+) -> TurnStats:
+    """
+    Async counterpart of `stream_response`, for streams from an `AsyncOpenAI` client or `hedge.prime`.
+    """
+    started = time.perf_counter() if started is None else started
+    try:
+        with MarkdownStream(console) as view:
+            turn = TurnRecorder(view, started, structured, on_field)
+            async for event in events:
+                turn.feed(event)
+    finally:
+        close = getattr(events, "close", None)
+        if close is not None:
+            await close()
+    return turn.stats()
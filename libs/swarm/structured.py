@@ -0,0 +1,348 @@
+import json
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import (
+    Annotated,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+M = TypeVar("M", bound=BaseModel)
+Path = Tuple[Union[str, int], ...]
+
+# Parser states
+VALUE, FIRST_VALUE, KEY, FIRST_KEY, COLON, AFTER_VALUE, STRING, TOKEN, DONE = range(9)
+WHITESPACE = " \t\r\n"
+DELIMITERS = WHITESPACE + ",]}"
+STRING_SPECIAL = re.compile(r'["\\]')
+
+
+@dataclass
+class FieldEvent:
+    """
+    A value that finished arriving in a streamed JSON document.
+
+    Attributes:
+        path: Keys and indices leading to the value; () for the document itself.
+        value: The parsed value, or the validated one for a top-level field of a `StructuredStream`.
+        error: Validation errors for a top-level field that does not match its annotation.
+    """
+
+    path: Path
+    value: Any
+    error: Optional[str] = None
+
+    @property
+    def field(self) -> Optional[Union[str, int]]:
+        return self.path[0] if self.path else None
+
+
+class JSONStreamParser:
+    """
+    Incremental JSON parser that accepts a document in arbitrary chunks.
+
+    Each character is examined once, and string contents are copied in slices, so parsing
+    a streamed document costs O(n) overall instead of the O(n^2) of re-parsing the growing
+    buffer on every chunk. `feed` returns a `FieldEvent` for every value that completed
+    in the chunk, innermost first, and `value` is the document built so far: completed
+    values in place, with containers still being filled already attached.
+
+    Text before the first `{` or `[` and after the end of the document, such as a code
+    fence around it, is skipped.
+    """
+
+    def __init__(self):
+        self.value: Any = None
+        self._state = VALUE
+        self._stack: List[Union[Dict[str, Any], List[Any]]] = []
+        self._path: List[Union[str, int]] = []
+        self._key: Optional[str] = None
+        self._chunks: List[str] = []
+        self._escaped = False
+        self._is_key = False
+        self._events: List[FieldEvent] = []
+
+    @property
+    def done(self) -> bool:
+        return self._state == DONE
+
+    def feed(self, text: str) -> List[FieldEvent]:
+        """
+        Parses the next chunk and returns the values it completed.
+
+        Raises:
+            ValueError: If the text is not valid JSON.
+        """
+        self._events = []
+        i, n = 0, len(text)
+        while i < n:
+            state = self._state
+            if state == STRING:
+                i = self._scan_string(text, i)
+                continue
+            if state == DONE:
+                break
+            char = text[i]
+            if state == TOKEN:
+                if char in DELIMITERS:
+                    self._finish_token()
+                    continue
+                self._chunks.append(char)
+            elif char in WHITESPACE:
+                pass
+            elif state in (VALUE, FIRST_VALUE):
+                if char == "{":
+                    self._open({})
+                elif char == "[":
+                    self._open([])
+                elif not self._stack:
+                    # Preamble before the document, quotes included
+                    pass
+                elif char == "]" and state == FIRST_VALUE:
+                    self._close()
+                elif char == '"':
+                    self._state, self._is_key = STRING, False
+                else:
+                    self._state = TOKEN
+                    self._chunks.append(char)
+            elif state in (KEY, FIRST_KEY):
+                if char == '"':
+                    self._state, self._is_key = STRING, True
+                elif char == "}" and state == FIRST_KEY:
+                    self._close()
+                else:
+                    raise self._error(char, "an object key")
+            elif state == COLON:
+                if char != ":":
+                    raise self._error(char, "':'")
+                self._state = VALUE
+            elif state == AFTER_VALUE:
+                container = self._stack[-1]
+                if char == ",":
+                    self._state = KEY if isinstance(container, dict) else VALUE
+                elif char == ("}" if isinstance(container, dict) else "]"):
+                    self._close()
+                else:
+                    raise self._error(char, "',' or a closing bracket")
+            i += 1
+        return self._events
+
+    def close(self) -> Any:
+        """
+        Ends the document and returns it.
+
+        Raises:
+            ValueError: If the document is incomplete.
+        """
+        if self._state == TOKEN:
+            self._finish_token()
+        if self._state != DONE:
+            raise ValueError("Incomplete JSON document")
+        return self.value
+
+    def _scan_string(self, text: str, i: int) -> int:
+        while i < len(text):
+            if self._escaped:
+                self._escaped = False
+                self._chunks.append(text[i])
+                i += 1
+                continue
+            match = STRING_SPECIAL.search(text, i)
+            if match is None:
+                self._chunks.append(text[i:])
+                return len(text)
+            end = match.start()
+            self._chunks.append(text[i:end])
+            if text[end] == "\\":
+                self._chunks.append("\\")
+                self._escaped = True
+                i = end + 1
+                continue
+            raw = "".join(self._chunks)
+            self._chunks = []
+            value = json.loads(f'"{raw}"') if "\\" in raw else raw
+            if self._is_key:
+                self._key, self._state = value, COLON
+            else:
+                self._complete(value)
+            return end + 1
+        return i
+
+    def _finish_token(self):
+        token = "".join(self._chunks)
+        self._chunks = []
+        try:
+            value = json.loads(token)
+        except json.JSONDecodeError:
+            raise ValueError(f"Invalid JSON value {token!r}") from None
+        self._complete(value)
+
+    def _attach(self, value: Any) -> Path:
+        if not self._stack:
+            self.value = value
+            return ()
+        parent = self._stack[-1]
+        if isinstance(parent, dict):
+            parent[self._key] = value  # type: ignore[index]
+            return (*self._path, self._key)  # type: ignore[return-value]
+        parent.append(value)
+        return (*self._path, len(parent) - 1)
+
+    def _complete(self, value: Any):
+        self._events.append(FieldEvent(self._attach(value), value))
+        self._state = AFTER_VALUE if self._stack else DONE
+
+    def _open(self, container: Union[Dict[str, Any], List[Any]]):
+        path = self._attach(container)
+        self._stack.append(container)
+        if path:
+            self._path.append(path[-1])
+        self._state = FIRST_KEY if isinstance(container, dict) else FIRST_VALUE
+
+    def _close(self):
+        container = self._stack.pop()
+        path = tuple(self._path)
+        if self._path:
+            self._path.pop()
+        self._events.append(FieldEvent(path, container))
+        self._state = AFTER_VALUE if self._stack else DONE
+
+    def _error(self, char: str, expected: str) -> ValueError:
+        return ValueError(f"Invalid JSON: expected {expected}, got {char!r}")
+
+
+@lru_cache(maxsize=64)
+def field_adapters(model: Type[BaseModel]) -> Dict[str, Tuple[str, TypeAdapter]]:
+    """
+    Returns a validator per top-level field of a model, keyed by the name used in JSON.
+    """
+    adapters = {}
+    for name, info in model.model_fields.items():
+        annotation = (
+            Annotated[(info.annotation, *info.metadata)]
+            if info.metadata
+            else info.annotation
+        )
+        adapters[info.alias or name] = (name, TypeAdapter(annotation))
+    return adapters
+
+
+def response_format(model: Type[BaseModel], strict: bool = False) -> Dict[str, Any]:
+    """
+    Returns the chat completions `response_format` asking for JSON matching a model.
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "schema": model.model_json_schema(),
+            "strict": strict,
+        },
+    }
+
+
+def text_delta(item: Any) -> Optional[str]:
+    """
+    Extracts the text from a streamed chat completion chunk or Responses API event.
+    """
+    if isinstance(item, str):
+        return item
+    if getattr(item, "type", None) == "response.output_text.delta":
+        return item.delta
+    choices = getattr(item, "choices", None)
+    if choices:
+        return getattr(choices[0].delta, "content", None)
+    return None
+
+
+class StructuredStream(Generic[M]):
+    """
+    Parses a streamed structured output for a pydantic model as it arrives.
+
+    Every top-level field is validated against its own annotation as soon as its value
+    completes, so consumers can act on early fields of a large response while the rest is
+    still generating. `partial` holds the raw document so far, `fields` the validated
+    top-level fields, and `finish` validates the whole document against the model.
+
+        stream = await client.chat.completions.create(
+            ..., response_format=response_format(Report), stream=True
+        )
+        structured = StructuredStream(Report)
+        async for event in structured.aconsume(stream):
+            if event.field == "summary":
+                notify(event.value)
+        report = structured.result
+    """
+
+    def __init__(self, model: Type[M]):
+        self.model = model
+        self.parser = JSONStreamParser()
+        self.fields: Dict[str, Any] = {}
+        self.result: Optional[M] = None
+        self._adapters = field_adapters(model)
+
+    @property
+    def partial(self) -> Any:
+        """
+        The document parsed so far. It is live and shared with the parser, so do not mutate it.
+        """
+        return self.parser.value
+
+    def feed(self, text: str) -> List[FieldEvent]:
+        """
+        Parses the next piece of output text and returns the values it completed.
+        """
+        events = self.parser.feed(text)
+        for event in events:
+            if len(event.path) != 1 or event.path[0] not in self._adapters:
+                continue
+            name, adapter = self._adapters[event.path[0]]  # type: ignore[index]
+            try:
+                event.value = self.fields[name] = adapter.validate_python(event.value)
+            except ValidationError as e:
+                event.error = str(e)
+        return events
+
+    def finish(self) -> M:
+        """
+        Validates the complete document against the model.
+
+        Raises:
+            ValueError: If the document is incomplete or invalid JSON.
+            pydantic.ValidationError: If it does not match the model.
+        """
+        self.result = self.model.model_validate(self.parser.close())
+        return self.result
+
+    def consume(self, stream: Iterable[Any]) -> Iterator[FieldEvent]:
+        """
+        Feeds a stream of chunks, events or strings, yielding field events and validating at the end.
+        """
+        for item in stream:
+            if text := text_delta(item):
+                yield from self.feed(text)
+        self.finish()
+
+    async def aconsume(self, stream: AsyncIterable[Any]) -> AsyncIterator[FieldEvent]:
+        """
+        Async counterpart of `consume`.
+        """
+        async for item in stream:
+            if text := text_delta(item):
+                for event in self.feed(text):
+                    yield event
+        self.finish()
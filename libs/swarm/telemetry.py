@@ -0,0 +1,546 @@
+import asyncio
+import atexit
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from models import OPENROUTER_MODELS, Model
+
+if TYPE_CHECKING:
+    from request_log import RequestLog
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+TTFT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+Labels = Tuple[str, ...]
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def label_text(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    Monotonic sum per label set, e.g. tokens per model and kind.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: Labels) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{label_text(self.labels, labels)} {value:g}"
+
+
+class Histogram:
+    """
+    Bucketed distribution per label set, exposed with cumulative `le` buckets like Prometheus.
+
+    Observations only bump one bucket; the cumulative counts are built when rendering.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: one count per bucket plus +Inf, then the sum
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, labels: Labels, value: float):
+        counts = self._values.get(labels)
+        if counts is None:
+            counts = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def count(self, labels: Labels) -> int:
+        counts = self._values.get(labels)
+        return int(sum(counts[:-1])) if counts else 0
+
+    def samples(self) -> Iterator[str]:
+        for labels, counts in self._values.items():
+            total = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                total += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                yield f"{self.name}_bucket{label_text(self.labels, labels, le)} {total:g}"
+            yield f"{self.name}_sum{label_text(self.labels, labels)} {counts[-1]:g}"
+            yield f"{self.name}_count{label_text(self.labels, labels)} {total:g}"
+
+
+class MetricsRegistry:
+    """
+    In-process collection of counters and histograms rendered in the Prometheus text format.
+
+    Metrics are plain dicts updated under one lock; nothing is formatted until `render`.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Any] = {}
+        self.lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.metrics.setdefault(name, Counter(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        with self.lock:
+            for metric in self.metrics.values():
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """
+        Writes the current metrics to a file atomically, for node_exporter's textfile collector.
+        """
+        text = self.render()
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            f.write(text)
+        os.replace(temporary, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serves the metrics over HTTP from a daemon thread.
+
+        Args:
+            port: Port to listen on; 0 picks a free one (see `server.server_address`).
+            host: Interface to bind.
+
+        Returns:
+            The running server; call `shutdown()` to stop it.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header(
+                    "Content-Type", "text/plain; version=0.0.4; charset=utf-8"
+                )
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *_):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(
+            target=server.serve_forever, name="swarm-metrics", daemon=True
+        ).start()
+        return server
+
+
+def usage_of(result: Any) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """
+    Extracts (input, output, reasoning) token counts from a chat completion, a Responses API
+    result, or anything with `input_tokens` / `output_tokens` attributes such as `TurnStats`.
+    """
+    usage = getattr(result, "usage", None)
+    if usage is None:
+        return (
+            getattr(result, "input_tokens", None),
+            getattr(result, "output_tokens", None),
+            None,
+        )
+    if hasattr(usage, "prompt_tokens"):
+        details = getattr(usage, "completion_tokens_details", None)
+        return (
+            usage.prompt_tokens,
+            usage.completion_tokens,
+            getattr(details, "reasoning_tokens", None),
+        )
+    details = getattr(usage, "output_tokens_details", None)
+    return (
+        usage.input_tokens,
+        usage.output_tokens,
+        getattr(details, "reasoning_tokens", None),
+    )
+
+
+def prices_for(model: str) -> Optional[Model]:
+    """
+    Returns the registry entry carrying a model's prices, accepting bare names and provider slugs.
+    """
+    entry = OPENROUTER_MODELS.get(model)
+    if entry is None and "/" in model:
+        entry = OPENROUTER_MODELS.get(model.split("/", 1)[1])
+    return entry
+
+
+def estimate_cost(
+    model: str, input_tokens: Optional[int], output_tokens: Optional[int]
+) -> Optional[float]:
+    """
+    Estimates the USD cost of a call from the registry's per-million-token prices.
+
+    Returns:
+        The cost, or None if the model has no prices in the registry.
+    """
+    entry = prices_for(model)
+    if entry is None or (entry.input_price is None and entry.output_price is None):
+        return None
+    return (
+        (input_tokens or 0) * (entry.input_price or 0.0)
+        + (output_tokens or 0) * (entry.output_price or 0.0)
+    ) / 1e6
+
+
+class Span:
+    """
+    Times one model call and records it when the `with` block exits.
+
+    Set `result` to the response (or `TurnStats`) for token counts and cost, and call
+    `first_token()` when the first streamed token arrives unless the result carries `ttft`.
+    Set `prompt` to the input sent for it to reach the request log.
+    An exception leaving the block is recorded as an error and re-raised; a cancelled call,
+    such as the loser of a hedged race, is not recorded.
+    """
+
+    __slots__ = (
+        "telemetry",
+        "model",
+        "provider",
+        "started",
+        "ttft",
+        "result",
+        "prompt",
+    )
+
+    def __init__(self, telemetry: "Telemetry", model: str, provider: str):
+        self.telemetry, self.model, self.provider = telemetry, model, provider
+        self.ttft: Optional[float] = None
+        self.result: Any = None
+        self.prompt: Any = None
+
+    def __enter__(self) -> "Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is asyncio.CancelledError:
+            return
+        latency = time.perf_counter() - self.started
+        ttft = (
+            self.ttft if self.ttft is not None else getattr(self.result, "ttft", None)
+        )
+        self.telemetry.record(
+            self.model, self.provider, latency, ttft, self.result, exc_type, self.prompt
+        )
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+
+
+class NullSpan:
+    """
+    Stand-in returned by a disabled `Telemetry`; every method is a no-op.
+    """
+
+    __slots__ = ()
+    result = None
+
+    def __enter__(self) -> "NullSpan":
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+    def __setattr__(self, *_):
+        pass
+
+    def first_token(self):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Telemetry:
+    """
+    Per-call metrics for model requests: latency, TTFT, tokens, retries and estimated cost.
+
+    Metrics are labelled by model and provider and kept in a `MetricsRegistry`, which can be
+    served over HTTP or written to a file in the Prometheus text format. Each call can also
+    be logged as one JSON line through a dedicated loguru sink, and appended to a columnar
+    `RequestLog` for offline analysis.
+
+    When disabled, `track` returns a shared no-op span and `retry_hooks` installs nothing,
+    so instrumented call sites cost a single attribute check.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        registry: Optional[MetricsRegistry] = None,
+        log_path: Optional[str] = None,
+        requests: Optional["RequestLog"] = None,
+    ):
+        """
+        Initializes the telemetry and its metrics.
+
+        Args:
+            enabled: Whether calls are recorded at all.
+            registry: Registry to hold the metrics. A new one is created if omitted.
+            log_path: File that receives one JSON record per call. No records are logged if omitted.
+            requests: Columnar log that receives every call. None if omitted.
+        """
+        self.enabled = enabled
+        self.registry = registry or MetricsRegistry()
+        self.log_path = log_path
+        self.requests = requests
+        self._logger: Any = None
+        labels = ("model", "provider")
+        self.latency = self.registry.histogram(
+            "swarm_request_duration_seconds", "Model call latency", (*labels, "status")
+        )
+        self.ttft = self.registry.histogram(
+            "swarm_time_to_first_token_seconds",
+            "Time to the first streamed token",
+            labels,
+            TTFT_BUCKETS,
+        )
+        self.tokens = self.registry.counter(
+            "swarm_tokens_total", "Tokens billed", (*labels, "kind")
+        )
+        self.cost = self.registry.counter(
+            "swarm_cost_usd_total", "Estimated cost from registry prices", labels
+        )
+        self.retries = self.registry.counter(
+            "swarm_retries_total",
+            "HTTP requests re-sent after a failure",
+            ("provider",),
+        )
+
+    @classmethod
+    def from_env(cls) -> "Telemetry":
+        """
+        Builds telemetry from `SWARM_TELEMETRY*` / `SWARM_METRICS_*` environment variables.
+
+        `SWARM_TELEMETRY=1` enables it. `SWARM_METRICS_PORT` serves the metrics over HTTP,
+        `SWARM_METRICS_FILE` rewrites a file every `SWARM_METRICS_INTERVAL` seconds and at
+        exit, and `SWARM_TELEMETRY_LOG` names the JSON lines file. `SWARM_REQUEST_LOG` names
+        a request log directory (see `RequestLog.from_env`) and enables telemetry on its own.
+        """
+        requests = None
+        if os.getenv("SWARM_REQUEST_LOG"):
+            from request_log import RequestLog
+
+            requests = RequestLog.from_env()
+        telemetry = cls(
+            enabled=os.getenv("SWARM_TELEMETRY", "0") not in ("", "0")
+            or requests is not None,
+            log_path=os.getenv("SWARM_TELEMETRY_LOG"),
+            requests=requests,
+        )
+        if not telemetry.enabled:
+            return telemetry
+        if port := os.getenv("SWARM_METRICS_PORT"):
+            telemetry.registry.serve(
+                int(port), os.getenv("SWARM_METRICS_HOST", "127.0.0.1")
+            )
+        if path := os.getenv("SWARM_METRICS_FILE"):
+            telemetry.export(path, float(os.getenv("SWARM_METRICS_INTERVAL", 15)))
+        return telemetry
+
+    def track(self, model: str, provider: Optional[str] = None) -> Any:
+        """
+        Returns a span timing one call to `model`; use it as a context manager.
+
+        Args:
+            model: Model slug as sent to the provider.
+            provider: Provider name. Defaults to the slug's prefix, or "default".
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        if provider is None:
+            provider = model.split("/", 1)[0] if "/" in model else "default"
+        return Span(self, model, provider)
+
+    def record(
+        self,
+        model: str,
+        provider: str,
+        latency: float,
+        ttft: Optional[float] = None,
+        result: Any = None,
+        error: Optional[type] = None,
+        prompt: Any = None,
+    ):
+        """
+        Records one finished call.
+
+        Args:
+            model: Model slug.
+            provider: Provider name.
+            latency: Seconds from sending the request to the end of the reply.
+            ttft: Seconds to the first streamed token.
+            result: Response to read token usage from.
+            error: Exception type the call failed with.
+            prompt: Input sent for the call, hashed (and kept, if payloads are on) by the request log.
+        """
+        if not self.enabled:
+            return
+        labels = (model, provider)
+        input_tokens, output_tokens, reasoning_tokens = (
+            usage_of(result) if result is not None else (None, None, None)
+        )
+        cost = (
+            estimate_cost(model, input_tokens, output_tokens) if error is None else None
+        )
+        with self.registry.lock:
+            self.latency.observe((*labels, "error" if error else "ok"), latency)
+            if ttft is not None:
+                self.ttft.observe(labels, ttft)
+            for kind, count in (
+                ("input", input_tokens),
+                ("output", output_tokens),
+                ("reasoning", reasoning_tokens),
+            ):
+                if count:
+                    self.tokens.inc((*labels, kind), count)
+            if cost:
+                self.cost.inc(labels, cost)
+        if self.log_path:
+            self.log(
+                model=model,
+                provider=provider,
+                latency=latency,
+                ttft=ttft,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                reasoning_tokens=reasoning_tokens,
+                cost=cost,
+                error=error.__name__ if error else None,
+            )
+        if self.requests is not None:
+            self.requests.append(
+                model=model,
+                provider=provider,
+                latency=latency,
+                ttft=ttft,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                reasoning_tokens=reasoning_tokens,
+                cost=cost,
+                error=error.__name__ if error else None,
+                # Copied, so messages appended to the history later do not leak into the hash
+                prompt=list(prompt) if isinstance(prompt, list) else prompt,
+                result=result,
+            )
+
+    def log(self, **fields: Any):
+        """
+        Writes one JSON record to the telemetry log, adding the loguru sink on first use.
+        """
+        if self._logger is None:
+            from loguru import logger
+
+            # Records go out at TRACE, below the console handlers' levels, so only this sink keeps them
+            logger.add(
+                self.log_path,
+                level="TRACE",
+                serialize=True,
+                enqueue=True,
+                filter=lambda record: "telemetry" in record["extra"],
+            )
+            self._logger = logger.bind(telemetry=True)
+        self._logger.trace("model call", **fields)
+
+    def retry_hooks(
+        self, provider: Optional[str], asynchronous: bool = False
+    ) -> Dict[str, List[Callable]]:
+        """
+        Returns httpx `event_hooks` that count the retries the OpenAI SDK takes.
+
+        The SDK numbers its attempts in the `x-stainless-retry-count` request header, so every
+        request with a non-zero count is a retry.
+        """
+        if not self.enabled:
+            return {}
+
+        def on_request(request: Any):
+            if request.headers.get("x-stainless-retry-count", "0") != "0":
+                self.retried(provider)
+
+        async def aon_request(request: Any):
+            on_request(request)
+
+        return {"request": [aon_request if asynchronous else on_request]}
+
+    def retried(self, provider: Optional[str]):
+        """
+        Counts one retry against a provider.
+        """
+        if not self.enabled:
+            return
+        with self.registry.lock:
+            self.retries.inc((provider or "default",))
+
+    def export(self, path: str, interval: float):
+        """
+        Rewrites the metrics file every `interval` seconds from a daemon thread and once at exit.
+        """
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.registry.write(path)
+
+        threading.Thread(target=loop, name="swarm-metrics-file", daemon=True).start()
+        atexit.register(self.registry.write, path)
+
+
+telemetry = Telemetry.from_env()
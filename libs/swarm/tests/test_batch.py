@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import batch
+from batch import run_batch
+
+
+def rows(path, count: int):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(
+                json.dumps(
+                    {
+                        "custom_id": f"r{i}",
+                        "model": "m",
+                        "messages": [{"role": "user", "content": str(i)}],
+                    }
+                )
+            )
+            f.write("\n")
+
+
+def test_run_batch_resumes_from_checkpoint(tmp_path, monkeypatch):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    rows(source, 20)
+    in_flight, peak = 0, 0
+
+    async def complete(row, cache):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        data = json.loads(row)
+        if data["custom_id"] in ("r3", "r7") and data["custom_id"] not in failed_once:
+            failed_once.add(data["custom_id"])
+            raise RuntimeError("upstream failed")
+        return data["custom_id"], {"echo": data["messages"][0]["content"]}
+
+    failed_once: set = set()
+    monkeypatch.setattr(batch, "complete", complete)
+    first = asyncio.run(run_batch(source, output, concurrency=4))
+    assert (first.completed, first.skipped, first.failed) == (18, 0, 2)
+    assert peak <= 4
+
+    second = asyncio.run(run_batch(source, output, concurrency=4))
+    assert (second.completed, second.skipped, second.failed) == (2, 18, 0)
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(record["line"] for record in records) == list(range(20))
+
+
+def test_run_batch_leaves_the_shared_registry_open(tmp_path, monkeypatch):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    rows(source, 2)
+    closed = []
+
+    async def complete(row, cache):
+        return None, {}
+
+    async def aclose():
+        closed.append(True)
+
+    monkeypatch.setattr(batch, "complete", complete)
+    monkeypatch.setattr(batch.registry, "aclose", aclose)
+    asyncio.run(run_batch(source, output))
+    assert not closed
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from cache import MemoryCache, SingleFlight, SQLiteCache, payload_key
+
+
+def stored_bytes(cache: SQLiteCache) -> int:
+    return cache._conn.execute("SELECT bytes FROM cache_size").fetchone()[0]
+
+
+def test_payload_key_ignores_key_order():
+    assert payload_key({"a": 1, "b": [1, 2]}) == payload_key({"b": [1, 2], "a": 1})
+    assert payload_key({"a": 1}) != payload_key({"a": 1}, namespace="other")
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1" and cache.get("c") == b"3"
+    assert cache.stats.evictions == 1
+
+
+def test_memory_cache_bounds_bytes_and_expires_entries():
+    cache = MemoryCache(max_bytes=4)
+    cache.set("a", b"12")
+    cache.set("b", b"34")
+    cache.set("c", b"5")
+    assert cache.get("a") is None and len(cache) == 2
+    cache.set("d", b"6", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("d") is None
+
+
+def test_sqlite_cache_evicts_least_recently_accessed(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite", max_bytes=30)
+    for key in "abc":
+        cache.set(key, b"x" * 10)
+        time.sleep(0.002)
+    cache.get("a")
+    cache.set("d", b"x" * 10)
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert stored_bytes(cache) == 30
+
+
+def test_sqlite_cache_tracks_size_through_replace_delete_and_expiry(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite")
+    cache.set("a", b"x" * 10)
+    cache.set("a", b"x" * 4)
+    cache.set("b", b"x" * 6, ttl=0.01)
+    assert stored_bytes(cache) == 10
+    cache.delete("a")
+    time.sleep(0.02)
+    cache.set("c", b"x")
+    assert stored_bytes(cache) == 1
+    cache.clear()
+    assert stored_bytes(cache) == 0 and len(cache) == 0
+
+
+def test_sqlite_cache_total_is_shared_between_connections(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    first, second = SQLiteCache(path, max_bytes=25), SQLiteCache(path, max_bytes=25)
+    first.set("a", b"x" * 10)
+    second.set("b", b"x" * 10)
+    first.set("c", b"x" * 10)
+    assert stored_bytes(second) <= 25
+    assert first.get("a") is None and second.get("c") is not None
+
+
+def test_sqlite_cache_counts_existing_rows_on_upgrade(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = SQLiteCache(path)
+    cache.set("a", b"x" * 7)
+    cache._conn.execute("DROP TABLE cache_size")
+    cache.close()
+    assert stored_bytes(SQLiteCache(path)) == 7
+
+
+def test_single_flight_runs_once_for_threads():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("k", fetch)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+    assert {value for value, _ in results} == {"value"}
+
+
+def test_single_flight_shares_exceptions_between_coroutines():
+    flight = SingleFlight()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream")
+
+    async def main():
+        return await asyncio.gather(
+            *(flight.ado("k", fail) for _ in range(4)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    with pytest.raises(RuntimeError):
+        asyncio.run(flight.ado("k", fail))
+    assert len(calls) == 2
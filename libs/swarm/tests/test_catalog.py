@@ -0,0 +1,125 @@
+import json
+import random
+
+import pytest
+
+from catalog import Catalog, SortedIndex, members, normalize
+
+
+def listing(
+    model_id: str, outputs=("text",), prompt="0.000001", completion="0.000002", **extra
+):
+    return {
+        "id": model_id,
+        "architecture": {
+            "input_modalities": ["text"],
+            "output_modalities": list(outputs),
+        },
+        "pricing": {"prompt": prompt, "completion": completion},
+        "context_length": 8192,
+        **extra,
+    }
+
+
+@pytest.mark.parametrize(
+    "model_id, fast",
+    [
+        ("google/gemini-2.5-pro", False),
+        ("google/gemini-2.5-flash", True),
+        ("openai/gpt-4.1-mini", True),
+        ("openai/o4-mini-high", True),
+        ("mistralai/mistral-small-3.1-24b-instruct:free", True),
+        ("openai/gpt-4.1", False),
+    ],
+)
+def test_normalize_fast_hints_match_name_tokens(model_id, fast):
+    assert ("fast" in normalize(listing(model_id))["types"]) is fast
+
+
+def test_normalize_embeddings_models_are_not_fast():
+    record = normalize(
+        listing("openai/text-embedding-3-small", outputs=("embeddings",))
+    )
+    assert record["types"] == ["embeddings"]
+
+
+def test_normalize_prices_and_tags():
+    record = normalize(listing("meta/llama-3:free", prompt="0", completion="0"))
+    assert record["input_price"] == 0.0 and record["output_price"] == 0.0
+    assert record["tags"] == ["free"]
+    assert normalize(listing("a/b"))["input_price"] == 1.0
+
+
+def test_members_lists_set_bits():
+    assert list(members(0b101001)) == [0, 3, 5]
+    assert list(members(0)) == []
+
+
+def test_sorted_index_bounds():
+    index = SortedIndex([3.0, None, 1.0, 2.0])
+    assert list(members(index.at_most(2.0))) == [2, 3]
+    assert list(members(index.at_least(2.0))) == [0, 3]
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    rng = random.Random(7)
+    records = []
+    for i in range(300):
+        price = rng.choice([None, 0.0, 0.5, 1.0, 3.0, 10.0])
+        records.append(
+            {
+                "id": f"{rng.choice(['openai', 'google', 'meta'])}/model-{i}",
+                "types": rng.sample(["chat", "fast", "reasoning"], rng.randint(1, 2)),
+                "inputs": rng.choice([["text"], ["text", "image"]]),
+                "outputs": ["text"],
+                "tags": rng.choice([[], ["free"]]),
+                "quantizations": [],
+                "input_price": price,
+                "output_price": None if price is None else price * 4,
+                "context_window": rng.choice([None, 8192, 128000, 1000000]),
+            }
+        )
+    path = tmp_path / "models.json"
+    path.write_text(json.dumps({"models": records}))
+    return Catalog(str(path)), records
+
+
+def test_queries_match_a_scan(catalog):
+    catalog, records = catalog
+    query = {
+        "types": ["chat"],
+        "inputs": ["image"],
+        "max_price": 5.0,
+        "min_context": 100000,
+    }
+    expected = [
+        r["id"]
+        for r in records
+        if "chat" in r["types"]
+        and "image" in r["inputs"]
+        and r["input_price"] is not None
+        and r["input_price"] + r["output_price"] <= 5.0
+        and (r["context_window"] or 0) >= 100000
+    ]
+    assert catalog.find(**query) == expected
+    assert catalog.count(**query) == len(expected)
+
+
+def test_find_sorts_with_unknown_values_last(catalog):
+    catalog, records = catalog
+    found = catalog.find(sort="price", providers=["google"])
+    prices = [catalog.record(model_id)["input_price"] for model_id in found]
+    known = [price for price in prices if price is not None]
+    assert known == sorted(known)
+    assert prices[len(known) :] == [None] * (len(prices) - len(known))
+    assert len(found) == sum(r["id"].startswith("google/") for r in records)
+
+
+def test_registry_materializes_models_lazily(catalog):
+    catalog, _ = catalog
+    registry = catalog.registry(types=["fast"], limit=3)
+    assert len(registry) == 3
+    assert not catalog._models
+    name = next(iter(registry))
+    assert "fast" in registry[name].types
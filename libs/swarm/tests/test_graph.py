@@ -0,0 +1,114 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from graph import Graph
+from runner import Runner
+
+
+def setting(key, value):
+    """
+    Returns a node function that records the context it saw and sets one variable.
+    """
+
+    def function(inputs, context_variables):
+        return {
+            "value": json.dumps(context_variables),
+            "agent": None,
+            "context_variables": {key: value},
+        }
+
+    return function
+
+
+@pytest.fixture
+def runner():
+    runner = Runner()
+    yield runner
+    runner.executor.shutdown()
+
+
+def test_nodes_see_changes_of_all_ancestors(runner):
+    graph = Graph()
+    graph.add("a", function=setting("user", "ada"))
+    graph.add("b", function=setting("plan", "x"), after=["a"])
+    graph.add("c", function=setting("done", "1"), after=["b"])
+    result = graph.run_sync(runner, context_variables={"seed": "0"})
+    assert result.ok
+    assert json.loads(result.nodes["c"].output) == {
+        "seed": "0",
+        "user": "ada",
+        "plan": "x",
+    }
+    assert result.nodes["c"].context_variables == {"done": "1"}
+    assert result.context_variables == {
+        "seed": "0",
+        "user": "ada",
+        "plan": "x",
+        "done": "1",
+    }
+
+
+def test_later_ancestor_wins_conflicts_in_node_order(runner):
+    graph = Graph()
+    graph.add("a", function=setting("k", "a"))
+    graph.add("b", function=setting("k", "b"))
+    graph.add("c", function=setting("other", "c"), after=["b", "a"])
+    assert json.loads(graph.run_sync(runner).nodes["c"].output) == {"k": "b"}
+    assert graph.ancestors() == {"a": [], "b": [], "c": ["a", "b"]}
+
+
+def test_independent_branches_run_concurrently(runner):
+    async def slow(inputs):
+        await asyncio.sleep(0.1)
+        return 1
+
+    graph = Graph()
+    for i in range(5):
+        graph.add(f"n{i}", function=slow)
+    graph.add(
+        "sum",
+        function=lambda inputs: sum(inputs.values()),
+        after=[f"n{i}" for i in range(5)],
+    )
+    started = time.perf_counter()
+    result = graph.run_sync(runner)
+    assert time.perf_counter() - started < 0.3
+    assert result.outputs()["sum"] == 5
+
+
+def test_failures_and_timeouts_skip_dependents_only(runner):
+    async def hang(inputs):
+        await asyncio.sleep(10)
+
+    def fail(inputs):
+        raise RuntimeError("boom")
+
+    graph = Graph()
+    graph.add("fail", function=fail)
+    graph.add("hang", function=hang, timeout=0.05)
+    graph.add("fine", function=lambda inputs: "ok")
+    graph.add("after_fail", function=lambda inputs: 1, after=["fail"])
+    graph.add("after_hang", function=lambda inputs: 1, after=["hang", "fine"])
+    result = graph.run_sync(runner)
+    statuses = {name: node.status for name, node in result.nodes.items()}
+    assert statuses == {
+        "fail": "error",
+        "hang": "timeout",
+        "fine": "ok",
+        "after_fail": "skipped",
+        "after_hang": "skipped",
+    }
+    assert not result.ok and result.outputs() == {"fine": "ok"}
+
+
+def test_add_rejects_unknown_dependencies_and_duplicates():
+    graph = Graph().add("a", function=lambda inputs: 1)
+    with pytest.raises(ValueError):
+        graph.add("a", function=lambda inputs: 2)
+    with pytest.raises(ValueError):
+        graph.add("b", function=lambda inputs: 2, after=["missing"])
+    with pytest.raises(ValueError):
+        graph.add("c")
@@ -0,0 +1,129 @@
+import asyncio
+from collections import deque
+from types import SimpleNamespace
+
+import pytest
+
+from hedge import Hedger, prime
+from models import OPENROUTER_MODELS
+from router import ModelRouter, Route
+
+NAME = next(iter(OPENROUTER_MODELS))
+ROUTES = [
+    Route(NAME, OPENROUTER_MODELS[NAME], upstream) for upstream in ("first", "second")
+]
+
+
+class Events:
+    """
+    An async stream of events with optional pauses, recording whether it was closed.
+    """
+
+    def __init__(self, *items):
+        self.items, self.closed = list(items), False
+
+    async def __aiter__(self):
+        for item in self.items:
+            if isinstance(item, float):
+                await asyncio.sleep(item)
+            else:
+                yield item
+
+    async def close(self):
+        self.closed = True
+
+
+def hedger(**kwargs) -> Hedger:
+    return Hedger(ModelRouter(), **{"initial_delay": 0.02, **kwargs})
+
+
+def answer(delays, failures=()):
+    cancelled = []
+
+    async def fn(route: Route):
+        try:
+            await asyncio.sleep(delays[route.upstream])
+        except asyncio.CancelledError:
+            cancelled.append(route.upstream)
+            raise
+        if route.upstream in failures:
+            raise RuntimeError(route.upstream)
+        return route.upstream
+
+    return fn, cancelled
+
+
+def test_fast_answer_is_not_hedged():
+    h = hedger()
+    fn, _ = answer({"first": 0.0, "second": 0.0})
+    assert asyncio.run(h.race(ROUTES, fn)) == "first"
+    assert h.stats.hedges == 0 and h.stats.calls == 1
+
+
+def test_late_answer_is_raced_and_loser_cancelled():
+    h = hedger()
+    fn, cancelled = answer({"first": 1.0, "second": 0.0})
+    assert asyncio.run(h.race(ROUTES, fn)) == "second"
+    assert h.stats.hedges == 1 and h.stats.wins == 1
+    assert cancelled == ["first"]
+    assert h._in_flight == 0
+
+
+def test_early_failure_fails_over_at_once():
+    h = hedger(initial_delay=10.0)
+    fn, _ = answer({"first": 0.0, "second": 0.0}, failures={"first"})
+    assert asyncio.run(asyncio.wait_for(h.race(ROUTES, fn), 1.0)) == "second"
+    assert h.stats.hedges == 0
+
+
+def test_every_attempt_failing_raises_the_last_error():
+    h = hedger()
+    fn, _ = answer({"first": 0.0, "second": 0.0}, failures={"first", "second"})
+    with pytest.raises(RuntimeError, match="second"):
+        asyncio.run(h.race(ROUTES, fn))
+    with pytest.raises(LookupError):
+        asyncio.run(h.race([], fn))
+
+
+def test_budget_denies_hedges():
+    h = hedger(max_in_flight=0)
+    fn, _ = answer({"first": 0.05, "second": 0.0})
+    assert asyncio.run(h.race(ROUTES, fn)) == "first"
+    assert h.stats.denied == 1 and h.stats.hedges == 0
+
+
+def test_delay_follows_the_observed_quantile():
+    h = hedger(min_samples=4, quantile=0.5, min_delay=0.0)
+    assert h.delay(NAME) == 0.02
+    h._samples[NAME] = deque([0.1, 0.2, 0.3, 0.4])
+    assert h.delay(NAME) == 0.3
+
+
+def delta(text):
+    return SimpleNamespace(type="response.output_text.delta", delta=text)
+
+
+def test_prime_waits_for_the_first_token_and_replays_what_it_read():
+    created = SimpleNamespace(type="response.created")
+    stream = Events(created, 0.01, delta("a"), delta("b"))
+
+    async def main():
+        primed = await prime(
+            stream, ready=lambda event: event.type == "response.output_text.delta"
+        )
+        assert primed.ttft >= 0.01
+        return [event async for event in primed]
+
+    assert asyncio.run(main()) == [created, stream.items[2], stream.items[3]]
+
+
+def test_race_on_first_token_closes_the_losing_stream():
+    h = hedger()
+    streams = {"first": Events(1.0, delta("slow")), "second": Events(delta("fast"))}
+
+    async def main():
+        primed = await h.race(ROUTES, lambda route: prime(streams[route.upstream]))
+        return [event.delta async for event in primed]
+
+    assert asyncio.run(main()) == ["fast"]
+    assert streams["first"].closed and not streams["second"].closed
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import pytest
+
+from local_inference import Worker
+
+
+class Session:
+    def get_inputs(self):
+        return [SimpleNamespace(name="input_ids", type="tensor(int64)")]
+
+    def get_outputs(self):
+        return [
+            SimpleNamespace(
+                name="last_hidden_state",
+                type="tensor(float)",
+                shape=["batch", "sequence", 4],
+            )
+        ]
+
+    def io_binding(self):
+        return None
+
+
+def worker(tokenizer=None) -> Worker:
+    model = SimpleNamespace(path="model.onnx", tokenizer=tokenizer, max_length=8)
+    return Worker(model, Session())
+
+
+def test_text_without_tokenizer_is_rejected():
+    with pytest.raises(ValueError, match="no tokenizer"):
+        worker().feed(["hello"])
+
+
+def test_token_ids_pad_to_longest_row():
+    feeds, mask = worker().feed([[1, 2, 3], [4]])
+    assert feeds["input_ids"].tolist() == [[1, 2, 3], [4, 0, 0]]
+    assert mask is not None and mask.tolist() == [[1, 1, 1], [1, 0, 0]]
+
+
+def test_tokenizer_truncates_to_max_length():
+    feeds, _ = worker(tokenizer=lambda text: range(1, len(text) + 1)).feed(["a" * 20])
+    assert feeds["input_ids"].tolist() == [list(range(1, 9))]
@@ -0,0 +1,193 @@
+import asyncio
+import gc
+
+import httpx
+import pytest
+
+from ratelimit import (
+    POLL_INTERVAL,
+    AsyncRateLimitedTransport,
+    Limiter,
+    RateLimitedTransport,
+    RetryPolicy,
+    TokenBucket,
+    estimate_request_tokens,
+    parse_duration,
+    retry_after,
+)
+
+NO_WAIT = RetryPolicy(max_retries=2, base=0.0, cap=0.0)
+
+
+class Body(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """
+    A streamed body, which httpx does not read ahead the way it does for bytes content.
+    """
+
+    def __iter__(self):
+        yield b"{}"
+
+    async def __aiter__(self):
+        yield b"{}"
+
+
+def replies(*statuses: int):
+    """
+    Returns an httpx handler answering with the given statuses in turn, then 200s.
+    """
+    queue = list(statuses)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = queue.pop(0) if queue else 200
+        return httpx.Response(status, headers={"retry-after-ms": "0"}, stream=Body())
+
+    return handler
+
+
+def client(limiter: Limiter, handler=None, pool: float = 5.0) -> httpx.Client:
+    transport = RateLimitedTransport(
+        limiter, httpx.MockTransport(handler or replies()), NO_WAIT
+    )
+    return httpx.Client(
+        transport=transport,
+        base_url="http://test",
+        timeout=httpx.Timeout(5.0, pool=pool),
+    )
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [
+        ("1s", 1.0),
+        ("6m0s", 360.0),
+        ("20ms", 0.02),
+        ("1.5", 1.5),
+        ("", None),
+        ("soon", None),
+    ],
+)
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+
+def test_retry_after_prefers_milliseconds():
+    assert (
+        retry_after(httpx.Headers({"retry-after-ms": "250", "retry-after": "3"}))
+        == 0.25
+    )
+    assert retry_after(httpx.Headers({"retry-after": "3"})) == 3.0
+    assert retry_after(httpx.Headers()) is None
+
+
+def test_estimate_request_tokens_counts_output_cap():
+    assert estimate_request_tokens(b"x" * 400) == 100
+    assert estimate_request_tokens(b'{"max_tokens": 50}') == 4 + 50
+
+
+def test_token_bucket_reports_shortfall():
+    bucket = TokenBucket(60)
+    assert bucket.take(60, bucket.updated) == 0.0
+    assert bucket.take(1, bucket.updated) == pytest.approx(1.0)
+    assert bucket.take(1, bucket.updated + 1.0) == 0.0
+
+
+def test_limiter_caps_concurrency():
+    limiter = Limiter(concurrency=2)
+    assert limiter.admit(0) == 0.0
+    assert limiter.admit(0) == 0.0
+    assert limiter.admit(0) == POLL_INTERVAL
+    limiter.release(200, 0.1)
+    assert limiter.admit(0) == 0.0
+    assert limiter.in_flight == 2
+
+
+def test_limiter_backs_off_on_429():
+    limiter = Limiter(concurrency=8, cooldown=60)
+    for _ in range(2):
+        limiter.admit(0)
+    limiter.release(429, 0.1, httpx.Headers({"retry-after": "30"}))
+    limiter.release(429, 0.1, httpx.Headers({"retry-after": "30"}))
+    # A second 429 inside the cooldown does not halve the limit again
+    assert limiter.limit == 4
+    assert limiter.stats.throttled == 2
+    assert limiter.admit(0) > 29
+
+
+def test_limiter_grows_while_saturated():
+    limiter = Limiter(concurrency=2)
+    limiter.admit(0)
+    limiter.admit(0)
+    limiter.release(200, 0.1)
+    assert limiter.limit == pytest.approx(2.5)
+    limiter.release(200, 0.1)
+    assert limiter.limit == pytest.approx(2.5)
+
+
+def test_limiter_follows_advertised_limits():
+    limiter = Limiter()
+    limiter.admit(0)
+    limiter.release(200, 0.1, httpx.Headers({"x-ratelimit-limit-requests": "120"}))
+    assert limiter.requests is not None and limiter.requests.capacity == 120
+
+
+def test_slot_held_until_body_closed():
+    limiter = Limiter()
+    with client(limiter) as http:
+        with http.stream("POST", "/v1/chat") as response:
+            assert response.status_code == 200
+            assert limiter.in_flight == 1
+        assert limiter.in_flight == 0
+
+
+def test_dropped_response_releases_slot():
+    limiter = Limiter()
+    with client(limiter) as http:
+        response = http.send(http.build_request("POST", "/v1/chat"), stream=True)
+        assert limiter.in_flight == 1
+        del response
+        gc.collect()
+        assert limiter.in_flight == 0
+
+
+def test_admission_wait_bounded_by_pool_timeout():
+    limiter = Limiter(concurrency=1)
+    limiter.admit(0)
+    with client(limiter, pool=0.05) as http:
+        with pytest.raises(httpx.PoolTimeout):
+            http.post("/v1/chat")
+    assert limiter.in_flight == 1
+
+
+def test_retries_retryable_statuses():
+    limiter = Limiter()
+    with client(limiter, replies(429, 503)) as http:
+        assert http.post("/v1/chat").status_code == 200
+    assert limiter.stats.retries == 2
+    assert limiter.stats.throttled == 1
+    assert limiter.in_flight == 0
+
+
+def test_returns_last_failure_when_retries_run_out():
+    limiter = Limiter()
+    with client(limiter, replies(500, 500, 500)) as http:
+        assert http.post("/v1/chat").status_code == 500
+    assert limiter.stats.retries == NO_WAIT.max_retries
+    assert limiter.in_flight == 0
+
+
+def test_async_transport_shares_limiter():
+    limiter = Limiter(concurrency=4)
+
+    async def main():
+        transport = AsyncRateLimitedTransport(
+            limiter, httpx.MockTransport(replies(429)), NO_WAIT
+        )
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as http:
+            responses = await asyncio.gather(*(http.post("/v1/chat") for _ in range(8)))
+        return [response.status_code for response in responses]
+
+    assert asyncio.run(main()) == [200] * 8
+    assert limiter.stats.admitted == 9
+    assert limiter.in_flight == 0
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from request_log import RequestLog, scan, segments
+
+
+@pytest.mark.parametrize("format", ["parquet", "ipc"])
+def test_each_flush_writes_an_immutable_part(tmp_path, format):
+    log = RequestLog(str(tmp_path), format=format)
+    log.append(model="a", latency=0.1, prompt="hi")
+    log.flush()
+    first = log.segments()
+    stamp = os.path.getmtime(first[0])
+    log.append(model="b", latency=0.2, prompt="hi")
+    log.flush()
+    assert len(log.segments()) == 2 and log.segments()[0] == first[0]
+    assert os.path.getmtime(first[0]) == stamp
+    assert scan(str(tmp_path)).collect()["model"].to_list() == ["a", "b"]
+
+
+@pytest.mark.parametrize("format", ["parquet", "ipc"])
+def test_rotation_compacts_parts_into_one_segment(tmp_path, format):
+    log = RequestLog(str(tmp_path), format=format)
+    for model in "abc":
+        log.append(model=model, prompt="same")
+        log.flush()
+    parts = log.segments()
+    log.segment_bytes = 1
+    log.append(model="d", prompt="same")
+    log.flush()
+    assert log.segments() == parts[:1]
+    assert log.stats.segments == 1 and log.stats.flushes == 4
+    assert scan(str(tmp_path)).collect()["model"].to_list() == list("abcd")
+
+
+def test_close_compacts_the_open_segment(tmp_path):
+    log = RequestLog(str(tmp_path))
+    for model in "ab":
+        log.append(model=model)
+        log.flush()
+    log.close()
+    assert len(segments(str(tmp_path))) == 1
+    assert scan(str(tmp_path)).collect().height == 2
+
+
+def test_logs_sharing_a_directory_never_collide(tmp_path):
+    logs = [RequestLog(str(tmp_path)) for _ in range(3)]
+    for log in logs:
+        log.append(model="m")
+        log.flush()
+    assert len(segments(str(tmp_path))) == 3
+    assert scan(str(tmp_path)).collect().height == 3
@@ -0,0 +1,66 @@
+import pytest
+
+from models import OPENROUTER_MODELS
+from router import ModelRouter
+
+
+def embeddings_models():
+    return {
+        name
+        for name, model in OPENROUTER_MODELS.items()
+        if "embeddings" in (model.types or ())
+    }
+
+
+@pytest.mark.parametrize(
+    "capabilities", [{"types": ["fast"]}, {"inputs": ["text"]}, {}]
+)
+def test_chat_plans_exclude_embeddings_models(capabilities):
+    plan = ModelRouter().plan(**capabilities)
+    assert plan
+    assert not {route.name for route in plan} & embeddings_models()
+
+
+def test_embeddings_models_listed_when_requested():
+    routes = ModelRouter().candidates(types=["embeddings"])
+    assert {route.name for route in routes} == embeddings_models()
+
+
+def test_unknown_capabilities_raise():
+    with pytest.raises(LookupError):
+        ModelRouter().plan(types=["embeddings"], tags=["free"])
+
+
+def test_price_sort_prefers_cheapest_priced_model():
+    plan = ModelRouter().plan("price", types=["chat"], tags=[])
+    prices = [
+        (route.model.input_price or 0.0) + (route.model.output_price or 0.0)
+        for route in plan
+    ]
+    assert prices == sorted(prices)
+
+
+def test_latency_sort_explores_unmeasured_routes_first():
+    router = ModelRouter()
+    first = router.select("latency", types=["fast"])
+    router.observe(first, 0.5)
+    second = router.select("latency", types=["fast"])
+    assert second != first
+    router.observe(second, 2.0)
+    for route in router.candidates(types=["fast"]):
+        if route not in (first, second):
+            router.observe(route, 1.0)
+    assert router.select("latency", types=["fast"]) == first
+
+
+def test_routes_on_cooldown_are_not_selected():
+    router = ModelRouter(max_failures=1)
+    first = router.select("latency", types=["fast"])
+    router.observe_error(first)
+    assert router.select("latency", types=["fast"]) != first
+
+
+def test_registry_prices_give_cost_estimates():
+    from telemetry import estimate_cost
+
+    assert estimate_cost("openai/gpt-4.1", 1_000_000, 1_000_000) == pytest.approx(10.0)
@@ -0,0 +1,68 @@
+import numpy as np
+
+from semantic_cache import SemanticCache, normalize_prompt
+
+
+class Embedder:
+    """
+    Embeds a prompt as a bag of its words, so prompts sharing words are similar.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        vectors = np.zeros((len(texts), 64), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.split():
+                vectors[row, sum(map(ord, word)) % 64] += 1.0
+        return vectors
+
+
+def test_normalize_prompt_folds_case_space_and_punctuation():
+    assert normalize_prompt("  What IS\tpython? ") == "what is python"
+
+
+def test_exact_hit_skips_the_embedding():
+    embedder = Embedder()
+    cache = SemanticCache(embedder)
+    scope = cache.scope("m", "be brief")
+    assert cache.get(scope, "What is Python?") is None
+    cache.set(scope, "What is Python?", "A language.")
+    calls = embedder.calls
+    hit = cache.get(scope, "what is python")
+    assert hit is not None and hit.similarity == 1.0
+    assert embedder.calls == calls
+
+
+def test_similar_prompt_hits_above_threshold_only():
+    cache = SemanticCache(Embedder(), threshold=0.8)
+    scope = cache.scope("m")
+    cache.set(scope, "how do I sort a list in python", "sorted(xs)")
+    assert cache.get(scope, "how do I sort a list in python quickly") is not None
+    assert cache.get(scope, "best pizza in town") is None
+
+
+def test_zero_threshold_is_kept(monkeypatch):
+    monkeypatch.setenv("SWARM_SEMANTIC_THRESHOLD", "0.99")
+    assert SemanticCache(Embedder(), threshold=0.0).threshold == 0.0
+    assert SemanticCache(Embedder()).threshold == 0.99
+
+
+def test_scopes_do_not_share_answers():
+    cache = SemanticCache(Embedder())
+    cache.set(cache.scope("m", "pirate"), "hello", "Ahoy")
+    assert cache.get(cache.scope("m", "butler"), "hello") is None
+    assert cache.get(cache.scope("other", "pirate"), "hello") is None
+    assert cache.get(cache.scope("m", "pirate"), "hello").response == "Ahoy"
+
+
+def test_false_hit_drops_the_entry():
+    cache = SemanticCache(Embedder())
+    scope = cache.scope("m")
+    cache.set(scope, "hello", "hi")
+    assert cache.get(scope, "hello") is not None
+    assert cache.report_false_hit(scope, "hello")
+    assert cache.get(scope, "hello") is None
+    assert cache.stats.false_hits == 1 and not cache.report_false_hit(scope, "hello")
@@ -0,0 +1,66 @@
+import asyncio
+import io
+from types import SimpleNamespace
+
+import pytest
+from rich.console import Console
+
+from streaming import astream_response, stream_response
+
+
+def events(*texts, fail=False):
+    yield SimpleNamespace(type="response.created")
+    for text in texts:
+        yield SimpleNamespace(type="response.output_text.delta", delta=text)
+    if fail:
+        yield SimpleNamespace(type="error", message="overloaded")
+    usage = SimpleNamespace(input_tokens=7, output_tokens=len(texts))
+    yield SimpleNamespace(
+        type="response.completed", response=SimpleNamespace(id="resp_1", usage=usage)
+    )
+
+
+class Stream:
+    def __init__(self, items):
+        self.items, self.closed = list(items), False
+
+    def __iter__(self):
+        return iter(self.items)
+
+    async def __aiter__(self):
+        for item in self.items:
+            yield item
+
+    def close(self):
+        self.closed = True
+
+    async def aclose(self):
+        self.closed = True
+
+
+def console() -> Console:
+    return Console(file=io.StringIO(), force_terminal=False)
+
+
+def test_stream_response_collects_text_and_usage():
+    stream = Stream(events("Hello", ", world"))
+    stats = stream_response(stream, console=console())
+    assert stats.text == "Hello, world" and stats.response_id == "resp_1"
+    assert (stats.input_tokens, stats.output_tokens) == (7, 2)
+    assert stats.ttft is not None and stream.closed
+
+
+def test_astream_response_matches_the_sync_version():
+    class Async(Stream):
+        close = Stream.aclose
+
+    stream = Async(events("a", "b", "c"))
+    stats = asyncio.run(astream_response(stream, console=console()))
+    assert stats.text == "abc" and stats.output_tokens == 3 and stream.closed
+
+
+def test_failed_stream_raises_and_closes():
+    stream = Stream(events("partial", fail=True))
+    with pytest.raises(RuntimeError, match="overloaded"):
+        stream_response(stream, console=console())
+    assert stream.closed
@@ -0,0 +1,113 @@
+import json
+import random
+from typing import List
+
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from structured import JSONStreamParser, StructuredStream, text_delta
+
+
+class Report(BaseModel):
+    title: str
+    score: int
+    tags: List[str] = []
+
+
+def chunks(text: str, rng: random.Random):
+    i = 0
+    while i < len(text):
+        size = rng.randint(1, 7)
+        yield text[i : i + size]
+        i += size
+
+
+def document(rng: random.Random, depth: int = 0):
+    kind = rng.choice(["object", "array", "scalar"] if depth < 3 else ["scalar"])
+    if kind == "object":
+        return {f'k{i}é\\"': document(rng, depth + 1) for i in range(rng.randint(0, 4))}
+    if kind == "array":
+        return [document(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return rng.choice(
+        [None, True, False, 0, -12, 3.5e-3, "", 'line\nbreak "quoted" \\ ☃', "plain"]
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_chunked_parse_matches_json_loads(seed):
+    rng = random.Random(seed)
+    value = {"root": document(rng)}
+    text = json.dumps(
+        value, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 2])
+    )
+    parser = JSONStreamParser()
+    for chunk in chunks(text, rng):
+        parser.feed(chunk)
+    assert parser.close() == value
+
+
+def test_events_report_completed_values_innermost_first():
+    parser = JSONStreamParser()
+    events = parser.feed('{"a": [1, {"b": "x"}], "c": true}')
+    assert [event.path for event in events] == [
+        ("a", 0),
+        ("a", 1, "b"),
+        ("a", 1),
+        ("a",),
+        ("c",),
+        (),
+    ]
+
+
+def test_preamble_and_fences_are_skipped():
+    parser = JSONStreamParser()
+    parser.feed('Sure, the "answer": ```json\n{"a": 1}\n``` done')
+    assert parser.done and parser.value == {"a": 1}
+
+
+def test_partial_document_is_available_while_streaming():
+    parser = JSONStreamParser()
+    parser.feed('{"items": [1, 2')
+    assert parser.value == {"items": [1]}
+    assert not parser.done
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+@pytest.mark.parametrize("text", ['{"a" 1}', '{"a": tru}', "[1 2]", "{1: 2}"])
+def test_invalid_json_raises(text):
+    parser = JSONStreamParser()
+    with pytest.raises(ValueError):
+        parser.feed(text)
+        parser.close()
+
+
+def test_structured_stream_validates_fields_as_they_complete():
+    stream = StructuredStream(Report)
+    events = [
+        event
+        for event in stream.consume(
+            ['{"title": "Q3", ', '"score": "7", ', '"tags": ["a"]}']
+        )
+    ]
+    fields = {event.field: event.value for event in events if len(event.path) == 1}
+    assert fields == {"title": "Q3", "score": 7, "tags": ["a"]}
+    assert stream.result == Report(title="Q3", score=7, tags=["a"])
+
+
+def test_structured_stream_reports_field_errors_and_fails_at_the_end():
+    stream = StructuredStream(Report)
+    events = stream.feed('{"title": "Q3", "score": "high"}')
+    assert [event.field for event in events if event.error] == ["score"]
+    with pytest.raises(ValidationError):
+        stream.finish()
+
+
+def test_text_delta_reads_strings_and_events():
+    class Event:
+        type = "response.output_text.delta"
+        delta = "abc"
+
+    assert text_delta("x") == "x"
+    assert text_delta(Event()) == "abc"
+    assert text_delta(object()) is None
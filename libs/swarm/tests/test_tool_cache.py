@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import time
+
+from tool_cache import ToolCache, cache_policy, cached_tool, code_version
+
+
+def counter():
+    calls = []
+
+    @cached_tool
+    def lookup(query: str, limit: int = 10):
+        calls.append(query)
+        return {"query": query, "ids": (1, 2), 3: "three"}
+
+    return lookup, calls
+
+
+def test_cached_tool_leaves_the_function_unchanged():
+    def search(query: str) -> str:
+        return query
+
+    assert cached_tool(ttl=5)(search) is search
+    assert cache_policy(search).ttl == 5
+
+
+def test_arguments_bound_with_defaults_share_an_entry(tmp_path):
+    cache = ToolCache(str(tmp_path / "tools.sqlite"))
+    lookup, calls = counter()
+    cache.call(lookup, {"query": "a"})
+    cache.call(lookup, {"query": "a", "limit": 10})
+    cache.call(lookup, {"query": "a", "limit": 5})
+    assert calls == ["a", "a"]
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+def test_hits_and_misses_return_the_same_value(tmp_path):
+    cache = ToolCache(str(tmp_path / "tools.sqlite"))
+    lookup, _ = counter()
+    miss = cache.call(lookup, {"query": "a"})
+    hit = cache.call(lookup, {"query": "a"})
+    assert miss == hit == {"query": "a", "ids": [1, 2], "3": "three"}
+
+
+def test_unserializable_results_are_not_cached(tmp_path):
+    cache = ToolCache(str(tmp_path / "tools.sqlite"))
+    calls = []
+
+    @cached_tool
+    def handoff():
+        calls.append(1)
+        return object()
+
+    cache.call(handoff, {})
+    cache.call(handoff, {})
+    assert len(calls) == 2
+
+
+def test_concurrent_calls_run_once(tmp_path):
+    cache = ToolCache(str(tmp_path / "tools.sqlite"))
+    calls = []
+
+    @cached_tool
+    def slow(query: str):
+        calls.append(query)
+        time.sleep(0.05)
+        return query
+
+    threads = [
+        threading.Thread(target=cache.call, args=(slow, {"query": "a"}))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ["a"]
+    assert cache.stats.misses == 1
+
+
+def test_async_calls_are_cached(tmp_path):
+    cache = ToolCache(str(tmp_path / "tools.sqlite"))
+    calls = []
+
+    @cached_tool
+    async def fetch(url: str):
+        calls.append(url)
+        await asyncio.sleep(0.01)
+        return url.upper()
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.acall(fetch, {"url": "x"}) for _ in range(4))
+        )
+
+    assert asyncio.run(main()) == ["X"] * 4
+    assert asyncio.run(cache.acall(fetch, {"url": "x"})) == "X"
+    assert calls == ["x"]
+
+
+def test_persisted_results_survive_a_new_cache(tmp_path):
+    path = str(tmp_path / "tools.sqlite")
+    calls = []
+
+    @cached_tool(persist=True)
+    def lookup(query: str):
+        calls.append(query)
+        return query * 2
+
+    assert ToolCache(path).call(lookup, {"query": "a"}) == "aa"
+    assert ToolCache(path).call(lookup, {"query": "a"}) == "aa"
+    assert calls == ["a"]
+
+
+def test_context_can_be_left_out_of_the_key(tmp_path):
+    cache = ToolCache(str(tmp_path / "tools.sqlite"))
+    calls = []
+
+    @cached_tool(context=False)
+    def lookup(query: str, context_variables: dict):
+        calls.append(query)
+        return query
+
+    cache.call(lookup, {"query": "a", "context_variables": {"user": "1"}})
+    cache.call(lookup, {"query": "a", "context_variables": {"user": "2"}})
+    assert calls == ["a"]
+
+
+def test_code_version_covers_constants_and_nested_code():
+    def first():
+        return "https://a.example"
+
+    def second():
+        return "https://b.example"
+
+    def outer_first():
+        return lambda: 1
+
+    def outer_second():
+        return lambda: 2
+
+    assert first.__code__.co_code == second.__code__.co_code
+    assert code_version(first.__code__) != code_version(second.__code__)
+    assert code_version(outer_first.__code__) != code_version(outer_second.__code__)
@@ -0,0 +1,262 @@
+import hashlib
+import inspect
+import json
+import os
+import threading
+import types
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, TypeVar, Union, overload
+
+from cache import CacheStats, MemoryCache, SQLiteCache, SingleFlight, payload_key
+from utils.schema import CACHE_POLICY, CONTEXT_VARIABLES
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass(frozen=True)
+class ToolCachePolicy:
+    """
+    How the results of one agent function are cached.
+
+    Attributes:
+        ttl: Seconds a result stays valid, or None for results that never expire.
+        max_entries: Results kept in memory for this function before the least recently used is evicted.
+        persist: Also keep results on disk, so they survive restarts and are shared between processes.
+        context: Whether `context_variables` are part of the key. Turn this off only for
+            functions whose result does not depend on them.
+    """
+
+    ttl: Optional[float] = None
+    max_entries: int = 1024
+    persist: bool = False
+    context: bool = True
+
+
+def code_version(code: types.CodeType) -> str:
+    """
+    Returns a digest of a function's bytecode, constants and referenced names, including
+    those of nested functions, so changing any literal in the body changes it too.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+
+    def visit(code: types.CodeType):
+        digest.update(code.co_code)
+        digest.update(repr(code.co_names).encode())
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                visit(const)
+            elif isinstance(const, frozenset):
+                # Set literals are stored as frozensets, whose order varies with hash seeding
+                digest.update(repr(sorted(map(repr, const))).encode())
+            else:
+                digest.update(repr(const).encode())
+
+    visit(code)
+    return digest.hexdigest()
+
+
+@overload
+def cached_tool(func: F) -> F: ...
+
+
+@overload
+def cached_tool(
+    *,
+    ttl: Optional[float] = None,
+    max_entries: int = 1024,
+    persist: bool = False,
+    context: bool = True,
+) -> Callable[[F], F]: ...
+
+
+def cached_tool(
+    func: Optional[F] = None,
+    *,
+    ttl: Optional[float] = None,
+    max_entries: int = 1024,
+    persist: bool = False,
+    context: bool = True,
+) -> Union[F, Callable[[F], F]]:
+    """
+    Declares that an agent function's results may be reused for identical arguments.
+
+    The function itself is returned unchanged, so `function_to_json` describes it exactly as
+    before; the `Runner` reads the policy and routes calls through its `ToolCache`. Works
+    bare (`@cached_tool`) or with options (`@cached_tool(ttl=300, persist=True)`); see
+    `ToolCachePolicy` for what they mean.
+    """
+
+    def declare(func: F) -> F:
+        setattr(func, CACHE_POLICY, ToolCachePolicy(ttl, max_entries, persist, context))
+        return func
+
+    return declare(func) if func is not None else declare
+
+
+def cache_policy(func: Callable[..., Any]) -> Optional[ToolCachePolicy]:
+    """
+    Returns the caching policy declared on an agent function, or None if it has none.
+    """
+    return getattr(getattr(func, "__func__", func), CACHE_POLICY, None)
+
+
+class ToolCache:
+    """
+    Results of agent functions declared with `cached_tool`, keyed on their arguments.
+
+    A call is keyed on the function's module, name and code (see `code_version`), plus its
+    arguments bound to the signature with defaults applied and serialized as canonical
+    JSON, so `f("a")` and `f(query="a", limit=10)` share an entry when 10 is the default.
+    Each function gets its own in-memory LRU bounded by `max_entries`; functions with
+    `persist` are also stored in one SQLite file, which a changed function body never
+    reads back from.
+
+    Identical calls in flight at the same time, from threads or coroutines, run the
+    function once and share its result. Results are returned as decoded from their JSON,
+    whether they were cached or just computed. Exceptions are not cached, and neither are
+    results that cannot be serialized as JSON, such as handoffs to agents with functions.
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, max_bytes: Optional[int] = 256 * 1024 * 1024
+    ):
+        """
+        Initializes an empty cache; the disk store is opened on the first persisted result.
+
+        Args:
+            path: SQLite file for persisted results. Defaults to `SWARM_TOOL_CACHE_PATH` or `.swarm_tool_cache.sqlite`.
+            max_bytes: Maximum total size of persisted results.
+        """
+        self.path = path or os.getenv(
+            "SWARM_TOOL_CACHE_PATH", ".swarm_tool_cache.sqlite"
+        )
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self.flight = SingleFlight()
+        self._memory: Dict[Any, MemoryCache] = {}
+        self._disk: Optional[SQLiteCache] = None
+        self._lock = threading.Lock()
+
+    def key(self, func: Callable[..., Any], kwargs: Dict[str, Any]) -> str:
+        """
+        Returns the cache key of a call.
+
+        Raises:
+            TypeError: If the arguments do not fit the function's signature.
+        """
+        policy = cache_policy(func)
+        target = getattr(func, "__func__", func)
+        bound = inspect.signature(func).bind(**kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        if policy is not None and not policy.context:
+            arguments.pop(CONTEXT_VARIABLES, None)
+        code = getattr(target, "__code__", None)
+        version = code_version(code) if code is not None else ""
+        namespace = f"{target.__module__}.{target.__qualname__}:{version}"
+        return payload_key({"arguments": arguments}, namespace=namespace)
+
+    def get(self, func: Callable[..., Any], key: str) -> Optional[bytes]:
+        """
+        Returns the stored result of a call as JSON, from memory or else from disk.
+        """
+        policy = cache_policy(func) or ToolCachePolicy()
+        memory = self._memory_for(func, policy)
+        value = memory.get(key)
+        if value is None and policy.persist:
+            value = self._disk_store().get(key)
+            if value is not None:
+                memory.set(key, value, policy.ttl)
+        return value
+
+    def call(self, func: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+        """
+        Calls a blocking function through the cache.
+        """
+        try:
+            key = self.key(func, kwargs)
+        except TypeError:
+            return func(**kwargs)
+        cached = self.get(func, key)
+        if cached is not None:
+            self.stats.hits += 1
+            return json.loads(cached)
+        value, shared = self.flight.do(
+            key, lambda: self._store(func, key, func(**kwargs))
+        )
+        self._count(shared)
+        return value
+
+    async def acall(self, func: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+        """
+        Calls a coroutine function through the cache.
+        """
+        try:
+            key = self.key(func, kwargs)
+        except TypeError:
+            return await func(**kwargs)
+        cached = self.get(func, key)
+        if cached is not None:
+            self.stats.hits += 1
+            return json.loads(cached)
+
+        async def fetch() -> Any:
+            return self._store(func, key, await func(**kwargs))
+
+        value, shared = await self.flight.ado(key, fetch)
+        self._count(shared)
+        return value
+
+    def clear(self, func: Optional[Callable[..., Any]] = None):
+        """
+        Drops the in-memory results of one function, or every stored result.
+        """
+        with self._lock:
+            if func is not None:
+                memory = self._memory.pop(getattr(func, "__func__", func), None)
+                if memory is not None:
+                    memory.clear()
+                return
+            self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def _store(self, func: Callable[..., Any], key: str, value: Any) -> Any:
+        policy = cache_policy(func) or ToolCachePolicy()
+        try:
+            data = json.dumps(value).encode()
+        except (TypeError, ValueError):
+            return value
+        self._memory_for(func, policy).set(key, data, policy.ttl)
+        if policy.persist:
+            self._disk_store().set(key, data, policy.ttl)
+        # Hand back what a hit would, so tuples become lists and keys strings either way
+        return json.loads(data)
+
+    def _memory_for(
+        self, func: Callable[..., Any], policy: ToolCachePolicy
+    ) -> MemoryCache:
+        target = getattr(func, "__func__", func)
+        memory = self._memory.get(target)
+        if memory is None:
+            with self._lock:
+                memory = self._memory.setdefault(
+                    target, MemoryCache(max_entries=policy.max_entries, ttl=policy.ttl)
+                )
+        return memory
+
+    def _disk_store(self) -> SQLiteCache:
+        if self._disk is None:
+            with self._lock:
+                if self._disk is None:
+                    self._disk = SQLiteCache(self.path, max_bytes=self.max_bytes)
+        return self._disk
+
+    def _count(self, shared: bool):
+        if shared:
+            self.stats.coalesced += 1
+        else:
+            self.stats.misses += 1
+
+
+tool_cache = ToolCache()
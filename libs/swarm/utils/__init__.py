@@ -1,4 +1,13 @@
-# Re-export tqdm utilities
+# Re-export utilities
 from .tqdm import tqdm, trange
+from .schema import function_to_json, tools_payload
+from .templates import jinja2_formatter, jinja2_render_many
 
-__all__ = ["tqdm", "trange"]
+__all__ = [
+    "tqdm",
+    "trange",
+    "function_to_json",
+    "tools_payload",
+    "jinja2_formatter",
+    "jinja2_render_many",
+]
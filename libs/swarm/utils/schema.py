@@ -0,0 +1,305 @@
+import dataclasses
+import enum
+import inspect
+import threading
+import types
+import typing
+import weakref
+from collections import OrderedDict
+from collections.abc import Iterable, Mapping, Sequence
+from typing import (
+    Annotated,
+    Any,
+    Callable,
+    Literal,
+    Optional,
+    Union,
+    get_args,
+    get_origin,
+)
+
+CONTEXT_VARIABLES = "context_variables"
+# Attribute holding the caching policy declared with `tool_cache.cached_tool`
+CACHE_POLICY = "__cache_policy__"
+
+PRIMITIVES: dict[type, str] = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    tuple: "array",
+    set: "array",
+    frozenset: "array",
+    dict: "object",
+    bytes: "string",
+    type(None): "null",
+}
+
+_schemas: "weakref.WeakKeyDictionary[Callable[..., Any], dict[bool, tuple[tuple[Any, ...], dict[str, Any]]]]" = weakref.WeakKeyDictionary()
+_payloads: "OrderedDict[tuple[Callable[..., Any], ...], tuple[tuple[Any, ...], list[dict[str, Any]]]]" = OrderedDict()
+_lock = threading.Lock()
+MAX_PAYLOADS = 256
+
+
+def type_schema(annotation: Any, defs: dict[str, Any]) -> dict[str, Any]:
+    """
+    Resolves a type annotation to a JSON Schema fragment.
+
+    Handles primitives, parametrized containers, `Optional`/`Union` (including `X | Y`),
+    `Literal`, `Enum`, `Annotated` (string metadata becomes the description), `TypedDict`,
+    dataclasses and pydantic models. Definitions referenced by pydantic models are hoisted
+    into `defs` so the caller can place them at the root of the parameters schema.
+
+    Args:
+        annotation: The annotation to describe.
+        defs: Shared `$defs` mapping, updated in place.
+
+    Returns:
+        A JSON Schema dictionary. Unannotated parameters are described as strings.
+    """
+    if annotation is inspect.Parameter.empty:
+        return {"type": "string"}
+    if annotation is Any:
+        return {}
+    if annotation is None:
+        return {"type": "null"}
+    if annotation in PRIMITIVES:
+        return {"type": PRIMITIVES[annotation]}
+
+    origin, args = get_origin(annotation), get_args(annotation)
+
+    if origin is Annotated:
+        schema = dict(type_schema(args[0], defs))
+        description = next((a for a in args[1:] if isinstance(a, str)), None)
+        if description:
+            schema["description"] = description
+        return schema
+
+    if origin is Union or origin is types.UnionType:
+        members = [type_schema(a, defs) for a in args]
+        if all(m.keys() == {"type"} and isinstance(m["type"], str) for m in members):
+            return {"type": list(dict.fromkeys(m["type"] for m in members))}
+        return {"anyOf": members}
+
+    if origin is Literal:
+        schema: dict[str, Any] = {"enum": list(args)}
+        kinds = {PRIMITIVES.get(type(a)) for a in args}
+        if len(kinds) == 1 and None not in kinds:
+            schema["type"] = kinds.pop()
+        return schema
+
+    if origin is tuple:
+        if len(args) == 2 and args[1] is Ellipsis:
+            return {"type": "array", "items": type_schema(args[0], defs)}
+        return {
+            "type": "array",
+            "prefixItems": [type_schema(a, defs) for a in args],
+            "minItems": len(args),
+            "maxItems": len(args),
+        }
+
+    if origin in (list, set, frozenset) or (
+        isinstance(origin, type)
+        and issubclass(origin, (Sequence, Iterable))
+        and not issubclass(origin, Mapping)
+    ):
+        schema = {"type": "array"}
+        if args:
+            schema["items"] = type_schema(args[0], defs)
+        if origin in (set, frozenset):
+            schema["uniqueItems"] = True
+        return schema
+
+    if origin is dict or (isinstance(origin, type) and issubclass(origin, Mapping)):
+        schema = {"type": "object"}
+        if len(args) == 2:
+            schema["additionalProperties"] = type_schema(args[1], defs)
+        return schema
+
+    if isinstance(annotation, type):
+        if issubclass(annotation, enum.Enum):
+            values = [member.value for member in annotation]
+            schema = {"enum": values}
+            kinds = {PRIMITIVES.get(type(v)) for v in values}
+            if len(kinds) == 1 and None not in kinds:
+                schema["type"] = kinds.pop()
+            return schema
+
+        if hasattr(annotation, "model_json_schema"):
+            schema = annotation.model_json_schema(ref_template="#/$defs/{model}")
+            defs.update(schema.pop("$defs", {}))
+            return schema
+
+        if typing.is_typeddict(annotation):
+            hints = typing.get_type_hints(annotation)
+            return {
+                "type": "object",
+                "properties": {k: type_schema(v, defs) for k, v in hints.items()},
+                "required": [k for k in hints if k in annotation.__required_keys__],
+            }
+
+        if dataclasses.is_dataclass(annotation):
+            hints = typing.get_type_hints(annotation)
+            fields = dataclasses.fields(annotation)
+            return {
+                "type": "object",
+                "properties": {
+                    f.name: type_schema(hints.get(f.name, f.type), defs) for f in fields
+                },
+                "required": [
+                    f.name
+                    for f in fields
+                    if f.default is dataclasses.MISSING
+                    and f.default_factory is dataclasses.MISSING
+                ],
+            }
+
+        for base, kind in PRIMITIVES.items():
+            if issubclass(annotation, base):
+                return {"type": kind}
+
+    return {"type": "string"}
+
+
+def fingerprint(func: Callable[..., Any]) -> tuple[Any, ...]:
+    """
+    Captures everything a function's schema depends on, so redefinitions invalidate the cache.
+    """
+    target = getattr(func, "__func__", func)
+    return (
+        getattr(target, "__code__", None),
+        getattr(target, "__defaults__", None),
+        getattr(target, "__kwdefaults__", None),
+        getattr(target, "__doc__", None),
+        tuple(getattr(target, "__annotations__", {}).items()),
+        getattr(target, "__signature__", None),
+    )
+
+
+def compile_schema(func: Callable[..., Any]) -> dict[str, Any]:
+    """
+    Builds the tool schema for a function without consulting the cache.
+
+    Raises:
+        ValueError: If the function's signature cannot be inspected.
+    """
+    try:
+        signature = inspect.signature(func)
+    except ValueError as e:
+        raise ValueError(
+            f"Failed to get signature for function {func.__name__}: {str(e)}"
+        )
+
+    try:
+        hints = typing.get_type_hints(func, include_extras=True)
+    except Exception:
+        hints = {}
+
+    defs: dict[str, Any] = {}
+    parameters = {}
+    for param in signature.parameters.values():
+        if param.name == CONTEXT_VARIABLES or param.kind in (
+            param.VAR_POSITIONAL,
+            param.VAR_KEYWORD,
+        ):
+            continue
+        parameters[param.name] = type_schema(
+            hints.get(param.name, param.annotation), defs
+        )
+
+    required = [
+        param.name
+        for param in signature.parameters.values()
+        if param.default == inspect.Parameter.empty and param.name in parameters
+    ]
+
+    schema: dict[str, Any] = {
+        "type": "object",
+        "properties": parameters,
+        "required": required,
+    }
+    if defs:
+        schema["$defs"] = defs
+
+    return {
+        "type": "function",
+        "function": {
+            "name": func.__name__,
+            "description": func.__doc__ or "",
+            "parameters": schema,
+        },
+    }
+
+
+def function_to_json(func: Callable[..., Any]) -> dict[str, Any]:
+    """
+    Converts a Python function's signature into a JSON-serializable dictionary.
+
+    The returned dictionary includes the function's name, docstring, and a schema describing its parameters and which are required. Parameter annotations are resolved to JSON Schema, including generics, unions, `Literal`, enums and pydantic models. A `context_variables` parameter is injected by the agent runner and is therefore left out of the schema.
+
+    Schemas are compiled once per function and cached until the function's code, defaults, annotations or docstring change. The returned dictionary is shared between callers and must not be mutated.
+
+    A caching policy declared on the function with `tool_cache.cached_tool` lives in its `CACHE_POLICY` attribute, next to the signature this schema is built from; it is honoured by the runner and never sent to the model.
+
+    Args:
+        func: The Python function to describe.
+
+    Returns:
+        A dictionary representing the function's signature and parameters in a JSON-compatible format.
+    """
+    target = getattr(func, "__func__", func)
+    bound = target is not func
+    current = fingerprint(func)
+    try:
+        entry = _schemas.get(target, {}).get(bound)
+    except TypeError:
+        return compile_schema(func)
+    if entry is not None and entry[0] == current:
+        return entry[1]
+
+    schema = compile_schema(func)
+    with _lock:
+        _schemas.setdefault(target, {})[bound] = (current, schema)
+    return schema
+
+
+def tools_payload(functions: Iterable[Callable[..., Any]]) -> list[dict[str, Any]]:
+    """
+    Returns the `tools` request payload for a list of agent functions.
+
+    The list is built once per distinct tuple of functions and reused on every turn until
+    one of the functions changes. It is shared between callers and must not be mutated.
+
+    Args:
+        functions: The agent's functions, in the order they should be offered to the model.
+
+    Returns:
+        A list of tool schemas as produced by `function_to_json`.
+    """
+    key = tuple(functions)
+    current = tuple(fingerprint(f) for f in key)
+    with _lock:
+        entry = _payloads.get(key)
+        if entry is not None and entry[0] == current:
+            _payloads.move_to_end(key)
+            return entry[1]
+
+    payload = [function_to_json(f) for f in key]
+    with _lock:
+        _payloads[key] = (current, payload)
+        if len(_payloads) > MAX_PAYLOADS:
+            _payloads.popitem(last=False)
+    return payload
+
+
+def clear_cache(func: Optional[Callable[..., Any]] = None):
+    """
+    Drops cached schemas for one function, or every cached schema and payload.
+    """
+    with _lock:
+        if func is None:
+            _schemas.clear()
+            _payloads.clear()
+        else:
+            _schemas.pop(getattr(func, "__func__", func), None)
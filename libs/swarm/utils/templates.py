@@ -0,0 +1,166 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping, Optional
+
+
+@dataclass
+class TemplateCacheInfo:
+    """
+    Snapshot of a template cache's counters.
+
+    Attributes:
+        hits: Renders that reused a compiled template.
+        misses: Renders that had to parse and compile the source.
+        maxsize: Maximum number of compiled templates kept.
+        currsize: Number of compiled templates currently kept.
+        source_bytes: Total size of the cached template sources.
+    """
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+    source_bytes: int
+
+
+def sandboxed_environment() -> Any:
+    """
+    Creates the sandboxed Jinja2 environment used for prompt templates.
+
+    Raises:
+        ImportError: If the Jinja2 library is not installed.
+    """
+    try:
+        from jinja2.sandbox import SandboxedEnvironment  # type: ignore
+    except ImportError as err:
+        raise ImportError("jinja2 is required for template formatting") from err
+
+    return SandboxedEnvironment()  # type: ignore
+
+
+class TemplateCache:
+    """
+    LRU of compiled Jinja2 templates keyed by their source, sharing one sandboxed environment.
+
+    Parsing and compiling a template dominates the cost of rendering a short prompt, so
+    repeated renders of the same source only pay for the render itself.
+    """
+
+    def __init__(
+        self, maxsize: int = 128, max_bytes: int = 4 * 1024 * 1024, env: Any = None
+    ):
+        """
+        Initializes an empty cache. The environment is created on first use.
+
+        Args:
+            maxsize: Maximum number of compiled templates kept.
+            max_bytes: Maximum total size of cached sources; larger templates are compiled but not kept.
+            env: Jinja2 environment to compile with. Defaults to a shared `SandboxedEnvironment`.
+        """
+        self.maxsize, self.max_bytes = maxsize, max_bytes
+        self._env = env
+        self._templates: "OrderedDict[str, Any]" = OrderedDict()
+        self._bytes = 0
+        self._hits = self._misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def env(self) -> Any:
+        if self._env is None:
+            with self._lock:
+                if self._env is None:
+                    self._env = sandboxed_environment()
+        return self._env
+
+    def get(self, source: str) -> Any:
+        """
+        Returns the compiled template for a source string, compiling it on a miss.
+        """
+        with self._lock:
+            template = self._templates.get(source)
+            if template is not None:
+                self._templates.move_to_end(source)
+                self._hits += 1
+                return template
+            self._misses += 1
+
+        template = self.env.from_string(source)  # type: ignore
+        if len(source) > self.max_bytes:
+            return template
+
+        with self._lock:
+            if source not in self._templates:
+                self._templates[source] = template
+                self._bytes += len(source)
+            while len(self._templates) > self.maxsize or self._bytes > self.max_bytes:
+                evicted, _ = self._templates.popitem(last=False)
+                self._bytes -= len(evicted)
+        return template
+
+    def render(self, source: str, /, **kwargs: Any) -> str:
+        """
+        Renders a template source with the given variables.
+        """
+        return self.get(source).render(**kwargs)  # type: ignore
+
+    def render_many(
+        self, source: str, contexts: Iterable[Mapping[str, Any]]
+    ) -> list[str]:
+        """
+        Renders one template against many variable mappings, compiling it at most once.
+        """
+        template = self.get(source)
+        return [template.render(**context) for context in contexts]  # type: ignore
+
+    def info(self) -> TemplateCacheInfo:
+        with self._lock:
+            return TemplateCacheInfo(
+                hits=self._hits,
+                misses=self._misses,
+                maxsize=self.maxsize,
+                currsize=len(self._templates),
+                source_bytes=self._bytes,
+            )
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+            self._bytes = 0
+            self._hits = self._misses = 0
+
+
+templates = TemplateCache()
+
+
+def jinja2_formatter(template: str, /, **kwargs: Any) -> str:
+    """
+    Renders a Jinja2 template string using the provided keyword arguments.
+
+    Compiled templates are cached by source in a shared sandboxed environment, so
+    rendering the same prompt repeatedly skips parsing and compilation.
+
+    Raises:
+        ImportError: If the Jinja2 library is not installed.
+
+    Returns:
+        The rendered template as a string.
+    """
+    return templates.render(template, **kwargs)
+
+
+def jinja2_render_many(
+    template: str,
+    contexts: Iterable[Mapping[str, Any]],
+    cache: Optional[TemplateCache] = None,
+) -> list[str]:
+    """
+    Renders one Jinja2 template string against each mapping in `contexts`.
+
+    Raises:
+        ImportError: If the Jinja2 library is not installed.
+
+    Returns:
+        The rendered strings, in the order of `contexts`.
+    """
+    return (cache or templates).render_many(template, contexts)
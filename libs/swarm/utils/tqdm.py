@@ -1,34 +1,178 @@
-import time
-import shutil
 import math
+import shutil
+import signal
 import sys
-from typing import Iterable, Iterator, Generic, Optional, TypeVar, Any
+import threading
+import time
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    TypeVar,
+    Union,
+)
 
 T = TypeVar("T")
 
+perf_counter = time.perf_counter
+
+
+def HMS(t: float) -> str:
+    """
+    Converts a time duration in seconds to a human-readable H:MM:SS or M:SS format.
+
+    Args:
+        t: Time duration in seconds.
+
+    Returns:
+        A string representing the duration in hours, minutes, and seconds, omitting leading zero hours if not needed.
+    """
+    return ":".join(
+        f"{x:02d}" if i else str(x)
+        for i, x in enumerate([int(t) // 3600, int(t) % 3600 // 60, int(t) % 60])
+        if i or x
+    )
+
+
+def SI(x: float) -> str:
+    """
+    Converts a numeric value to a string with an appropriate SI prefix.
+
+    Args:
+        x: The numeric value to convert.
+
+    Returns:
+        A string representing the value scaled with an SI prefix (e.g., k, M, G).
+    """
+    return (
+        (
+            f"{x / 1000 ** int(g := math.log(x, 1000)):.{int(3 - 3 * math.fmod(g, 1))}f}"[
+                :4
+            ].rstrip(".")
+            + " kMGTPEZY"[int(g)].strip()
+        )
+        if x
+        else "0.00"
+    )
+
+
+class Screen:
+    """
+    Shared terminal state for every progress bar in the process.
+
+    Owns the output lock, the cached terminal width (refreshed on SIGWINCH instead of
+    queried on every redraw) and the line slots that let several bars stack.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.bars: List[Optional["tqdm[Any]"]] = []
+        self._columns: Optional[int] = None
+        self._hooked = False
+
+    @property
+    def columns(self) -> int:
+        if self._columns is None:
+            self._columns = shutil.get_terminal_size().columns
+            self._hook_resize()
+        return self._columns
+
+    def _hook_resize(self):
+        """
+        Invalidates the cached width on SIGWINCH, chaining any previously installed handler.
+
+        Signal handlers can only be installed from the main thread; elsewhere the width
+        stays cached for the life of the process.
+        """
+        if self._hooked or not hasattr(signal, "SIGWINCH"):
+            return
+        if threading.current_thread() is not threading.main_thread():
+            return
+        previous = signal.getsignal(signal.SIGWINCH)
+
+        def on_resize(signum: int, frame: Any):
+            self._columns = None
+            if callable(previous):
+                previous(signum, frame)
+
+        signal.signal(signal.SIGWINCH, on_resize)
+        self._hooked = True
+
+    def acquire(self, bar: "tqdm[Any]", position: Optional[int]) -> int:
+        """
+        Assigns a bar to a line slot: the requested one, or the lowest free slot.
+        """
+        with self.lock:
+            if position is None:
+                position = next(
+                    (i for i, b in enumerate(self.bars) if b is None), len(self.bars)
+                )
+            while len(self.bars) <= position:
+                self.bars.append(None)
+            self.bars[position] = bar
+            return position
+
+    def release(self, position: int):
+        with self.lock:
+            if position < len(self.bars):
+                self.bars[position] = None
+            while self.bars and self.bars[-1] is None:
+                self.bars.pop()
+
+    def draw(self, position: int, line: str, file: TextIO, newline: bool = False):
+        """
+        Writes a line into a bar's slot without disturbing the cursor position of the others.
+        """
+        with self.lock:
+            down = "\n" * position
+            up = f"\033[{position}A" if position else ""
+            file.write(f"{down}\r{line}\033[K{'' if newline else up}")
+            if newline:
+                file.write("\n")
+            file.flush()
+
+
+screen = Screen()
+
 
 class tqdm(Generic[T]):
     def __init__(
         self,
-        iterable: Iterable[T] | None = None,
+        iterable: Union[Iterable[T], AsyncIterable[T], None] = None,
         desc: str = "",
         disable: bool = False,
         unit: str = "it",
         unit_scale: bool = False,
         total: Optional[int] = None,
         rate: int = 100,
+        position: Optional[int] = None,
+        leave: Optional[bool] = None,
+        file: Optional[TextIO] = None,
     ):
         """
         Initializes a progress bar for an iterable, configuring display options and internal state.
 
+        Updates are cheap and thread-safe: `update()` only takes the bar's lock and reads the
+        clock, and the bar is redrawn at most `rate` times per second. Several bars can be
+        shown at once, each on its own line.
+
         Args:
-            iterable: The iterable to track progress over. If None, progress bar operates without iteration.
+            iterable: The iterable (sync or async) to track progress over. If None, progress bar operates without iteration.
             desc: Optional description prefix for the progress bar.
             disable: If True, disables the progress bar display.
             unit: Label for the unit of iteration (e.g., "it", "items").
             unit_scale: If True, scales the unit count with SI prefixes.
             total: Total number of iterations. If not provided, attempts to infer from the iterable.
-            rate: Maximum number of progress bar updates per second.
+            rate: Maximum number of progress bar redraws per second.
+            position: Line offset for stacked bars. Defaults to the lowest free line.
+            leave: Keep the finished bar on screen. Defaults to True for the first line only.
+            file: Stream to draw on. Defaults to standard error.
         """
         self.iterable, self.disable, self.unit, self.unit_scale, self.rate = (
             iterable,
@@ -37,13 +181,18 @@ class tqdm(Generic[T]):
             unit_scale,
             rate,
         )
-        self.start_time, self.current_index, self.count, self.skip, self.total = (
+        self.st, self.n, self.t = (
             time.perf_counter(),
-            -1,
             0,
-            1,
             getattr(iterable, "__len__", lambda: 0)() if total is None else total,
         )
+        self.file = file or sys.stderr
+        self.mininterval = 1 / rate
+        self.closed = False
+        self._next_draw = math.inf if disable else 0.0
+        self._lock = threading.Lock()
+        self.pos = -1 if disable else screen.acquire(self, position)
+        self.leave = self.pos == 0 if leave is None else leave
         self.set_description(desc)
         self.update(0)
 
@@ -55,10 +204,29 @@ class tqdm(Generic[T]):
         Finalizes the progress bar display when iteration completes.
         """
         assert self.iterable is not None, "need an iterable to iterate"
-        for item in self.iterable:
-            yield item
-            self.update(1)
-        self.update(close=True)
+        try:
+            for item in self.iterable:  # type: ignore
+                yield item
+                self.update(1)
+        finally:
+            self.close()
+
+    async def __aiter__(self) -> AsyncIterator[T]:
+        """
+        Iterates over the wrapped async (or plain) iterable, updating the progress bar after each item.
+        """
+        assert self.iterable is not None, "need an iterable to iterate"
+        try:
+            if hasattr(self.iterable, "__aiter__"):
+                async for item in self.iterable:  # type: ignore
+                    yield item
+                    self.update(1)
+            else:
+                for item in self.iterable:  # type: ignore
+                    yield item
+                    self.update(1)
+        finally:
+            self.close()
 
     def __enter__(self):
         """
@@ -73,7 +241,7 @@ class tqdm(Generic[T]):
         """
         Finalizes the progress bar display when exiting a context manager.
         """
-        self.update(close=True)
+        self.close()
 
     def set_description(self, desc: str):
         """
@@ -85,69 +253,78 @@ class tqdm(Generic[T]):
 
     def update(self, n: int = 0, close: bool = False):
         """
-        Updates the progress bar display to reflect the current iteration state.
+        Advances the progress bar and redraws it if the refresh interval has elapsed.
 
-        Increments the internal counters, recalculates progress, and prints an updated
-        progress bar to standard error. Dynamically adjusts update frequency based on
-        iteration rate to minimize overhead. When `close` is True, finalizes the display
-        and moves to a new line.
+        Safe to call concurrently from threads and asyncio tasks. When nothing needs
+        redrawing this is an explicit lock acquire/release (a `with` block costs several
+        times more), an add and a clock read. When `close` is True, the bar is redrawn
+        one last time and finalized.
 
         Args:
             n: Number of iterations to increment the progress by.
             close: If True, finalizes and closes the progress bar display.
         """
-        self.n, self.i = self.n + n, self.i + 1
-
-        if self.disable or (not close and self.i % self.skip != 0):
+        lock = self._lock
+        lock.acquire()
+        self.n += n
+        now = perf_counter()
+        if now < self._next_draw and not close:
+            lock.release()
             return
+        if self.disable or self.closed:
+            lock.release()
+            return
+        self._next_draw = now + self.mininterval
+        lock.release()
+        if close:
+            self.close()
+        else:
+            self.refresh(now)
+
+    def refresh(self, now: Optional[float] = None):
+        """
+        Redraws the progress bar immediately.
+        """
+        if self.disable or self.closed:
+            return
+        screen.draw(self.pos, self.format_meter(now), self.file)
 
-        prog, elapsed, ncols = (
-            self.n / self.t if self.t else 0,
-            time.perf_counter() - self.st,
-            shutil.get_terminal_size().columns,
-        )
-
-        if self.i / elapsed > self.rate and self.i:
-            self.skip = max(int(self.i / elapsed) // self.rate, 1)
-
-        def HMS(t: float) -> str:
-            """
-            Converts a time duration in seconds to a human-readable H:MM:SS or M:SS format.
+    def close(self):
+        """
+        Draws the final state and releases the bar's line. Safe to call more than once.
+        """
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self._next_draw = math.inf
+        if self.disable:
+            return
+        with screen.lock:
+            if self.leave:
+                others = any(b is not None and b is not self for b in screen.bars)
+                screen.draw(
+                    self.pos, self.format_meter(), self.file, newline=not others
+                )
+            else:
+                screen.draw(self.pos, "", self.file)
+            screen.release(self.pos)
 
-            Args:
-                t: Time duration in seconds.
+    def format_meter(self, now: Optional[float] = None) -> str:
+        """
+        Builds the progress bar line for the current state.
 
-            Returns:
-                A string representing the duration in hours, minutes, and seconds, omitting leading zero hours if not needed.
-            """
-            return ":".join(
-                f"{x:02d}" if i else str(x)
-                for i, x in enumerate(
-                    [int(t) // 3600, int(t) % 3600 // 60, int(t) % 60]
-                )
-                if i or x
-            )
+        Args:
+            now: `time.perf_counter()` value to measure elapsed time against.
 
-        def SI(x: float) -> str:
-            """
-            Converts a numeric value to a string with an appropriate SI prefix.
-
-            Args:
-                x: The numeric value to convert.
-
-            Returns:
-                A string representing the value scaled with an SI prefix (e.g., k, M, G).
-            """
-            return (
-                (
-                    f"{x / 1000 ** int(g := math.log(x, 1000)):.{int(3 - 3 * math.fmod(g, 1))}f}"[
-                        :4
-                    ].rstrip(".")
-                    + " kMGTPEZY"[int(g)].strip()
-                )
-                if x
-                else "0.00"
-            )
+        Returns:
+            The rendered line, truncated to the cached terminal width.
+        """
+        ncols = screen.columns
+        prog, elapsed = (
+            min(self.n / self.t, 1.0) if self.t else 0,
+            (now or time.perf_counter()) - self.st,
+        )
 
         prog_text = (
             f"{SI(self.n)}{f'/{SI(self.t)}' if self.t else self.unit}"
@@ -161,7 +338,7 @@ class tqdm(Generic[T]):
 
         it_text = (
             (SI(self.n / elapsed) if self.unit_scale else f"{self.n / elapsed:5.2f}")
-            if self.n
+            if self.n and elapsed
             else "?"
         )
 
@@ -169,8 +346,7 @@ class tqdm(Generic[T]):
         sz = max(ncols - len(self.desc) - 3 - 2 - 2 - len(suf), 1)
 
         bar = (
-            "\r"
-            + self.desc
+            self.desc
             + (
                 f"{100 * prog:3.0f}%|{('█' * int(num := sz * prog) + ' ▏▎▍▌▋▊▉'[int(8 * num) % 8].strip()).ljust(sz, ' ')}| "
                 if self.t
@@ -179,17 +355,23 @@ class tqdm(Generic[T]):
             + suf
         )
 
-        print(bar[: ncols + 1], flush=True, end="\n" * close, file=sys.stderr)
+        return bar[:ncols]
 
     @classmethod
-    def write(cls, s: str):
+    def write(cls, s: str, file: Optional[TextIO] = None):
         """
-        Clears the current line and writes a message to standard error.
+        Clears the current line and writes a message above the active progress bars.
 
         Args:
             s: The string to display on the progress bar line.
+            file: Stream to write to. Defaults to standard error.
         """
-        print(f"\r\033[K{s}", flush=True, file=sys.stderr)
+        file = file or sys.stderr
+        with screen.lock:
+            print(f"\r\033[K{s}", flush=True, file=file)
+            for bar in screen.bars:
+                if bar is not None:
+                    bar.refresh()
 
 
 class trange(tqdm[int]):
@@ -1,3 +1,314 @@
-from mcp.server.fastmcp import FastMCP
+"""
+MCP server exposing the swarm model registry and chat completions.
 
-mcp = FastMCP(name="")
+Tools run on the server's event loop against the process-wide pooled clients in
+`clients.registry`, so concurrent calls from any number of MCP sessions share one
+keep-alive pool per endpoint. Calls beyond `SWARM_MCP_CONCURRENCY` wait for a slot for
+at most `SWARM_MCP_QUEUE_TIMEOUT` seconds, and each call is bounded by its own timeout.
+
+Run with `python mcp-servers/server.py` (stdio) or set `SWARM_MCP_TRANSPORT` to
+`sse` / `streamable-http`. Point `OPENAI_BASE_URL` or `OPENROUTER_BASE_URL` at any
+OpenAI-compatible server, e.g. a local stub, to run it without a provider account.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "libs" / "swarm"))
+
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.server.fastmcp.exceptions import ToolError
+from pydantic import BaseModel
+
+from clients import get_async_client, registry
+from models import (
+    MODEL_INPUTS,
+    MODEL_OUTPUTS,
+    MODEL_TYPES,
+    OPENROUTER_MODELS,
+    OPENROUTER_TAGS,
+)
+from router import ModelRouter, Route
+from telemetry import telemetry
+
+MAX_CONCURRENCY = int(os.getenv("SWARM_MCP_CONCURRENCY", 32))
+QUEUE_TIMEOUT = float(os.getenv("SWARM_MCP_QUEUE_TIMEOUT", 30))
+REQUEST_TIMEOUT = float(os.getenv("SWARM_MCP_REQUEST_TIMEOUT", 300))
+# Minimum seconds between streamed progress notifications for one call
+PROGRESS_INTERVAL = 0.05
+
+router = ModelRouter()
+slots = asyncio.Semaphore(MAX_CONCURRENCY)
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """
+    Closes the pooled clients when the server shuts down.
+    """
+    try:
+        yield
+    finally:
+        await registry.aclose()
+
+
+mcp = FastMCP(name="swarm", lifespan=lifespan)
+
+
+class ChatResult(BaseModel):
+    """
+    Reply to a `chat` or `complete` call.
+
+    Attributes:
+        model: Model that answered, as reported by the provider.
+        content: The full reply text.
+        finish_reason: Why generation stopped, e.g. "stop" or "length".
+        input_tokens: Prompt tokens billed, when the provider reports usage.
+        output_tokens: Completion tokens billed, or the number of streamed chunks without usage.
+        ttft: Seconds to the first streamed token; unset for non-streamed calls.
+        elapsed: Seconds from sending the request to the end of the reply.
+    """
+
+    model: Optional[str] = None
+    content: str = ""
+    finish_reason: Optional[str] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    ttft: Optional[float] = None
+    elapsed: float = 0.0
+
+
+@asynccontextmanager
+async def admitted(timeout: Optional[float]) -> AsyncIterator[None]:
+    """
+    Holds a concurrency slot for the duration of one call and bounds the call's run time.
+
+    Raises:
+        ToolError: If no slot frees up within `QUEUE_TIMEOUT`, or the call outlives its timeout.
+    """
+    try:
+        await asyncio.wait_for(slots.acquire(), QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise ToolError(f"Server busy: {MAX_CONCURRENCY} requests in flight") from None
+    limit = min(timeout or REQUEST_TIMEOUT, REQUEST_TIMEOUT)
+    try:
+        async with asyncio.timeout(limit):
+            yield
+    except TimeoutError:
+        raise ToolError(f"Request timed out after {limit:g}s") from None
+    finally:
+        slots.release()
+
+
+def describe(name: str) -> Dict[str, Any]:
+    model = OPENROUTER_MODELS[name]
+    return {
+        "name": name,
+        "slug": f"{model.provider.name}/{name}",
+        "types": model.types or [],
+        "inputs": model.inputs or ["text"],
+        "outputs": model.outputs or ["text"],
+        "tags": model.tags or [],
+        "input_price": model.input_price,
+        "output_price": model.output_price,
+        "context_window": model.context_window,
+    }
+
+
+@mcp.tool()
+def list_models(
+    types: Optional[List[MODEL_TYPES]] = None,
+    inputs: Optional[List[MODEL_INPUTS]] = None,
+    outputs: Optional[List[MODEL_OUTPUTS]] = None,
+    tags: Optional[List[OPENROUTER_TAGS]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Lists the registry models that offer every requested capability.
+
+    Args:
+        types: Required model types, e.g. ["chat", "fast"].
+        inputs: Required input modalities, e.g. ["text", "image"].
+        outputs: Required output modalities.
+        tags: Required OpenRouter tags, e.g. ["free"].
+    """
+    routes = router.candidates(types=types, inputs=inputs, outputs=outputs, tags=tags)
+    return [describe(name) for name in dict.fromkeys(route.name for route in routes)]
+
+
+async def stream_chat(
+    route_options: Dict[str, Any],
+    client: Any,
+    messages: List[Dict[str, Any]],
+    params: Dict[str, Any],
+    ctx: Context,
+) -> ChatResult:
+    """
+    Streams one chat completion, forwarding text deltas as progress notifications.
+
+    Progress messages carry the text received since the previous notification, and
+    `progress` counts the chunks received so far. Clients that did not ask for progress
+    receive only the final result.
+    """
+    started = time.perf_counter()
+    result = ChatResult(model=route_options.get("model"))
+    parts: List[str] = []
+    pending: List[str] = []
+    chunks, last_sent = 0, 0.0
+
+    stream = await client.chat.completions.create(
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},
+        **route_options,
+        **params,
+    )
+    async for chunk in stream:
+        result.model = chunk.model or result.model
+        if chunk.usage is not None:
+            result.input_tokens = chunk.usage.prompt_tokens
+            result.output_tokens = chunk.usage.completion_tokens
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        result.finish_reason = choice.finish_reason or result.finish_reason
+        if not choice.delta.content:
+            continue
+        if result.ttft is None:
+            result.ttft = time.perf_counter() - started
+        chunks += 1
+        parts.append(choice.delta.content)
+        pending.append(choice.delta.content)
+        if (now := time.perf_counter()) - last_sent >= PROGRESS_INTERVAL:
+            await ctx.report_progress(chunks, message="".join(pending))
+            pending.clear()
+            last_sent = now
+    if pending:
+        await ctx.report_progress(chunks, message="".join(pending))
+
+    result.content = "".join(parts)
+    if result.output_tokens is None:
+        result.output_tokens = chunks
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+async def create_chat(
+    route_options: Dict[str, Any],
+    client: Any,
+    messages: List[Dict[str, Any]],
+    params: Dict[str, Any],
+) -> ChatResult:
+    started = time.perf_counter()
+    response = await client.chat.completions.create(
+        messages=messages, **route_options, **params
+    )
+    choice = response.choices[0] if response.choices else None
+    return ChatResult(
+        model=response.model,
+        content=(choice.message.content or "") if choice else "",
+        finish_reason=choice.finish_reason if choice else None,
+        input_tokens=response.usage.prompt_tokens if response.usage else None,
+        output_tokens=response.usage.completion_tokens if response.usage else None,
+        elapsed=time.perf_counter() - started,
+    )
+
+
+@mcp.tool()
+async def chat(
+    messages: List[Dict[str, Any]],
+    ctx: Context,
+    model: Optional[str] = None,
+    types: Optional[List[MODEL_TYPES]] = None,
+    sort: Optional[Literal["price", "throughput", "latency"]] = None,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    stream: bool = True,
+    timeout: Optional[float] = None,
+) -> ChatResult:
+    """
+    Sends a conversation to a model and returns its reply.
+
+    Args:
+        messages: Chat messages, e.g. [{"role": "user", "content": "Hi"}].
+        model: Registry model name (see `list_models`) or any model id the default endpoint serves. Routed by `types` when omitted.
+        types: Capabilities to route on when no model is given. Defaults to ["chat"].
+        sort: Routing criterion when no model is given.
+        temperature: Sampling temperature.
+        max_tokens: Upper bound on generated tokens.
+        stream: Stream text deltas as progress notifications while generating.
+        timeout: Seconds allowed for the call, capped by the server's limit.
+    """
+    params = {"temperature": temperature, "max_completion_tokens": max_tokens}
+    params = {k: v for k, v in params.items() if v is not None}
+
+    async def send(route: Optional[Route]) -> ChatResult:
+        if route is None:
+            options, client = {"model": model}, get_async_client()
+        else:
+            options, client = route.options(), get_async_client(route.model.provider)
+        with telemetry.track(options["model"]) as span:
+            span.prompt = messages
+            if stream:
+                result = span.result = await stream_chat(
+                    options, client, messages, params, ctx
+                )
+            else:
+                result = span.result = await create_chat(
+                    options, client, messages, params
+                )
+        return result
+
+    async with admitted(timeout):
+        try:
+            if model is None:
+                return await router.acall(send, sort, types=types or ["chat"])
+            if model in OPENROUTER_MODELS:
+                return await send(Route(model, OPENROUTER_MODELS[model]))
+            return await send(None)
+        except LookupError as e:
+            raise ToolError(str(e)) from None
+
+
+@mcp.tool()
+async def complete(
+    prompt: str,
+    ctx: Context,
+    model: Optional[str] = None,
+    system: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    stream: bool = True,
+    timeout: Optional[float] = None,
+) -> ChatResult:
+    """
+    Answers a single prompt, optionally under a system message.
+
+    Args:
+        prompt: The user prompt.
+        model: Registry model name or model id; routed to a chat model when omitted.
+        system: Optional system message.
+        temperature: Sampling temperature.
+        max_tokens: Upper bound on generated tokens.
+        stream: Stream text deltas as progress notifications while generating.
+        timeout: Seconds allowed for the call, capped by the server's limit.
+    """
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": prompt})
+    return await chat(
+        messages,
+        ctx,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=stream,
+        timeout=timeout,
+    )
+
+
+if __name__ == "__main__":
+    mcp.run(transport=os.getenv("SWARM_MCP_TRANSPORT", "stdio"))  # type: ignore